@@ -0,0 +1,351 @@
+import contextlib
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from borrow_analytics import BorrowAnalytics
+from catalogue_import import read_chunks, read_rows
+from catalogue_search import CatalogueIndex
+from concurrent.futures import ThreadPoolExecutor
+
+from core_entities import Book, BorrowRecord, LibManagementSystem, Library, User
+from lib_storage import SQLiteStorage
+from overdue_sweep import OverdueSweeper
+
+WORDS = (
+    "the a of and in to night great house last king war love river city dark "
+    "secret garden time world shadow light winter summer road stone fire sea "
+    "blood star queen empire silent lost golden black white red green song "
+    "heart child mountain island storm glass iron ghost memory dream letter"
+).split()
+SYLLABLES = "ka ri to mel an dor sen vi lo ra ste fan gor be li mon zu cha".split()
+FIRST_NAMES = "james mary john linda harper scott ada leo nora omar yuki ines".split()
+
+SEARCH_P99_TARGET_MS = 5.0
+
+
+def create_lib(
+    book_count: int, user_count: int = 1000, storage=None
+) -> LibManagementSystem:
+    lib = LibManagementSystem(storage)
+    lib.add_library(Library(id=1, name="Central Library", status="Open"))
+    lib.import_books(
+        [
+            [
+                {
+                    "id": book_id,
+                    "title": f"Title {book_id}",
+                    "author": f"Author {book_id % 997}",
+                    "total_copies": 1,
+                }
+                for book_id in range(1, book_count + 1)
+            ]
+        ],
+        library_id=1,
+    )
+    for user_id in range(1, user_count + 1):
+        lib.register_user(User(id=user_id, name=f"User {user_id}"))
+    return lib
+
+
+def quiet():
+    # The system prints on every call; keep it out of the timings
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def benchmark_borrow_return(sizes=(1_000, 10_000, 100_000), operations: int = 5000):
+    print("Borrow + return latency as the catalogue and history grow")
+    for size in sizes:
+        rng = random.Random(size)
+        lib = create_lib(size)
+        # Build up some borrow history first
+        with quiet():
+            for book_id in rng.sample(range(1, size + 1), min(size, 5000)):
+                user = lib.users[rng.randrange(len(lib.users))]
+                lib.borrow_book(user, book_id)
+                lib.return_book(user, lib.borrow_records[-1].book_copy_id)
+
+        book_ids = rng.sample(range(1, size + 1), min(size, operations))
+        start = time.perf_counter()
+        with quiet():
+            for book_id in book_ids:
+                user = lib.users[rng.randrange(len(lib.users))]
+                lib.borrow_book(user, book_id)
+                lib.return_book(user, lib.borrow_records[-1].book_copy_id)
+        elapsed = (time.perf_counter() - start) / len(book_ids)
+
+        print(
+            f"  {size:>9,} books, {len(lib.borrow_records):>6,} records: "
+            f"{elapsed * 1e6:>6.1f} us per borrow+return"
+        )
+
+
+def generate_corpus(size: int, seed: int = 1):
+    # Titles from a Zipf-ish common vocabulary plus invented rare words, so
+    # queries hit both huge and tiny posting lists
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+
+    def rare_word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+    surnames = [rare_word() for _ in range(max(100, size // 50))]
+    for book_id in range(1, size + 1):
+        words = rng.choices(WORDS, weights, k=rng.randint(1, 4))
+        words.insert(rng.randrange(len(words) + 1), rare_word())
+        author = f"{rng.choice(FIRST_NAMES)} {rng.choice(surnames)}"
+        yield book_id, " ".join(words).title(), author.title()
+
+
+def benchmark_search(sizes=(100_000, 1_000_000), queries: int = 500):
+    print("Catalogue search latency")
+    missed = 0
+    for size in sizes:
+        corpus = list(generate_corpus(size))
+        index = CatalogueIndex()
+        start = time.perf_counter()
+        index.add_many(corpus)
+        build = time.perf_counter() - start
+
+        rng = random.Random(size)
+        samples = [corpus[rng.randrange(size)] for _ in range(queries)]
+        query_sets = {
+            "exact title word": [title.split()[-1] for _, title, _ in samples],
+            "author prefix": [author.split()[1][:4] for _, _, author in samples],
+            "title + author": [
+                f"{title.split()[0]} {author.split()[1]}" for _, title, author in samples
+            ],
+            "common word": [rng.choice(WORDS[:5]) for _ in samples],
+        }
+        print(f"  {size:>9,} books, index built in {build:.1f}s")
+        for name, query_list in query_sets.items():
+            latencies = []
+            for query in query_list:
+                start = time.perf_counter()
+                index.search(query)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            verdict = "ok" if p99 <= SEARCH_P99_TARGET_MS else "OVER TARGET"
+            print(
+                f"    {name:<17} p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms, "
+                f"p99 {p99:7.2f} ms  ({verdict}, target p99 "
+                f"{SEARCH_P99_TARGET_MS:.0f} ms)"
+            )
+            missed += p99 > SEARCH_P99_TARGET_MS
+    if missed:
+        print(f"  {missed} query set(s) over the p99 target")
+
+
+def write_catalogue_csv(path: str, size: int):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("id", "title", "author", "total_copies"))
+        writer.writerows(
+            (book_id, title, author, 1)
+            for book_id, title, author in generate_corpus(size)
+        )
+
+
+def benchmark_import(sizes=(10_000, 100_000, 1_000_000)):
+    print("Catalogue import throughput from CSV")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"catalogue_{size}.csv")
+            write_catalogue_csv(path, size)
+
+            def add_book_loop():
+                lib = LibManagementSystem()
+                for row in read_rows(path):
+                    lib.add_book(
+                        Book(
+                            id=row["id"],
+                            title=row["title"],
+                            author=row["author"],
+                            total_copies=row["total_copies"],
+                            available_copies=row["total_copies"],
+                        ),
+                        library_id=1,
+                    )
+
+            def import_validated():
+                LibManagementSystem().import_books(read_chunks(path), library_id=1)
+
+            print(f"  {size:>9,} rows")
+            for name, load in (
+                ("add_book loop", add_book_loop),
+                ("import_books", import_validated),
+            ):
+                start = time.perf_counter()
+                load()
+                elapsed = time.perf_counter() - start
+                print(f"    {name:<21} {size / elapsed:>10,.0f} rows/s")
+
+
+def benchmark_overdue(sizes=(100_000, 1_000_000), minutes: int = 60):
+    print("Per-minute overdue sweep over active loans")
+    start_time = datetime(2026, 1, 1)
+    for size in sizes:
+        rng = random.Random(size)
+        sweeper = OverdueSweeper()
+        for record_id in range(1, size + 1):
+            # Due dates spread over four weeks, half of them already past
+            due = start_time + timedelta(seconds=rng.uniform(-14, 14) * 86400)
+            sweeper.track(
+                BorrowRecord(
+                    id=record_id,
+                    user_id=record_id,
+                    book_copy_id=record_id,
+                    borrow_date=str(due - timedelta(weeks=2)),
+                    due_date=str(due),
+                )
+            )
+        start = time.perf_counter()
+        sweeper.sweep(start_time)
+        catch_up = time.perf_counter() - start
+
+        elapsed = 0.0
+        for minute in range(1, minutes + 1):
+            start = time.perf_counter()
+            sweeper.sweep(start_time + timedelta(minutes=minute))
+            elapsed += time.perf_counter() - start
+        print(
+            f"  {size:>9,} loans: first sweep {catch_up * 1000:8.1f} ms "
+            f"({len(sweeper.overdue):,} overdue), then "
+            f"{elapsed / minutes * 1000:6.2f} ms per minute"
+        )
+
+
+def benchmark_storage(book_count: int = 10_000, operations: int = 4000):
+    print("Borrow + return throughput by storage backend")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("in-memory", "sqlite"):
+            for threads in (1, 4):
+                storage = None
+                if name == "sqlite":
+                    path = os.path.join(directory, f"lib_{threads}.db")
+                    storage = SQLiteStorage(path)
+                lib = create_lib(book_count, storage=storage)
+                copy_of = {c.book_id: c.id for c in lib.book_copies}
+
+                def worker(book_ids):
+                    # Each caller works its own books, so loans never collide
+                    for book_id in book_ids:
+                        user = lib.users[book_id % len(lib.users)]
+                        lib.borrow_book(user, book_id)
+                        lib.return_book(user, copy_of[book_id])
+
+                per_thread = operations // threads
+                batches = [
+                    range(t * per_thread + 1, (t + 1) * per_thread + 1)
+                    for t in range(threads)
+                ]
+                start = time.perf_counter()
+                with quiet(), ThreadPoolExecutor(threads) as pool:
+                    list(pool.map(worker, batches))
+                elapsed = time.perf_counter() - start
+                lib.storage.close()
+                print(
+                    f"  {name:<9} {threads} caller(s): "
+                    f"{per_thread * threads / elapsed:>9,.0f} borrow+return/s"
+                )
+
+
+def benchmark_analytics(borrows: int = 1_000_000, titles: int = 100_000):
+    print("Borrow analytics cost on the borrow path and for top-100 queries")
+    rng = random.Random(borrows)
+    # Zipf-like demand: a few titles take most of the borrows
+    events = [
+        (int(rng.paretovariate(1.2)) % titles + 1, rng.randrange(1, 11))
+        for _ in range(borrows)
+    ]
+    analytics = BorrowAnalytics()
+    start = time.perf_counter()
+    for book_id, library_id in events:
+        analytics.record_borrow(book_id, library_id)
+        analytics.record_available(book_id)
+    record = (time.perf_counter() - start) / borrows
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        analytics.top_titles(100)
+        analytics.top_titles(100, library_id=rng.randrange(1, 11))
+    query = (time.perf_counter() - start) / 2000
+    print(
+        f"  {borrows:>9,} borrows over {titles:,} titles: "
+        f"{record * 1e6:.2f} us per borrow+return, "
+        f"{query * 1e6:.1f} us per top-100 query"
+    )
+
+
+def benchmark_holds(patrons: int = 2000, titles: int = 10, copies: int = 2):
+    print("Hot titles under contention: polling borrowers vs hold queues")
+    for mode in ("retry", "holds"):
+        lib = create_lib(0, user_count=patrons)
+        lib.import_books(
+            [
+                [
+                    {"id": book_id, "title": "Hot", "author": "A", "total_copies": copies}
+                    for book_id in range(1, titles + 1)
+                ]
+            ],
+            library_id=1,
+        )
+        wanting = {user.id: user.id % titles + 1 for user in lib.users}
+        users = {user.id: user for user in lib.users}
+        calls = 0
+        loans = []
+        start = time.perf_counter()
+        with quiet():
+            if mode == "holds":
+                for user_id, book_id in list(wanting.items()):
+                    calls += 1
+                    try:
+                        lib.borrow_book(users[user_id], book_id)
+                        loans.append((users[user_id], book_id))
+                        del wanting[user_id]
+                    except ValueError:
+                        lib.place_hold(users[user_id], book_id)
+            while wanting:
+                # Every tick all current borrowers bring their copies back
+                for user, book_id in loans:
+                    copy_id = user.borrowed_copy_id[-1]
+                    lib.return_book(user, copy_id)
+                loans = []
+                for user_id, book_id in list(wanting.items()):
+                    user = users[user_id]
+                    if mode == "holds" and not lib.get_ready_hold(user, book_id):
+                        continue
+                    calls += 1
+                    try:
+                        lib.borrow_book(user, book_id)
+                    except ValueError:
+                        continue
+                    loans.append((user, book_id))
+                    del wanting[user_id]
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {mode:<5} {patrons:,} patrons on {titles} titles x {copies} copies: "
+            f"{calls:>9,} borrow calls, {elapsed * 1000:8.1f} ms"
+        )
+
+
+BENCHMARKS = {
+    "borrow_return": benchmark_borrow_return,
+    "search": benchmark_search,
+    "import": benchmark_import,
+    "overdue": benchmark_overdue,
+    "storage": benchmark_storage,
+    "analytics": benchmark_analytics,
+    "holds": benchmark_holds,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
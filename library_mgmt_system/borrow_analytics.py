@@ -0,0 +1,182 @@
+import bisect
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+DAY_SECONDS = 86400
+
+
+# Exact counts kept ordered: items are grouped by count and the distinct
+# counts are held in a sorted list. Changing a count moves one item between
+# groups, and the top k are read from the highest groups down without looking
+# at anything below them. Ties come out in no particular order.
+class RankedCounter:
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self._groups: Dict[int, Set[int]] = {}
+        self._levels: List[int] = []
+
+    def add(self, item: int, delta: int):
+        old = self.counts.get(item, 0)
+        new = old + delta
+        if old:
+            self._leave(item, old)
+        if new > 0:
+            self.counts[item] = new
+            group = self._groups.get(new)
+            if group is None:
+                group = self._groups[new] = set()
+                bisect.insort(self._levels, new)
+            group.add(item)
+        else:
+            self.counts.pop(item, None)
+
+    def _leave(self, item: int, count: int):
+        group = self._groups[count]
+        group.discard(item)
+        if not group:
+            del self._groups[count]
+            del self._levels[bisect.bisect_left(self._levels, count)]
+
+    def top(self, k: int) -> List[Tuple[int, int]]:
+        result = []
+        for count in reversed(self._levels):
+            for item in self._groups[count]:
+                if len(result) == k:
+                    return result
+                result.append((item, count))
+        return result
+
+
+class _DayBucket:
+    __slots__ = ("epoch", "borrows")
+
+    def __init__(self):
+        self.epoch = -1
+        self.borrows: Counter = Counter()  # (library_id, book_id) -> borrows
+
+
+# Borrow counts over a sliding window of `window_days` daily buckets, per
+# branch and network-wide, plus unmet demand per title: patrons queued on its
+# holds, and borrows refused since a copy was last free. The borrow path only
+# appends to a queue; queued borrows are folded into the current bucket and
+# two RankedCounters on the next query or every `fold_every` borrows. A
+# bucket's counts are taken back out once when it leaves the window, so
+# upkeep is proportional to the borrows themselves, never to the history.
+class BorrowAnalytics:
+    def __init__(
+        self,
+        window_days: int = 30,
+        fold_every: int = 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.window_days = window_days
+        self.fold_every = fold_every
+        self.clock = clock
+        self._pending: deque = deque()
+        self._buckets = [_DayBucket() for _ in range(window_days)]
+        self._epoch = int(clock() // DAY_SECONDS)
+        self._network = RankedCounter()
+        self._branches: Dict[int, RankedCounter] = {}
+        self._waiting: Dict[int, int] = {}
+        self._denied: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        epoch = int(self.clock() // DAY_SECONDS)
+        if epoch == self._epoch:
+            return
+        self._epoch = epoch
+        for bucket in self._buckets:
+            if bucket.epoch != -1 and bucket.epoch <= epoch - self.window_days:
+                self._expire(bucket)
+
+    def _expire(self, bucket: _DayBucket):
+        for (library_id, book_id), borrows in bucket.borrows.items():
+            self._network.add(book_id, -borrows)
+            self._branches[library_id].add(book_id, -borrows)
+        bucket.epoch = -1
+        bucket.borrows = Counter()
+
+    def record_borrow(
+        self, book_id: int, library_id: int, when: Optional[float] = None
+    ):
+        # `when` backfills a past borrow, e.g. history loaded from storage
+        self._pending.append((book_id, library_id, when or self.clock()))
+        if len(self._pending) >= self.fold_every:
+            with self._lock:
+                self._fold()
+
+    def _fold(self):
+        # Borrows are tallied per (day, branch, title) first, so a popular
+        # title moves once per fold however often it was borrowed
+        self._roll()
+        batch: Counter = Counter()
+        pending = self._pending
+        while pending:
+            book_id, library_id, when = pending.popleft()
+            batch[(int(when // DAY_SECONDS), library_id, book_id)] += 1
+
+        network: Counter = Counter()
+        for (epoch, library_id, book_id), borrows in batch.items():
+            if not self._epoch - self.window_days < epoch <= self._epoch:
+                continue
+            bucket = self._buckets[epoch % self.window_days]
+            if bucket.epoch != epoch:
+                if bucket.epoch != -1:
+                    self._expire(bucket)
+                bucket.epoch = epoch
+            bucket.borrows[(library_id, book_id)] += borrows
+            network[book_id] += borrows
+            branch = self._branches.get(library_id)
+            if branch is None:
+                branch = self._branches[library_id] = RankedCounter()
+            branch.add(book_id, borrows)
+        for book_id, borrows in network.items():
+            self._network.add(book_id, borrows)
+
+    def record_denied(self, book_id: int):
+        # A patron wanted the title while no copy was free. They are not
+        # waiting unless they also place a hold.
+        with self._lock:
+            self._denied[book_id] = self._denied.get(book_id, 0) + 1
+
+    def set_waiting(self, book_id: int, count: int):
+        # Patrons queued for the title, as counted by its hold queue
+        with self._lock:
+            if count:
+                self._waiting[book_id] = count
+            else:
+                self._waiting.pop(book_id, None)
+
+    def record_available(self, book_id: int):
+        # A copy went back on the shelf, so the patrons turned away can be
+        # served again. Most returns follow no refusal and skip the lock.
+        if book_id not in self._denied:
+            return
+        with self._lock:
+            self._denied.pop(book_id, None)
+
+    def top_titles(
+        self, k: int = 100, library_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        # (book_id, borrows in the window), most borrowed first
+        with self._lock:
+            self._fold()
+            if library_id is None:
+                return self._network.top(k)
+            branch = self._branches.get(library_id)
+            return branch.top(k) if branch else []
+
+    def waiting(self, book_id: int) -> int:
+        return self._waiting.get(book_id, 0)
+
+    def denied(self, book_id: int) -> int:
+        return self._denied.get(book_id, 0)
+
+    def starved_titles(self) -> List[int]:
+        # Titles with every copy out and patrons waiting for one; holds can
+        # only be placed while no copy is free, and returned copies go to them
+        with self._lock:
+            return list(self._waiting)
@@ -0,0 +1,25 @@
+import csv
+import json
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+
+
+def read_rows(path: str) -> Iterator[Dict]:
+    # CSV with a header row, or one JSON object per line
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def chunked(rows: Iterable[Dict], chunk_size: int = 10_000) -> Iterator[List[Dict]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def read_chunks(path: str, chunk_size: int = 10_000) -> Iterator[List[Dict]]:
+    return chunked(read_rows(path), chunk_size)
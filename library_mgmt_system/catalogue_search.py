@@ -0,0 +1,338 @@
+import bisect
+import heapq
+import itertools
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+TITLE_WEIGHT = 2
+AUTHOR_WEIGHT = 1
+
+# Multi-term queries whose rarest term matches at most this many books start
+# from that term's books; above it, every term is read best first in turn
+FILTER_LIMIT = 8192
+
+# Up to this many candidates, every other term's tokens are intersected with
+# them outright rather than probed bucket by bucket
+FEW_CANDIDATES = 256
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+# Inverted index over book titles and authors. Every query term matches as a
+# prefix of an indexed token ("fitzg" finds "fitzgerald") and all terms must
+# match. Books are ranked by the summed idf weight of the tokens they matched,
+# with title hits counting double and exact hits beating prefix hits.
+#
+# Each token's books are also kept in impact buckets, one sorted id list per
+# weight. Every book in a bucket scores the same for that token, so search
+# reads books best first and stops once no unread book can reach the current
+# top k, instead of scoring every posting of every expanded term.
+class CatalogueIndex:
+    def __init__(self, max_expansions: int = 16, filter_limit: int = FILTER_LIMIT):
+        self.max_expansions = max_expansions
+        self.expansion_window = 16 * max_expansions
+        self.filter_limit = filter_limit
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.impacts: Dict[str, Dict[int, List[int]]] = {}
+        self.vocabulary: List[str] = []  # Sorted, for prefix ranges
+        self.book_count = 0
+
+    def add(self, book_id: int, title: str, author: str):
+        for token in self._index(book_id, title, author):
+            bisect.insort(self.vocabulary, token)
+
+    def add_many(self, books: Iterable[Tuple[int, str, str]]):
+        # New tokens are collected and merged into a copy of the vocabulary,
+        # which is swapped in once, so searches meanwhile keep the old one
+        tokens: List[str] = []
+        for book_id, title, author in books:
+            tokens += self._index(book_id, title, author)
+        tokens.sort()
+        # Both lists are sorted and disjoint, so the sort is a linear merge
+        vocabulary = self.vocabulary + tokens
+        vocabulary.sort()
+        self.vocabulary = vocabulary
+
+    def _index(self, book_id: int, title: str, author: str) -> List[str]:
+        # Adds the book's postings and returns its tokens new to the index
+        new_tokens = []
+        weights: Dict[str, int] = {}
+        for token in tokenize(title):
+            weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(author):
+            weights[token] = weights.get(token, 0) + AUTHOR_WEIGHT
+        for token, weight in weights.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                self.impacts[token] = {}
+                new_tokens.append(token)
+            postings[book_id] = weight
+            ids = self.impacts[token].setdefault(weight, [])
+            # Ids mostly arrive in order, so this is nearly always an append
+            if not ids or ids[-1] < book_id:
+                ids.append(book_id)
+            else:
+                bisect.insort(ids, book_id)
+        self.book_count += 1
+        return new_tokens
+
+    def _completions(self, term: str) -> Tuple[List[str], int, int]:
+        vocabulary = self.vocabulary
+        start = bisect.bisect_left(vocabulary, term)
+        return vocabulary, start, bisect.bisect_left(vocabulary, term + "￿", lo=start)
+
+    def _expand(self, term: str, every: bool = False) -> List[str]:
+        vocabulary, start, end = self._completions(term)
+        if every:
+            return vocabulary[start:end]
+        # Short prefixes can cover a large slice of the vocabulary; only the
+        # first completions in sort order (the exact token among them) are
+        # weighed, so expansion costs the same however short the term is
+        tokens = vocabulary[start : min(end, start + self.expansion_window)]
+        if len(tokens) > self.max_expansions:
+            # Keep the exact token and the most common completions
+            tokens = heapq.nlargest(
+                self.max_expansions,
+                tokens,
+                key=lambda token: (token == term, len(self.postings[token])),
+            )
+        return tokens
+
+    def _term_weights(
+        self, term: str, tokens: List[str]
+    ) -> List[Tuple[str, Dict[int, int], float]]:
+        book_count = self.book_count
+        weights = []
+        for token in tokens:
+            postings = self.postings[token]
+            idf = math.log(1 + book_count / len(postings))
+            weights.append((token, postings, idf * (1.0 if token == term else 0.5)))
+        return weights
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        results = self._search(terms, limit)
+        if len(results) < limit and any(
+            end - start > self.max_expansions
+            for _, start, end in map(self._completions, terms)
+        ):
+            # The completions left out may hold the missing matches
+            results = self._search(terms, limit, every=True)
+        return results
+
+    def _search(
+        self, terms: List[str], limit: int, every: bool = False
+    ) -> List[Tuple[int, float]]:
+        expanded = []
+        for term in terms:
+            tokens = self._expand(term, every)
+            size = sum(len(self.postings[token]) for token in tokens)
+            expanded.append((size, term, tokens))
+        # Rarest term first
+        expanded.sort(key=lambda item: item[0])
+        rarest_size, rarest_term, rarest_tokens = expanded[0]
+        if not rarest_tokens:
+            return []
+        if len(expanded) == 1 or rarest_size > self.filter_limit:
+            return self._search_threshold(
+                [self._term_weights(term, tokens) for _, term, tokens in expanded],
+                limit,
+            )
+        rarest = self._term_weights(rarest_term, rarest_tokens)
+        candidates = set().union(*(p.keys() for _, p, _ in rarest))
+        # Only tokens some candidate has can add to a score; a short prefix
+        # can have thousands of completions, most of them elsewhere
+        others = [
+            self._term_weights(
+                term,
+                [
+                    token
+                    for token in tokens
+                    if not self.postings[token].keys().isdisjoint(candidates)
+                ],
+            )
+            for _, term, tokens in expanded[1:]
+        ]
+        return self._search_rarest(rarest, candidates, others, limit)
+
+    def _ranked(
+        self,
+        weights: List[Tuple[str, Dict[int, int], float]],
+        candidates: Optional[Set[int]] = None,
+    ) -> Iterator[Tuple[float, int]]:
+        # A term's (score, book_id) hits from the highest score down and, at
+        # equal scores, in id order; a book can come up once per expansion
+        buckets = sorted(
+            (
+                (weight * idf, ids)
+                for token, _, idf in weights
+                for weight, ids in self.impacts[token].items()
+            ),
+            key=lambda bucket: bucket[0],
+            reverse=True,
+        )
+        for score, group in itertools.groupby(buckets, key=lambda bucket: bucket[0]):
+            id_lists = [ids for _, ids in group]
+            if candidates is not None:
+                id_lists = [sorted(candidates.intersection(ids)) for ids in id_lists]
+            merged = id_lists[0] if len(id_lists) == 1 else heapq.merge(*id_lists)
+            for book_id in merged:
+                yield score, book_id
+
+    def _search_threshold(
+        self, expanded: List[List[Tuple[str, Dict[int, int], float]]], limit: int
+    ) -> List[Tuple[int, float]]:
+        # Fagin's threshold algorithm: read every term's hits best first in
+        # turn, scoring each new book in full. A book not yet read scores at
+        # most the sum of the terms' current levels, and only ties it if it
+        # sits at that level in every term, past each one's current id.
+        streams = [self._ranked(weights) for weights in expanded]
+        levels = [0.0] * len(streams)
+        heads = [0] * len(streams)
+        top: List[Tuple[float, int]] = []  # Min-heap of (score, -book_id)
+        seen: Set[int] = set()
+        while True:
+            for position, stream in enumerate(streams):
+                hit = next(stream, None)
+                if hit is None:
+                    # Books matching every term are in every stream, so one
+                    # running dry means all of them have been read
+                    return _ranking(top)
+                levels[position], heads[position] = hit
+                book_id = heads[position]
+                if book_id in seen:
+                    continue
+                seen.add(book_id)
+                # Read for the first time, so this is its best hit for the term
+                score = 0.0
+                for other, weights in enumerate(expanded):
+                    best = (
+                        levels[other]
+                        if other == position
+                        else _term_score(book_id, weights)
+                    )
+                    if not best:
+                        break
+                    score += best
+                else:
+                    _offer(top, limit, score, book_id)
+            if len(top) == limit:
+                # Summed in the same order as the scores, so rounding can't
+                # put the threshold below a score it covers
+                threshold = 0.0
+                for level in levels:
+                    threshold += level
+                if (threshold, -max(heads)) < top[0]:
+                    return _ranking(top)
+
+    def _search_rarest(
+        self,
+        rarest: List[Tuple[str, Dict[int, int], float]],
+        candidates: Set[int],
+        others: List[List[Tuple[str, Dict[int, int], float]]],
+        limit: int,
+    ) -> List[Tuple[int, float]]:
+        # The rarest term's books are the candidates. Each other term's impact
+        # buckets are intersected with them in C, except buckets larger than
+        # the candidates: those belong to common, low-idf tokens and are
+        # probed per book instead, highest score first. Tokens no larger than
+        # the candidates, or any token when the candidates are few, are
+        # intersected with them whole.
+        few = len(candidates) <= FEW_CANDIDATES
+        terms = []
+        for weights in others:
+            hits: Dict[int, float] = {}
+            probes: List[Tuple[Dict[int, int], int, float]] = []
+            for token, postings, idf in weights:
+                if few or len(postings) <= len(candidates):
+                    # One intersection, iterating whichever side is smaller
+                    for book_id in postings.keys() & candidates:
+                        if postings[book_id] * idf > hits.get(book_id, 0.0):
+                            hits[book_id] = postings[book_id] * idf
+                    continue
+                for weight, ids in self.impacts[token].items():
+                    if len(ids) > len(candidates):
+                        probes.append((postings, weight, weight * idf))
+                        continue
+                    for book_id in candidates.intersection(ids):
+                        if weight * idf > hits.get(book_id, 0.0):
+                            hits[book_id] = weight * idf
+            probes.sort(key=lambda probe: probe[2], reverse=True)
+            terms.append((hits, probes))
+
+        def full_score(book_id: int, score: float) -> float:
+            # Added term by term, in the same order as the bounds below
+            for hits, probes in terms:
+                best = hits.get(book_id, 0.0)
+                for postings, weight, probe_score in probes:
+                    if probe_score <= best:
+                        break
+                    if postings.get(book_id) == weight:
+                        best = probe_score
+                        break
+                if not best:
+                    return 0.0
+                score += best
+            return score
+
+        # Books a term scores above its best probed bucket are scored first,
+        # so what is left of each term is bounded by that bucket
+        top: List[Tuple[float, int]] = []  # Min-heap of (score, -book_id)
+        seen: Set[int] = set()
+        floors = [probes[0][2] if probes else 0.0 for _, probes in terms]
+        for (hits, _), floor in zip(terms, floors):
+            for book_id, term_score in hits.items():
+                if term_score > floor and book_id not in seen:
+                    seen.add(book_id)
+                    if score := full_score(book_id, _term_score(book_id, rarest)):
+                        _offer(top, limit, score, book_id)
+        if not all(probes for _, probes in terms):
+            # A term without probed buckets has had every match scored
+            return _ranking(top)
+
+        # A book is first read at its best hit for the rarest term, and adding
+        # the other terms' floors caps everything not yet read
+        level = bound = None
+        for rarest_score, book_id in self._ranked(rarest, candidates):
+            if book_id in seen:
+                continue
+            seen.add(book_id)
+            if rarest_score != level:
+                level = bound = rarest_score
+                for floor in floors:
+                    bound += floor
+            if len(top) == limit and (bound, -book_id) < top[0]:
+                break
+            if score := full_score(book_id, rarest_score):
+                _offer(top, limit, score, book_id)
+        return _ranking(top)
+
+
+def _term_score(
+    book_id: int, weights: List[Tuple[str, Dict[int, int], float]]
+) -> float:
+    # A book's best weighted hit among a term's expansions, 0.0 for none
+    best = 0.0
+    for _, postings, idf in weights:
+        if (weight := postings.get(book_id)) and weight * idf > best:
+            best = weight * idf
+    return best
+
+
+def _offer(top: List[Tuple[float, int]], limit: int, score: float, book_id: int):
+    if len(top) < limit:
+        heapq.heappush(top, (score, -book_id))
+    elif (score, -book_id) > top[0]:
+        heapq.heapreplace(top, (score, -book_id))
+
+
+def _ranking(top: List[Tuple[float, int]]) -> List[Tuple[int, float]]:
+    return [(-neg_id, score) for score, neg_id in sorted(top, reverse=True)]
@@ -1,8 +1,18 @@
-from pydantic import BaseModel
-from core_enums import BookStatus, LibStatus, BorrowStatus
-
-from typing import Union
-from datetime import datetime
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from core_enums import BookStatus, LibStatus, BorrowStatus, LedgerEntryType
+from borrow_analytics import BorrowAnalytics
+from catalogue_search import CatalogueIndex
+from hold_queue import Hold, HoldQueues
+from lib_storage import InMemoryStorage, LibStorage
+from loan_ledger import LedgerEntry, LoanLedger
+from overdue_sweep import FINE_PER_DAY, LOAN_PERIOD, OverdueSweeper
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+import math
+import threading
+from contextlib import ExitStack
+from datetime import date, datetime
+from itertools import count
 
 
 class Book(BaseModel):
@@ -25,6 +35,8 @@ class Library(BaseModel):
     id: int
     name: str
     status: LibStatus
+    x: float = 0.0
+    y: float = 0.0
 
 
 class LibWallet(BaseModel):
@@ -38,9 +50,11 @@ class User:
     dues: float = 0.0
     borrowed_copy_id: list[int] = []
 
-    def __init__(self, id: int, name: str):
+    def __init__(self, id: int, name: str, home_library_id: Optional[int] = None):
         self.id = id
         self.name = name
+        self.home_library_id = home_library_id
+        self.borrowed_copy_id = []
 
     def request_book(self, book_id: int):
         pass
@@ -69,8 +83,21 @@ class BorrowRecord(BaseModel):
     due_amt: int = 0
 
 
+BOOK_LIST = TypeAdapter(List[Book])
+COPY_LIST = TypeAdapter(List[BookCopy])
+
+
+STAFF_LIST = TypeAdapter(List[Staff])
+LIBRARY_LIST = TypeAdapter(List[Library])
+WALLET_LIST = TypeAdapter(List[LibWallet])
+RECORD_LIST = TypeAdapter(List[BorrowRecord])
+
+
 class LibManagementSystem:
-    def __init__(self):
+    def __init__(
+        self, storage: Optional[LibStorage] = None, lock_stripes: int = 64
+    ):
+        self.storage = storage or InMemoryStorage()
         self.books = []
         self.book_copies = []
         self.libraries = []
@@ -79,75 +106,379 @@ class LibManagementSystem:
         self.lib_wallets = []
         self.borrow_records = []
 
+        # Indexes over the lists above, kept in step by every mutation
+        self._books_by_id: Dict[int, Book] = {}
+        self._copies_by_id: Dict[int, BookCopy] = {}
+        # Free copies per book and branch, the number of them sitting in open
+        # branches per book, and which books each branch holds copies of
+        self._free_copies: Dict[int, Dict[int, List[BookCopy]]] = {}
+        self._open_available: Dict[int, int] = {}
+        self._branch_books: Dict[int, Set[int]] = {}
+        self._libraries_by_id: Dict[int, Library] = {}
+        # Every branch's rank by distance from each branch, nearest first
+        self._branch_rank: Dict[int, Dict[int, int]] = {}
+        self._active_borrows: Dict[Tuple[int, int], BorrowRecord] = {}
+        self.catalogue = CatalogueIndex()
+        self._wallets_by_id: Dict[int, LibWallet] = {}
+        self._wallet_lock = threading.Lock()
+        self.ledger = LoanLedger(on_entry=self.storage.record_ledger_entry)
+        self.overdue = OverdueSweeper(on_fine=self.ledger.charge_fine)
+        self.analytics = BorrowAnalytics()
+        self.holds = HoldQueues()
+        # Borrow and return lock the book they touch, so terminals working on
+        # different titles run in parallel. Books share a fixed set of locks by
+        # id rather than getting one each.
+        self._book_locks = [threading.Lock() for _ in range(lock_stripes)]
+
+        self._load(self.storage.load())
+        self._record_ids = count(
+            max((record.id for record in self.borrow_records), default=0) + 1
+        )
+
+    def _load(self, rows: Dict[str, List[Dict]]):
+        for library in LIBRARY_LIST.validate_python(rows["libraries"]):
+            self._index_library(library)
+        self.staff_members = STAFF_LIST.validate_python(rows["staff"])
+        self.lib_wallets = WALLET_LIST.validate_python(rows["lib_wallets"])
+        self._wallets_by_id = {wallet.id: wallet for wallet in self.lib_wallets}
+        users_by_id = {}
+        for row in rows["users"]:
+            user = users_by_id[row["id"]] = User(
+                id=row["id"], name=row["name"], home_library_id=row["home_library_id"]
+            )
+            self.users.append(user)
+
+        self.books = BOOK_LIST.validate_python(rows["books"])
+        for book in self.books:
+            self._books_by_id[book.id] = book
+            self._open_available[book.id] = 0
+        self.catalogue.add_many(
+            (book.id, book.title, book.author) for book in self.books
+        )
+        for book_copy in COPY_LIST.validate_python(rows["book_copies"]):
+            self._add_book_copy(book_copy)
+
+        self.borrow_records = RECORD_LIST.validate_python(rows["borrow_records"])
+        for borrow_record in self.borrow_records:
+            self.analytics.record_borrow(
+                self._copies_by_id[borrow_record.book_copy_id].book_id,
+                self._copies_by_id[borrow_record.book_copy_id].library_id,
+                datetime.fromisoformat(borrow_record.borrow_date).timestamp(),
+            )
+            if borrow_record.status != BorrowStatus.RETURNED:
+                key = (borrow_record.user_id, borrow_record.book_copy_id)
+                self._active_borrows[key] = borrow_record
+                self.overdue.track(borrow_record)
+                if user := users_by_id.get(borrow_record.user_id):
+                    user.borrowed_copy_id.append(borrow_record.book_copy_id)
+        self.ledger.replay(
+            [
+                LedgerEntry(
+                    row["id"],
+                    row["user_id"],
+                    LedgerEntryType(row["entry_type"]),
+                    row["amount"],
+                    datetime.fromisoformat(row["created_at"]),
+                    row["borrow_record_id"],
+                    row["wallet_id"],
+                )
+                for row in rows["ledger_entries"]
+            ],
+            list(self._active_borrows.values()),
+        )
+
     def add_library(self, library: Library):
+        self.storage.add_library(library)
+        self._index_library(library)
+
+    def _index_library(self, library: Library):
         self.libraries.append(library)
+        self._libraries_by_id[library.id] = library
+        for origin in self.libraries:
+            # Branches at the same spot, e.g. all left at the default (0, 0),
+            # must still rank the origin itself first
+            nearest = sorted(
+                self.libraries,
+                key=lambda other: (
+                    math.hypot(other.x - origin.x, other.y - origin.y),
+                    other.id != origin.id,
+                ),
+            )
+            self._branch_rank[origin.id] = {
+                other.id: rank for rank, other in enumerate(nearest)
+            }
+
+    def _branch_open(self, library_id: int) -> bool:
+        # Copies filed under a branch that was never added count as open
+        library = self._libraries_by_id.get(library_id)
+        return library is None or library.status == LibStatus.OPEN
+
+    def set_library_status(self, library_id: int, status: LibStatus):
+        if not (library := self._libraries_by_id.get(library_id)):
+            raise ValueError("Library not found")
+        # Takes every book lock, so no borrow or return sees a half-updated
+        # set of counters
+        with ExitStack() as stack:
+            for lock in self._book_locks:
+                stack.enter_context(lock)
+            if library.status == status:
+                return
+            library.status = status
+            delta = 1 if status == LibStatus.OPEN else -1
+            for book_id in self._branch_books.get(library_id, ()):
+                free_copies = self._free_copies[book_id].get(library_id, ())
+                self._open_available[book_id] += delta * len(free_copies)
+            self.storage.update_library(library)
 
     def add_book(self, book: Book, library_id: int):
-        self.books.append(book)
-        self._add_book_copy(
+        book_copies = [
             BookCopy(
-                id=len(self.book_copies) + 1,
+                id=len(self.book_copies) + number,
                 book_id=book.id,
                 book_copy_status=BookStatus.AVAILABLE,
                 library_id=library_id,
             )
-        )
+            for number in range(1, book.total_copies + 1)
+        ]
+        self.storage.add_books([book], book_copies)
+        self.books.append(book)
+        self._books_by_id[book.id] = book
+        self._open_available.setdefault(book.id, 0)
+        self.catalogue.add(book.id, book.title, book.author)
+        for book_copy in book_copies:
+            self._add_book_copy(book_copy)
+
+    def import_books(self, chunks: Iterable[List[Dict]], library_id: int) -> int:
+        # Bulk load from catalogue_import.read_chunks(). Each chunk is
+        # validated in one TypeAdapter call instead of a model per row.
+        imported = 0
+        for rows in chunks:
+            try:
+                books = BOOK_LIST.validate_python(
+                    [
+                        {**row, "available_copies": row.get("total_copies")}
+                        for row in rows
+                    ]
+                )
+            except ValidationError as e:
+                error = e.errors()[0]
+                raise ValueError(
+                    f"Row {imported + error['loc'][0] + 1}: "
+                    f"{error['loc'][-1]} {error['msg']}"
+                ) from None
+            # Check the whole chunk before touching any index, so a bad row
+            # leaves nothing of its chunk behind
+            seen = set()
+            for offset, book in enumerate(books):
+                if book.id in self._books_by_id or book.id in seen:
+                    raise ValueError(
+                        f"Row {imported + offset + 1}: duplicate book id {book.id}"
+                    )
+                seen.add(book.id)
+
+            copy_rows = []
+            for book in books:
+                for _ in range(book.total_copies):
+                    copy_rows.append(
+                        {
+                            "id": len(self.book_copies) + len(copy_rows) + 1,
+                            "book_id": book.id,
+                            "book_copy_status": BookStatus.AVAILABLE,
+                            "library_id": library_id,
+                        }
+                    )
+            copies = COPY_LIST.validate_python(copy_rows)
+
+            self.storage.add_books(books, copies)
+            self.books.extend(books)
+            self.book_copies.extend(copies)
+            for book in books:
+                self._books_by_id[book.id] = book
+                self._open_available[book.id] = 0
+            for book_copy in copies:
+                self._index_copy(book_copy)
+            self.catalogue.add_many(
+                (book.id, book.title, book.author) for book in books
+            )
+            imported += len(books)
+        return imported
 
     def _add_book_copy(self, book_copy: BookCopy):
         self.book_copies.append(book_copy)
+        self._index_copy(book_copy)
+
+    def _index_copy(self, book_copy: BookCopy):
+        self._copies_by_id[book_copy.id] = book_copy
+        self._branch_books.setdefault(book_copy.library_id, set()).add(
+            book_copy.book_id
+        )
+        if book_copy.book_copy_status == BookStatus.AVAILABLE:
+            self._add_free_copy(book_copy)
+
+    def _add_free_copy(self, book_copy: BookCopy):
+        branches = self._free_copies.setdefault(book_copy.book_id, {})
+        branches.setdefault(book_copy.library_id, []).append(book_copy)
+        if self._branch_open(book_copy.library_id):
+            self._open_available[book_copy.book_id] = (
+                self._open_available.get(book_copy.book_id, 0) + 1
+            )
 
     def register_user(self, user: User):
+        self.storage.add_user(user)
         self.users.append(user)
 
     def register_staff(self, staff: Staff):
+        self.storage.add_staff(staff)
         self.staff_members.append(staff)
 
+    def add_wallet(self, wallet: LibWallet):
+        self.storage.add_wallet(wallet)
+        self.lib_wallets.append(wallet)
+        self._wallets_by_id[wallet.id] = wallet
+
+    def _wallet_for(self, library_id: int) -> LibWallet:
+        # Each branch collects into the wallet sharing its id
+        with self._wallet_lock:
+            if not (wallet := self._wallets_by_id.get(library_id)):
+                wallet = LibWallet(id=library_id)
+                self.add_wallet(wallet)
+            return wallet
+
+    def get_book(self, book_id: int) -> Union[Book, None]:
+        return self._books_by_id.get(book_id)
+
+    def get_book_copy(self, book_copy_id: int) -> Union[BookCopy, None]:
+        return self._copies_by_id.get(book_copy_id)
+
+    def search_books(self, query: str, limit: int = 10) -> List[Book]:
+        return [
+            self._books_by_id[book_id]
+            for book_id, _ in self.catalogue.search(query, limit)
+        ]
+
     def get_book_availability(self, book_id: int) -> bool:
-        if not (book := next((b for b in self.books if b.id == book_id), None)):
+        if book_id not in self._books_by_id:
             raise ValueError("Book not found")
-        elif book.available_copies > 0:
+        elif self._open_available[book_id] > 0:
             return True
         else:
             return False
 
-    def borrow_book(self, user: User, book_id: int):
+    def get_utilisation(self, book_id: int) -> float:
+        # Share of the title's copies currently out on loan
+        if not (book := self._books_by_id.get(book_id)):
+            raise ValueError("Book not found")
+        if not book.total_copies:
+            return 0.0
+        return (book.total_copies - book.available_copies) / book.total_copies
+
+    def get_top_titles(
+        self, k: int = 100, library_id: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        return self.analytics.top_titles(k, library_id)
+
+    def get_starved_titles(self) -> List[int]:
+        return self.analytics.starved_titles()
+
+    def get_network_availability(self, book_id: int) -> int:
+        # Free copies across all open branches
+        return self._open_available.get(book_id, 0)
+
+    def get_branch_availability(self, book_id: int, library_id: int) -> int:
+        if not self._branch_open(library_id):
+            return 0
+        return len(self._free_copies.get(book_id, {}).get(library_id, ()))
+
+    def _find_free_copy(
+        self, user: User, book_id: int, library_id: Optional[int]
+    ) -> Union[BookCopy, None]:
+        # From the requested branch only, or else from the open branch with
+        # stock nearest to the patron's home branch. The copy stays free
+        # until _take_free_copy.
+        branches = self._free_copies.get(book_id, {})
+        if library_id is None:
+            rank = self._branch_rank.get(user.home_library_id, {})
+            stocked = [
+                branch_id
+                for branch_id, copies in branches.items()
+                if copies and self._branch_open(branch_id)
+            ]
+            if not stocked:
+                return None
+            library_id = min(
+                stocked, key=lambda branch_id: rank.get(branch_id, math.inf)
+            )
+        elif not self._branch_open(library_id):
+            return None
+
+        free_copies = branches.get(library_id)
+        if not free_copies:
+            return None
+        return free_copies[-1]
+
+    def _take_free_copy(self, book_copy: BookCopy):
+        # Caller holds the book's lock and found the copy with _find_free_copy
+        self._free_copies[book_copy.book_id][book_copy.library_id].pop()
+        self._open_available[book_copy.book_id] -= 1
+
+    def _book_lock(self, book_id: int) -> threading.Lock:
+        return self._book_locks[book_id % len(self._book_locks)]
+
+    def borrow_book(
+        self, user: User, book_id: int, library_id: Optional[int] = None
+    ):
         print(f"User {user.name} is requesting to borrow book with id: {book_id}")
-        is_available = self.get_book_availability(book_id)
-        if not is_available:
-            raise ValueError("Book not available")
-
-        book_copy = next(
-            (
-                bc
-                for bc in self.book_copies
-                if bc.book_id == book_id and bc.book_copy_status == BookStatus.AVAILABLE
-            ),
-            None,
-        )
-        if not book_copy:
-            raise ValueError("No available copies")
+        with self._book_lock(book_id):
+            self._borrow_locked(user, book_id, library_id)
 
-        book_copy.book_copy_status = BookStatus.BORROWED
+    def _borrow_locked(self, user: User, book_id: int, library_id: Optional[int]):
+        # A copy waiting on the user's hold goes to them ahead of the shelf
+        if hold := self.holds.get_ready_hold(user.id, book_id):
+            book_copy = self._copies_by_id[hold.book_copy_id]
+        else:
+            is_available = self.get_book_availability(book_id)
+            if not is_available:
+                self.analytics.record_denied(book_id)
+                raise ValueError("Book not available")
+
+            book_copy = self._find_free_copy(user, book_id, library_id)
+            if book_copy is None:
+                raise ValueError("No available copies")
+
+        borrow_date = datetime.now()
         borrow_record = BorrowRecord(
-            id=len(self.borrow_records) + 1,
+            id=next(self._record_ids),
             user_id=user.id,
             book_copy_id=book_copy.id,
-            borrow_date=str(datetime.now()),
-            due_date=str(datetime.now()),
+            borrow_date=str(borrow_date),
+            due_date=str(borrow_date + LOAN_PERIOD),
         )
+        book = self._books_by_id[book_copy.book_id]
+        # Stored before anything in memory changes, so a borrow that fails to
+        # save leaves the copy, the hold and the counters as they were
+        self.storage.record_borrow(borrow_record, book.id)
+
+        if hold:
+            self.holds.claim(user.id, book_id)
+        else:
+            self._take_free_copy(book_copy)
+        book_copy.book_copy_status = BookStatus.BORROWED
 
         # update available copies count
-        book = next((b for b in self.books if b.id == book_copy.book_id), None)
-        if book:
-            book.available_copies -= 1
+        book.available_copies -= 1
 
         # Save borrow_record to database or in-memory list
         self.borrow_records.append(borrow_record)
+        self._active_borrows[(user.id, book_copy.id)] = borrow_record
+        self.ledger.open_loan(borrow_record)
+        self.analytics.record_borrow(book.id, book_copy.library_id)
+        self.overdue.track(borrow_record)
         user.borrowed_copy_id.append(book_copy.id)
 
     def _calc_penalty(self, borrow_record: BorrowRecord):
-        if penalty_days := (datetime.now() - borrow_record.due_date).days > 0:
-            borrow_record.due_amt = penalty_days * 10
+        due_date = datetime.fromisoformat(borrow_record.due_date)
+        if (penalty_days := (datetime.now() - due_date).days) > 0:
+            borrow_record.due_amt = penalty_days * FINE_PER_DAY
             return borrow_record.due_amt
         else:
             return 0.0
@@ -155,14 +486,62 @@ class LibManagementSystem:
     def _find_borrow_record(
         self, user_id: int, book_copy_id: int
     ) -> Union[BorrowRecord, None]:
-        return next(
-            (
-                br
-                for br in self.borrow_records
-                if br.user_id == user_id and br.book_copy_id == book_copy_id
-            ),
-            None,
-        )
+        return self._active_borrows.get((user_id, book_copy_id))
+
+    def _release_copy(self, book_copy: BookCopy):
+        # Hands a freed copy to the next hold on its book, or shelves it.
+        # Caller holds the book's lock. A held copy still counts in
+        # Book.available_copies, as it is not on loan, and storage records it
+        # as available, so holds that die with the process free their copies.
+        book_id = book_copy.book_id
+        if self.holds.hand_off(book_id, book_copy.id):
+            book_copy.book_copy_status = BookStatus.ON_HOLD
+            self.analytics.set_waiting(book_id, self.holds.waiting(book_id))
+        else:
+            book_copy.book_copy_status = BookStatus.AVAILABLE
+            self._add_free_copy(book_copy)
+            self.analytics.record_available(book_id)
+
+    def place_hold(self, user: User, book_id: int) -> Hold:
+        if book_id not in self._books_by_id:
+            raise ValueError("Book not found")
+        with self._book_lock(book_id):
+            if self.get_book_availability(book_id):
+                raise ValueError("Book is available to borrow")
+            hold = self.holds.place(user.id, book_id)
+            self.analytics.set_waiting(book_id, self.holds.waiting(book_id))
+        return hold
+
+    def cancel_hold(self, hold_id: int):
+        if not (hold := self.holds.holds.get(hold_id)):
+            raise ValueError("Hold not found")
+        with self._book_lock(hold.book_id):
+            self.holds.cancel(hold_id)
+            if hold.book_copy_id is not None:
+                self._release_copy(self._copies_by_id[hold.book_copy_id])
+            self.analytics.set_waiting(hold.book_id, self.holds.waiting(hold.book_id))
+
+    def get_ready_hold(self, user: User, book_id: int) -> Optional[Hold]:
+        return self.holds.get_ready_hold(user.id, book_id)
+
+    def expire_holds(self, now: Optional[datetime] = None) -> List[Hold]:
+        # Uncollected copies move on to the next hold in line
+        expired = []
+        for hold in self.holds.pop_expired(now or datetime.now()):
+            with self._book_lock(hold.book_id):
+                if self.holds.expire(hold):
+                    self._release_copy(self._copies_by_id[hold.book_copy_id])
+                    expired.append(hold)
+        return expired
+
+    def sweep_overdue(self, now: Optional[datetime] = None) -> List[BorrowRecord]:
+        newly_overdue = self.overdue.sweep(now)
+        if newly_overdue:
+            self.storage.update_borrow_records(newly_overdue)
+        return newly_overdue
+
+    def get_overdue_records(self) -> List[BorrowRecord]:
+        return self.overdue.get_overdue_records()
 
     def check_pending_dues(self, borrow_record: BorrowRecord) -> float:
         # lookup borrow_records
@@ -171,21 +550,72 @@ class LibManagementSystem:
         else:
             raise Exception("User Borrow Record Not Found")
 
-    def request_due_clearance(self, user, borrow_record: BorrowRecord, dues: float):
+    def get_user_dues(self, user_id: int) -> float:
+        return self.ledger.get_dues(user_id)
+
+    def get_loan_count(self, user_id: int) -> int:
+        return self.ledger.get_loan_count(user_id)
+
+    def get_daily_report(self, day: date) -> Dict[LedgerEntryType, float]:
+        return self.ledger.get_daily_report(day)
+
+    def pay_fines(self, user: User, amount: float, library_id: int) -> LedgerEntry:
+        return self.ledger.pay(user.id, amount, self._wallet_for(library_id))
+
+    def request_due_clearance(
+        self, user, borrow_record: BorrowRecord, dues: float
+    ) -> Optional[LedgerEntry]:
         print(f"User clearing due of amount: {dues}")
+        payment = None
+        # Part of the fine may already have been paid through pay_fines
+        if (amount := min(dues, self.ledger.get_dues(user.id))) > 0:
+            book_copy = self._copies_by_id[borrow_record.book_copy_id]
+            payment = self.pay_fines(user, amount, book_copy.library_id)
         borrow_record.due_amt = 0
+        return payment
+
+    def return_book(self, user: User, book_copy_id: int):
+        if not (book_copy := self._copies_by_id.get(book_copy_id)):
+            raise ValueError("Book copy not found")
+        with self._book_lock(book_copy.book_id):
+            self._return_locked(user, book_copy)
 
-    def return_book(self, user: User, book_copy: BookCopy):
+    def _return_locked(self, user: User, book_copy: BookCopy):
         borrow_record: Union[BorrowRecord, None] = self._find_borrow_record(
             user_id=user.id, book_copy_id=book_copy.id
         )
         if borrow_record is None:
             raise Exception("Borrow record not found!")
 
-        if (dues := self.check_pending_dues(borrow_record)) > 0:
-            self.request_due_clearance(user, borrow_record, dues)
-
-        book_copy.book_copy_status = BookStatus.AVAILABLE
-        self.books[book_copy.book_id].available_copies += 1
-
-        borrow_record.status = BorrowStatus.RETURNED
+        # The record is settled on a copy and stored with the fine and its
+        # payment before anything in memory changes. Sweeps leave the loan
+        # alone from here on, and it is tracked again if the write fails.
+        returned = borrow_record.model_copy(
+            update={"status": BorrowStatus.RETURNED, "return_date": str(datetime.now())}
+        )
+        wallet = None
+        if (dues := self.check_pending_dues(returned)) > 0:
+            print(f"User clearing due of amount: {dues}")
+            wallet = self._wallet_for(book_copy.library_id)
+            returned.due_amt = 0
+        self.overdue.untrack(borrow_record)
+        try:
+            self.ledger.close_loan(
+                borrow_record,
+                lambda entries: self.storage.record_return(
+                    returned, book_copy.book_id, entries
+                ),
+                dues,
+                wallet,
+            )
+        except BaseException:
+            self.overdue.track(borrow_record)
+            raise
+
+        borrow_record.status = returned.status
+        borrow_record.return_date = returned.return_date
+        borrow_record.due_amt = returned.due_amt
+        self._books_by_id[book_copy.book_id].available_copies += 1
+        self._release_copy(book_copy)
+        del self._active_borrows[(user.id, book_copy.id)]
+        user.borrowed_copy_id.remove(book_copy.id)
@@ -8,6 +8,7 @@ class UserRole(Enum):
 class BookStatus(Enum):
     AVAILABLE = "Available"
     BORROWED = "Borrowed"
+    ON_HOLD = "On Hold"
 
 class LibStatus(Enum):
     OPEN = "Open"
@@ -16,4 +17,15 @@ class LibStatus(Enum):
 class BorrowStatus(Enum):
     BORROWED = "Borrowed"
     RETURNED = "Returned"
-    OVERDUE = "Overdue"
\ No newline at end of file
+    OVERDUE = "Overdue"
+
+class LedgerEntryType(Enum):
+    FINE = "Fine"
+    PAYMENT = "Payment"
+
+class HoldStatus(Enum):
+    WAITING = "Waiting"
+    READY = "Ready"
+    FULFILLED = "Fulfilled"
+    EXPIRED = "Expired"
+    CANCELLED = "Cancelled"
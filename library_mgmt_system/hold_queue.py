@@ -0,0 +1,133 @@
+import heapq
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from core_enums import HoldStatus
+
+PICKUP_WINDOW = timedelta(days=2)
+
+
+class Hold:
+    __slots__ = (
+        "id",
+        "user_id",
+        "book_id",
+        "placed_at",
+        "status",
+        "book_copy_id",
+        "pickup_deadline",
+    )
+
+    def __init__(self, id: int, user_id: int, book_id: int, placed_at: datetime):
+        self.id = id
+        self.user_id = user_id
+        self.book_id = book_id
+        self.placed_at = placed_at
+        self.status = HoldStatus.WAITING
+        self.book_copy_id: Optional[int] = None
+        self.pickup_deadline: Optional[datetime] = None
+
+
+# FIFO hold queue per book. A returned copy goes straight to the oldest
+# waiting hold, which then has `pickup_window` to collect it before the copy
+# moves on to the next in line. Cancelled holds stay in their queue and are
+# skipped when they reach the front, and pickup deadlines sit in a min-heap,
+# so a return, a pickup and each expiry are all O(1) amortized (plus the heap
+# push) however long the queues get.
+class HoldQueues:
+    def __init__(self, pickup_window: timedelta = PICKUP_WINDOW):
+        self.pickup_window = pickup_window
+        self.holds: Dict[int, Hold] = {}
+        self._queues: Dict[int, Deque[Hold]] = {}
+        self._waiting_count: Dict[int, int] = {}
+        self._active: Set[Tuple[int, int]] = set()  # (user_id, book_id)
+        self._ready: Dict[Tuple[int, int], Hold] = {}
+        self._deadlines: List[Tuple[float, int]] = []
+        self._lock = threading.Lock()
+
+    def place(self, user_id: int, book_id: int) -> Hold:
+        with self._lock:
+            if (user_id, book_id) in self._active:
+                raise ValueError("Hold already placed")
+            hold = Hold(len(self.holds) + 1, user_id, book_id, datetime.now())
+            self.holds[hold.id] = hold
+            self._queues.setdefault(book_id, deque()).append(hold)
+            self._waiting_count[book_id] = self._waiting_count.get(book_id, 0) + 1
+            self._active.add((user_id, book_id))
+            return hold
+
+    def cancel(self, hold_id: int) -> Hold:
+        # Caller holds the book's lock
+        with self._lock:
+            if not (hold := self.holds.get(hold_id)):
+                raise ValueError("Hold not found")
+            if hold.status == HoldStatus.WAITING:
+                self._waiting_count[hold.book_id] -= 1
+            elif hold.status == HoldStatus.READY:
+                del self._ready[(hold.user_id, hold.book_id)]
+            else:
+                raise ValueError("Hold is no longer active")
+            hold.status = HoldStatus.CANCELLED
+            self._active.discard((hold.user_id, hold.book_id))
+            return hold
+
+    def waiting(self, book_id: int) -> int:
+        return self._waiting_count.get(book_id, 0)
+
+    def hand_off(self, book_id: int, book_copy_id: int) -> Optional[Hold]:
+        # Gives a freed copy to the oldest waiting hold, if there is one.
+        # Caller holds the book's lock.
+        with self._lock:
+            queue = self._queues.get(book_id)
+            while queue:
+                hold = queue.popleft()
+                if hold.status != HoldStatus.WAITING:
+                    continue
+                self._waiting_count[book_id] -= 1
+                hold.status = HoldStatus.READY
+                hold.book_copy_id = book_copy_id
+                hold.pickup_deadline = datetime.now() + self.pickup_window
+                self._ready[(hold.user_id, book_id)] = hold
+                heapq.heappush(
+                    self._deadlines, (hold.pickup_deadline.timestamp(), hold.id)
+                )
+                return hold
+            return None
+
+    def claim(self, user_id: int, book_id: int) -> Optional[Hold]:
+        # The user's ready hold on the book, marked fulfilled. Caller holds
+        # the book's lock.
+        with self._lock:
+            hold = self._ready.pop((user_id, book_id), None)
+            if hold is None:
+                return None
+            hold.status = HoldStatus.FULFILLED
+            self._active.discard((user_id, book_id))
+            return hold
+
+    def pop_expired(self, now: datetime) -> List[Hold]:
+        # Ready holds whose pickup window has closed. The caller expires each
+        # under its book's lock with expire(), which re-checks the hold.
+        now_ts = now.timestamp()
+        expired = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now_ts:
+                _, hold_id = heapq.heappop(self._deadlines)
+                hold = self.holds[hold_id]
+                if hold.status == HoldStatus.READY:
+                    expired.append(hold)
+        return expired
+
+    def expire(self, hold: Hold) -> bool:
+        with self._lock:
+            if hold.status != HoldStatus.READY:
+                return False
+            hold.status = HoldStatus.EXPIRED
+            del self._ready[(hold.user_id, hold.book_id)]
+            self._active.discard((hold.user_id, hold.book_id))
+            return True
+
+    def get_ready_hold(self, user_id: int, book_id: int) -> Optional[Hold]:
+        return self._ready.get((user_id, book_id))
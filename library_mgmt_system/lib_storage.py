@@ -0,0 +1,360 @@
+import sqlite3
+import threading
+from abc import ABC
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Sequence
+
+from core_enums import BookStatus
+
+from loan_ledger import LedgerEntry
+
+if TYPE_CHECKING:
+    from core_entities import (
+        Book,
+        BookCopy,
+        BorrowRecord,
+        LibWallet,
+        Library,
+        Staff,
+        User,
+    )
+
+TABLES = (
+    "libraries",
+    "books",
+    "book_copies",
+    "users",
+    "staff",
+    "lib_wallets",
+    "borrow_records",
+    "ledger_entries",
+)
+
+
+# Where LibManagementSystem persists its state. The system keeps working off
+# its in-memory lists and indexes and hands every mutation to its storage;
+# load() returns the stored rows per table so a new system can rebuild them.
+# The ledger entries a return gives rise to are passed along with it, to be
+# stored in the same transaction. Dues are not stored per user; they are
+# replayed from the ledger entries.
+class LibStorage(ABC):
+    def load(self) -> Dict[str, List[Dict]]:
+        return {table: [] for table in TABLES}
+
+    def add_library(self, library: "Library"):
+        pass
+
+    def update_library(self, library: "Library"):
+        pass
+
+    def add_books(self, books: List["Book"], book_copies: List["BookCopy"]):
+        pass
+
+    def add_user(self, user: "User"):
+        pass
+
+    def add_staff(self, staff: "Staff"):
+        pass
+
+    def add_wallet(self, wallet: "LibWallet"):
+        pass
+
+    def record_borrow(self, borrow_record: "BorrowRecord", book_id: int):
+        pass
+
+    def record_return(
+        self,
+        borrow_record: "BorrowRecord",
+        book_id: int,
+        entries: Sequence[LedgerEntry] = (),
+    ):
+        pass
+
+    def update_borrow_records(self, borrow_records: List["BorrowRecord"]):
+        pass
+
+    def record_ledger_entry(self, entry: LedgerEntry):
+        pass
+
+    def close(self):
+        pass
+
+
+# Nothing outlives the process
+class InMemoryStorage(LibStorage):
+    pass
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS libraries (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL, status TEXT NOT NULL,
+    x REAL NOT NULL DEFAULT 0, y REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY, title TEXT NOT NULL, author TEXT NOT NULL,
+    available_copies INTEGER NOT NULL, total_copies INTEGER NOT NULL,
+    borrowed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS book_copies (
+    id INTEGER PRIMARY KEY, book_id INTEGER NOT NULL,
+    book_copy_status TEXT NOT NULL, library_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS book_copies_by_book_status
+    ON book_copies (book_id, book_copy_status);
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL, home_library_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS staff (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL, role TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lib_wallets (
+    id INTEGER PRIMARY KEY, balance REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS borrow_records (
+    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL,
+    book_copy_id INTEGER NOT NULL, borrow_date TEXT NOT NULL,
+    due_date TEXT NOT NULL, return_date TEXT, status TEXT NOT NULL,
+    due_amt INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS borrow_records_by_user ON borrow_records (user_id);
+CREATE INDEX IF NOT EXISTS borrow_records_by_status ON borrow_records (status);
+CREATE TABLE IF NOT EXISTS ledger_entries (
+    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, entry_type TEXT NOT NULL,
+    amount REAL NOT NULL, created_at TEXT NOT NULL, borrow_record_id INTEGER,
+    wallet_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS ledger_entries_by_created_at
+    ON ledger_entries (created_at);
+"""
+
+INSERT_BOOK = (
+    "INSERT INTO books (id, title, author, available_copies, total_copies, borrowed) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+INSERT_COPY = (
+    "INSERT INTO book_copies (id, book_id, book_copy_status, library_id) "
+    "VALUES (?, ?, ?, ?)"
+)
+INSERT_RECORD = (
+    "INSERT INTO borrow_records (id, user_id, book_copy_id, borrow_date, due_date, "
+    "return_date, status, due_amt) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+UPDATE_RECORD = (
+    "UPDATE borrow_records SET return_date = ?, status = ?, due_amt = ? WHERE id = ?"
+)
+INSERT_LEDGER_ENTRY = (
+    "INSERT INTO ledger_entries (id, user_id, entry_type, amount, created_at, "
+    "borrow_record_id, wallet_id) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+UPDATE_COPY_STATUS = "UPDATE book_copies SET book_copy_status = ? WHERE id = ?"
+UPDATE_AVAILABLE = (
+    "UPDATE books SET available_copies = available_copies + ? WHERE id = ?"
+)
+
+
+# SQLite in WAL mode, so readers never wait on the writer. Each thread gets
+# its own connection, opened on first use and reused after that; the SQL is
+# fixed strings, which sqlite3 keeps prepared in each connection's statement
+# cache. A borrow or return is one short BEGIN IMMEDIATE transaction.
+class SQLiteStorage(LibStorage):
+    def __init__(self, path: str, busy_timeout: float = 30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=256,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def load(self) -> Dict[str, List[Dict]]:
+        conn = self._connection()
+        return {
+            table: [
+                dict(row) for row in conn.execute(f"SELECT * FROM {table} ORDER BY id")
+            ]
+            for table in TABLES
+        }
+
+    def add_library(self, library: "Library"):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO libraries (id, name, status, x, y) VALUES (?, ?, ?, ?, ?)",
+                (library.id, library.name, library.status.value, library.x, library.y),
+            )
+
+    def update_library(self, library: "Library"):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE libraries SET status = ? WHERE id = ?",
+                (library.status.value, library.id),
+            )
+
+    def add_books(self, books: List["Book"], book_copies: List["BookCopy"]):
+        with self._transaction() as conn:
+            conn.executemany(
+                INSERT_BOOK,
+                (
+                    (
+                        book.id,
+                        book.title,
+                        book.author,
+                        book.available_copies,
+                        book.total_copies,
+                        book.borrowed,
+                    )
+                    for book in books
+                ),
+            )
+            conn.executemany(
+                INSERT_COPY,
+                (
+                    (
+                        book_copy.id,
+                        book_copy.book_id,
+                        book_copy.book_copy_status.value,
+                        book_copy.library_id,
+                    )
+                    for book_copy in book_copies
+                ),
+            )
+
+    def add_user(self, user: "User"):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO users (id, name, home_library_id) VALUES (?, ?, ?)",
+                (user.id, user.name, user.home_library_id),
+            )
+
+    def add_staff(self, staff: "Staff"):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO staff (id, name, role) VALUES (?, ?, ?)",
+                (staff.id, staff.name, staff.role),
+            )
+
+    def add_wallet(self, wallet: "LibWallet"):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO lib_wallets (id, balance) VALUES (?, ?)",
+                (wallet.id, wallet.balance),
+            )
+
+    def record_borrow(self, borrow_record: "BorrowRecord", book_id: int):
+        with self._transaction() as conn:
+            conn.execute(
+                INSERT_RECORD,
+                (
+                    borrow_record.id,
+                    borrow_record.user_id,
+                    borrow_record.book_copy_id,
+                    borrow_record.borrow_date,
+                    borrow_record.due_date,
+                    borrow_record.return_date,
+                    borrow_record.status.value,
+                    borrow_record.due_amt,
+                ),
+            )
+            conn.execute(
+                UPDATE_COPY_STATUS,
+                (BookStatus.BORROWED.value, borrow_record.book_copy_id),
+            )
+            conn.execute(UPDATE_AVAILABLE, (-1, book_id))
+
+    def record_return(
+        self,
+        borrow_record: "BorrowRecord",
+        book_id: int,
+        entries: Sequence[LedgerEntry] = (),
+    ):
+        with self._transaction() as conn:
+            conn.execute(
+                UPDATE_RECORD,
+                (
+                    borrow_record.return_date,
+                    borrow_record.status.value,
+                    borrow_record.due_amt,
+                    borrow_record.id,
+                ),
+            )
+            conn.execute(
+                UPDATE_COPY_STATUS,
+                (BookStatus.AVAILABLE.value, borrow_record.book_copy_id),
+            )
+            conn.execute(UPDATE_AVAILABLE, (1, book_id))
+            for entry in entries:
+                _insert_ledger_entry(conn, entry)
+
+    def update_borrow_records(self, borrow_records: List["BorrowRecord"]):
+        with self._transaction() as conn:
+            conn.executemany(
+                UPDATE_RECORD,
+                (
+                    (
+                        borrow_record.return_date,
+                        borrow_record.status.value,
+                        borrow_record.due_amt,
+                        borrow_record.id,
+                    )
+                    for borrow_record in borrow_records
+                ),
+            )
+
+    def record_ledger_entry(self, entry: LedgerEntry):
+        with self._transaction() as conn:
+            _insert_ledger_entry(conn, entry)
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def _insert_ledger_entry(conn: sqlite3.Connection, entry: LedgerEntry):
+    # A payment and the wallet it lands in commit together
+    conn.execute(
+        INSERT_LEDGER_ENTRY,
+        (
+            entry.id,
+            entry.user_id,
+            entry.entry_type.value,
+            entry.amount,
+            entry.created_at.isoformat(),
+            entry.borrow_record_id,
+            entry.wallet_id,
+        ),
+    )
+    if entry.wallet_id is not None:
+        conn.execute(
+            "UPDATE lib_wallets SET balance = balance + ? WHERE id = ?",
+            (entry.amount, entry.wallet_id),
+        )
@@ -0,0 +1,199 @@
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional
+
+from core_enums import LedgerEntryType
+
+if TYPE_CHECKING:
+    from core_entities import BorrowRecord, LibWallet
+
+
+class LedgerEntry(NamedTuple):
+    id: int
+    user_id: int
+    entry_type: LedgerEntryType
+    amount: float
+    created_at: datetime
+    borrow_record_id: Optional[int] = None
+    wallet_id: Optional[int] = None
+
+
+class UserAccount:
+    __slots__ = ("active_loans", "dues", "total_fined", "total_paid")
+
+    def __init__(self):
+        self.active_loans = 0
+        self.dues = 0.0
+        self.total_fined = 0.0
+        self.total_paid = 0.0
+
+
+# Running per-user totals of open loans and outstanding fines, plus an
+# append-only log of every fine and payment. Fines are charged as deltas of a
+# record's due_amt, so the same fine is never charged twice however often it
+# is recomputed. Per-day totals are kept as entries are appended, so a daily
+# report never walks the log. Entries go to on_entry as they are made, except
+# those of close_loan(), which hands them to the caller to store alongside the
+# return.
+class LoanLedger:
+    def __init__(self, on_entry: Optional[Callable[[LedgerEntry], None]] = None):
+        self.on_entry = on_entry
+        self.accounts: Dict[int, UserAccount] = defaultdict(UserAccount)
+        self.entries: List[LedgerEntry] = []
+        self._charged: Dict[int, float] = {}
+        self._daily: Dict[date, Dict[LedgerEntryType, float]] = defaultdict(
+            lambda: dict.fromkeys(LedgerEntryType, 0.0)
+        )
+        self._lock = threading.Lock()
+
+    def open_loan(self, borrow_record: "BorrowRecord"):
+        with self._lock:
+            self.accounts[borrow_record.user_id].active_loans += 1
+            self._charged[borrow_record.id] = 0.0
+
+    def close_loan(
+        self,
+        borrow_record: "BorrowRecord",
+        store: Callable[[List[LedgerEntry]], None],
+        fine: float = 0.0,
+        wallet: Optional["LibWallet"] = None,
+    ) -> List[LedgerEntry]:
+        # Ends a loan returned with `fine` due on it: charges what is left of
+        # the fine and, given a wallet, takes payment into it of the user's
+        # dues up to the fine. The entries go to store first and are only
+        # applied once it returns, so a failed write leaves the ledger as it
+        # was.
+        with self._lock:
+            account = self.accounts[borrow_record.user_id]
+            charged = self._charged.get(borrow_record.id, 0.0)
+            entries = []
+            if fine > charged:
+                entries.append(
+                    self._entry(
+                        borrow_record.user_id,
+                        LedgerEntryType.FINE,
+                        fine - charged,
+                        borrow_record_id=borrow_record.id,
+                    )
+                )
+            # Part of the fine may already have been paid through pay()
+            amount = min(fine, account.dues + max(fine - charged, 0.0))
+            if wallet is not None and amount > 0:
+                entries.append(
+                    self._entry(
+                        borrow_record.user_id,
+                        LedgerEntryType.PAYMENT,
+                        amount,
+                        wallet_id=wallet.id,
+                        pending=len(entries),
+                    )
+                )
+            store(entries)
+            for entry in entries:
+                self._apply(entry)
+                if entry.wallet_id is not None:
+                    wallet.balance += entry.amount
+            account.active_loans -= 1
+            self._charged.pop(borrow_record.id, None)
+            return entries
+
+    def charge_fine(self, borrow_record: "BorrowRecord") -> Optional[LedgerEntry]:
+        with self._lock:
+            charged = self._charged.get(borrow_record.id)
+            if charged is None or borrow_record.due_amt <= charged:
+                return None
+            self._charged[borrow_record.id] = borrow_record.due_amt
+            return self._append(
+                borrow_record.user_id,
+                LedgerEntryType.FINE,
+                borrow_record.due_amt - charged,
+                borrow_record_id=borrow_record.id,
+            )
+
+    def pay(self, user_id: int, amount: float, wallet: "LibWallet") -> LedgerEntry:
+        # The dues, the wallet balance and the log change together or not at all
+        with self._lock:
+            if amount <= 0:
+                raise ValueError("Payment must be positive")
+            if amount > self.accounts[user_id].dues:
+                raise ValueError("Payment exceeds outstanding dues")
+            entry = self._append(
+                user_id,
+                LedgerEntryType.PAYMENT,
+                amount,
+                wallet_id=wallet.id,
+            )
+            wallet.balance += amount
+            return entry
+
+    def _append(
+        self,
+        user_id: int,
+        entry_type: LedgerEntryType,
+        amount: float,
+        borrow_record_id: Optional[int] = None,
+        wallet_id: Optional[int] = None,
+    ) -> LedgerEntry:
+        entry = self._entry(user_id, entry_type, amount, borrow_record_id, wallet_id)
+        if self.on_entry:
+            self.on_entry(entry)
+        self._apply(entry)
+        return entry
+
+    def _entry(
+        self,
+        user_id: int,
+        entry_type: LedgerEntryType,
+        amount: float,
+        borrow_record_id: Optional[int] = None,
+        wallet_id: Optional[int] = None,
+        pending: int = 0,
+    ) -> LedgerEntry:
+        # pending: entries made under the same lock but not applied yet, which
+        # take the ids before this one
+        return LedgerEntry(
+            len(self.entries) + pending + 1,
+            user_id,
+            entry_type,
+            amount,
+            datetime.now(),
+            borrow_record_id,
+            wallet_id,
+        )
+
+    def _apply(self, entry: LedgerEntry):
+        account = self.accounts[entry.user_id]
+        if entry.entry_type == LedgerEntryType.FINE:
+            account.dues += entry.amount
+            account.total_fined += entry.amount
+        else:
+            account.dues -= entry.amount
+            account.total_paid += entry.amount
+        self.entries.append(entry)
+        self._daily[entry.created_at.date()][entry.entry_type] += entry.amount
+
+    def replay(self, entries: List[LedgerEntry], open_loans: List["BorrowRecord"]):
+        # Rebuilds the totals from a stored log and the loans still out
+        with self._lock:
+            for entry in entries:
+                self._apply(entry)
+            fined: Dict[int, float] = defaultdict(float)
+            for entry in entries:
+                if entry.entry_type == LedgerEntryType.FINE:
+                    fined[entry.borrow_record_id] += entry.amount
+            for borrow_record in open_loans:
+                self.accounts[borrow_record.user_id].active_loans += 1
+                self._charged[borrow_record.id] = fined.get(borrow_record.id, 0.0)
+
+    def get_dues(self, user_id: int) -> float:
+        account = self.accounts.get(user_id)
+        return account.dues if account else 0.0
+
+    def get_loan_count(self, user_id: int) -> int:
+        account = self.accounts.get(user_id)
+        return account.active_loans if account else 0
+
+    def get_daily_report(self, day: date) -> Dict[LedgerEntryType, float]:
+        with self._lock:
+            return dict(self._daily.get(day) or dict.fromkeys(LedgerEntryType, 0.0))
@@ -0,0 +1,85 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
+
+from core_enums import BorrowStatus
+
+if TYPE_CHECKING:
+    from core_entities import BorrowRecord
+
+LOAN_PERIOD = timedelta(weeks=2)
+FINE_PER_DAY = 10
+DAY_SECONDS = 86400
+
+
+# Min-heap of active loans keyed by the next moment their fine changes: the
+# due date first, then every further full day late. A sweep pops only the
+# entries whose moment has passed, marks them OVERDUE, sets the fine for the
+# days late and pushes them back for the next day, so its cost depends on how
+# many loans crossed a boundary since the last sweep, not on how many are out.
+# Returned loans are noted by untrack() and dropped lazily when they reach the
+# top.
+class OverdueSweeper:
+    def __init__(
+        self,
+        fine_per_day: int = FINE_PER_DAY,
+        on_fine: Optional[Callable[["BorrowRecord"], None]] = None,
+    ):
+        self.fine_per_day = fine_per_day
+        self.on_fine = on_fine
+        self.overdue: Dict[int, "BorrowRecord"] = {}
+        self._heap: List[Tuple[float, int, float, "BorrowRecord"]] = []
+        self._returned: Set[int] = set()  # Ids still in the heap
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def track(self, borrow_record: "BorrowRecord"):
+        due = datetime.fromisoformat(borrow_record.due_date).timestamp()
+        with self._lock:
+            # A loan reloaded from storage may already be overdue, and sweep()
+            # only collects loans as they cross into it
+            if borrow_record.status == BorrowStatus.OVERDUE:
+                self.overdue[borrow_record.id] = borrow_record
+            # A loan whose return failed may still have its entry in the heap
+            if borrow_record.id in self._returned:
+                self._returned.discard(borrow_record.id)
+            else:
+                heapq.heappush(self._heap, (due, borrow_record.id, due, borrow_record))
+
+    def untrack(self, borrow_record: "BorrowRecord"):
+        # Taken under the sweep lock, so no sweep touches the loan once this
+        # returns; the caller marks the record itself returned
+        with self._lock:
+            self._returned.add(borrow_record.id)
+            self.overdue.pop(borrow_record.id, None)
+
+    def sweep(self, now: Optional[datetime] = None) -> List["BorrowRecord"]:
+        # Returns the records that became overdue during this sweep
+        now_ts = (now or datetime.now()).timestamp()
+        newly_overdue = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now_ts:
+                _, record_id, due, borrow_record = heapq.heappop(heap)
+                if record_id in self._returned:
+                    self._returned.discard(record_id)
+                    continue
+                days_late = int((now_ts - due) // DAY_SECONDS)
+                if (fine := days_late * self.fine_per_day) != borrow_record.due_amt:
+                    borrow_record.due_amt = fine
+                    if self.on_fine:
+                        self.on_fine(borrow_record)
+                if borrow_record.status != BorrowStatus.OVERDUE:
+                    borrow_record.status = BorrowStatus.OVERDUE
+                    self.overdue[record_id] = borrow_record
+                    newly_overdue.append(borrow_record)
+                next_fine = due + (days_late + 1) * DAY_SECONDS
+                heapq.heappush(heap, (next_fine, record_id, due, borrow_record))
+        return newly_overdue
+
+    def get_overdue_records(self) -> List["BorrowRecord"]:
+        with self._lock:
+            return list(self.overdue.values())
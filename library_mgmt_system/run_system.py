@@ -50,7 +50,7 @@ if __name__ == "__main__":
     library_system.borrow_book(user= user1, book_id=1)
     library_system.borrow_book(user=user2, book_id=2)
 
-    library_system.return_book(user=user1, book_copy_id=1)
-    library_system.return_book(user=user2, book_copy_id=2)
+    library_system.return_book(user=user1, book_copy_id=2)
+    library_system.return_book(user=user2, book_copy_id=4)
 
     print("Thank you for using the Library Management System!")
\ No newline at end of file
@@ -0,0 +1,110 @@
+import contextlib
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core_entities import LibManagementSystem, Library, User
+from core_enums import BookStatus, BorrowStatus
+
+
+def create_lib(book_count: int, copies_per_book: int, user_count: int):
+    lib = LibManagementSystem()
+    lib.add_library(Library(id=1, name="Stress Library", status="Open"))
+    lib.import_books(
+        [
+            [
+                {
+                    "id": book_id,
+                    "title": f"Title {book_id}",
+                    "author": f"Author {book_id}",
+                    "total_copies": copies_per_book,
+                }
+                for book_id in range(1, book_count + 1)
+            ]
+        ],
+        library_id=1,
+    )
+    for user_id in range(1, user_count + 1):
+        lib.register_user(User(id=user_id, name=f"User {user_id}"))
+    return lib
+
+
+def run_terminal(lib, terminal_id, operations, held, held_lock, errors):
+    rng = random.Random(terminal_id)
+    # Each terminal serves its own patrons, but they all compete for the
+    # same small catalogue
+    users = lib.users[terminal_id :: 64]
+    my_loans = []
+    for _ in range(operations):
+        if my_loans and rng.random() < 0.5:
+            user, copy_id = my_loans.pop(rng.randrange(len(my_loans)))
+            # Release before returning: the copy stays borrowed until the
+            # system takes it back, so no terminal can legitimately lend it
+            with held_lock:
+                held.pop(copy_id, None)
+            lib.return_book(user, copy_id)
+            continue
+
+        user = rng.choice(users)
+        book_id = rng.randrange(1, len(lib.books) + 1)
+        before = len(user.borrowed_copy_id)
+        try:
+            lib.borrow_book(user, book_id)
+        except ValueError:
+            continue
+        copy_id = user.borrowed_copy_id[before]
+        with held_lock:
+            if copy_id in held:
+                errors.append(f"Copy {copy_id} lent twice (also to {held[copy_id]})")
+            held[copy_id] = user.id
+        my_loans.append((user, copy_id))
+
+
+def check_consistency(lib, errors):
+    borrowed = {c.id for c in lib.book_copies if c.book_copy_status == BookStatus.BORROWED}
+    active = [r for r in lib.borrow_records if r.status != BorrowStatus.RETURNED]
+    if len(active) != len(borrowed) or {r.book_copy_id for r in active} != borrowed:
+        errors.append(f"{len(borrowed)} borrowed copies but {len(active)} open loans")
+    for book in lib.books:
+        free = sum(len(copies) for copies in lib._free_copies[book.id].values())
+        if not book.available_copies == free >= 0:
+            errors.append(
+                f"Book {book.id}: available_copies={book.available_copies}, "
+                f"{free} free copies"
+            )
+
+
+def run_stress_test(terminals: int = 8, operations: int = 20000):
+    lib = create_lib(book_count=32, copies_per_book=3, user_count=64 * 8)
+    held = {}
+    held_lock = threading.Lock()
+    errors = []
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=terminals) as pool:
+            futures = [
+                pool.submit(run_terminal, lib, t, operations, held, held_lock, errors)
+                for t in range(terminals)
+            ]
+            for future in futures:
+                future.result()
+    elapsed = time.perf_counter() - start
+
+    check_consistency(lib, errors)
+    print(
+        f"{terminals} terminals x {operations} ops in {elapsed:.2f}s "
+        f"({terminals * operations / elapsed:,.0f} ops/s), "
+        f"{len(lib._active_borrows)} copies still out"
+    )
+    for error in errors[:10]:
+        print(f"  ERROR: {error}")
+    print("No over-lending detected." if not errors else f"{len(errors)} errors!")
+    return not errors
+
+
+if __name__ == "__main__":
+    ok = all(run_stress_test(terminals=terminals) for terminals in (1, 2, 4, 8))
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,302 @@
+import math
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from parking_entry import ParkingEntry
+from parking_exit import ParkingExit
+from parking_enums import ParkingSlotType, VehicleType
+from parking_federation import ParkingFederation
+from parking_journal import TicketJournal, restore_service
+from parking_lot import ParkingLot
+from parking_metrics import ParkingMetrics
+from parking_reservation import ReservationBook
+from parking_scheduler import TimingWheel
+from parking_service import ParkingService
+from parking_strategy import NearestSpotStrategy
+from vehicle import Car, Motorcycle, Truck
+
+
+def create_parking_lot(slots_per_type: int = 1000, compact_slots: bool = False):
+    return ParkingLot(
+        name="Benchmark Parking",
+        id="BENCH-1",
+        address="1 Bench St",
+        slot_distribution={
+            ParkingSlotType.MOTORCYCLE: slots_per_type,
+            ParkingSlotType.COMPACT: slots_per_type,
+            ParkingSlotType.LARGE: slots_per_type,
+        },
+        compact_slots=compact_slots,
+    )
+
+
+def run_entries_and_exits(service, operations: int, seed: int = 7):
+    rng = random.Random(seed)
+    vehicle_types = [Car, Motorcycle, Truck]
+    open_tickets = []
+    for i in range(operations):
+        if open_tickets and rng.random() < 0.5:
+            ticket = open_tickets.pop(rng.randrange(len(open_tickets)))
+            service.unpark_vehicle(ticket.ticket_id)
+        else:
+            ticket = service.park_vehicle(rng.choice(vehicle_types)(f"BENCH-{i}"))
+            if ticket:
+                open_tickets.append(ticket)
+
+
+def benchmark_journal(operations: int = 20000, batch_sizes=(1, 8, 64, 512)):
+    print(f"Journal cost over {operations} entries/exits")
+
+    service = ParkingService(create_parking_lot(), NearestSpotStrategy())
+    start = time.perf_counter()
+    run_entries_and_exits(service, operations)
+    baseline = time.perf_counter() - start
+    print(f"  no journal      : {operations / baseline:>10,.0f} ops/s")
+
+    for batch_size in batch_sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            journal = TicketJournal(
+                directory, fsync_batch_size=batch_size, snapshot_every=5000
+            )
+            service = ParkingService(create_parking_lot(), NearestSpotStrategy(), journal)
+            start = time.perf_counter()
+            run_entries_and_exits(service, operations)
+            journal.close()
+            elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            restored = restore_service(
+                directory, create_parking_lot(), NearestSpotStrategy()
+            )
+            replay = time.perf_counter() - start
+            assert restored.tickets.keys() == service.tickets.keys()
+
+        print(
+            f"  fsync every {batch_size:<4}: {operations / elapsed:>10,.0f} ops/s "
+            f"({elapsed / baseline:.1f}x), restore {replay * 1000:.1f} ms"
+        )
+
+
+def benchmark_slot_store(sizes=(10_000, 100_000, 1_000_000)):
+    print("ParkingLot construction: per-object slots vs CompactSlotStore")
+    for size in sizes:
+        for compact in (False, True):
+            tracemalloc.start()
+            start = time.perf_counter()
+            lot = create_parking_lot(size // 3, compact_slots=compact)
+            elapsed = time.perf_counter() - start
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            service = ParkingService(lot, NearestSpotStrategy())
+            start = time.perf_counter()
+            run_entries_and_exits(service, 20000)
+            ops = 20000 / (time.perf_counter() - start)
+            del lot, service
+
+            layout = "compact " if compact else "objects "
+            print(
+                f"  {size:>9,} slots {layout}: build {elapsed * 1000:>8.1f} ms, "
+                f"{memory / 2**20:>7.1f} MiB ({memory / size:>5.0f} B/slot), "
+                f"{ops:>8,.0f} entries+exits/s"
+            )
+
+
+def benchmark_federation(lot_counts=(1000, 5000), queries: int = 20000):
+    print("Nearest lot with a free compatible slot")
+    vehicle_types = list(VehicleType)
+    for lot_count in lot_counts:
+        rng = random.Random(lot_count)
+        federation = ParkingFederation(cell_size=1.0)
+        city_size = math.sqrt(lot_count) * 2
+        for i in range(lot_count):
+            lot = ParkingLot(
+                name=f"Lot {i}",
+                id=f"LOT-{i}",
+                address=f"{i} City Rd",
+                slot_distribution={
+                    ParkingSlotType.MOTORCYCLE: 2,
+                    ParkingSlotType.COMPACT: 2,
+                    ParkingSlotType.LARGE: 1,
+                    ParkingSlotType.ELECTRIC: rng.choice([0, 1]),
+                },
+            )
+            federation.add_lot(
+                ParkingService(lot, NearestSpotStrategy()),
+                rng.uniform(0, city_size),
+                rng.uniform(0, city_size),
+            )
+        # Fill most of the city so lookups have to skip full lots
+        for i in range(lot_count * 4):
+            federation.park_vehicle(
+                rng.choice([Car, Motorcycle, Truck])(f"FILL-{i}"),
+                rng.uniform(0, city_size),
+                rng.uniform(0, city_size),
+            )
+
+        points = [
+            (rng.choice(vehicle_types), rng.uniform(0, city_size), rng.uniform(0, city_size))
+            for _ in range(queries)
+        ]
+        start = time.perf_counter()
+        found = [federation.find_nearest_lot(vt, x, y) for vt, x, y in points]
+        indexed = time.perf_counter() - start
+
+        lots = list(federation.lots.values())
+        start = time.perf_counter()
+        for (vt, x, y), expected in zip(points[:2000], found):
+            best = min(
+                (f for f in lots if f.service.can_accept(vt)),
+                key=lambda f: math.hypot(f.x - x, f.y - y),
+                default=None,
+            )
+            assert (best and math.hypot(best.x - x, best.y - y)) == (
+                expected and math.hypot(expected.x - x, expected.y - y)
+            )
+        linear = (time.perf_counter() - start) / 2000 * queries
+
+        print(
+            f"  {lot_count:>6,} lots: grid {queries / indexed:>9,.0f} queries/s, "
+            f"linear scan {queries / linear:>7,.0f} queries/s"
+        )
+
+
+def benchmark_batch(batch_sizes=(1000, 10000, 100000)):
+    print("Entering and settling a batch: one call per vehicle vs batch API")
+    # Batch pricing imports numpy on first use; keep that one-off cost out of
+    # the timings
+    import numpy
+
+    for batch_size in batch_sizes:
+        rng = random.Random(batch_size)
+        vehicles = [
+            rng.choice([Car, Motorcycle, Truck])(f"BATCH-{i}") for i in range(batch_size)
+        ]
+        exit_time = datetime.now() + timedelta(hours=3)
+
+        service = ParkingService(create_parking_lot(batch_size), NearestSpotStrategy())
+        entry, exit_gate = ParkingEntry("ENTRY-1", service), ParkingExit("EXIT-1", service)
+        start = time.perf_counter()
+        tickets = [entry.process_vehicle_entry(vehicle) for vehicle in vehicles]
+        for ticket in tickets:
+            service.unpark_vehicle(ticket.ticket_id, exit_time)
+            exit_gate.process_payment(ticket, "CASH")
+        single = time.perf_counter() - start
+
+        service = ParkingService(create_parking_lot(batch_size), NearestSpotStrategy())
+        entry, exit_gate = ParkingEntry("ENTRY-1", service), ParkingExit("EXIT-1", service)
+        start = time.perf_counter()
+        tickets = entry.park_vehicles(vehicles)
+        exit_gate.settle_tickets([ticket.ticket_id for ticket in tickets], exit_time)
+        batch = time.perf_counter() - start
+
+        print(
+            f"  {batch_size:>7,} vehicles: single {batch_size / single:>9,.0f}/s, "
+            f"batch {batch_size / batch:>9,.0f}/s ({single / batch:.1f}x)"
+        )
+
+
+def benchmark_metrics(operations: int = 50000, queries: int = 1000):
+    print("Metrics overhead on entries/exits and cost of a 60 minute query")
+    service = ParkingService(create_parking_lot(), NearestSpotStrategy())
+    start = time.perf_counter()
+    run_entries_and_exits(service, operations)
+    baseline = time.perf_counter() - start
+
+    lot = create_parking_lot()
+    metrics = ParkingMetrics(lot, bucket_seconds=1, bucket_count=3600)
+    service = ParkingService(lot, NearestSpotStrategy(), metrics=metrics)
+    start = time.perf_counter()
+    run_entries_and_exits(service, operations)
+    with_metrics = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        metrics.occupancy_series(ParkingSlotType.COMPACT, 60)
+        metrics.turnover_rate(60)
+        metrics.average_dwell_seconds(60)
+    query = (time.perf_counter() - start) / queries
+
+    print(
+        f"  {operations / baseline:,.0f} ops/s without metrics, "
+        f"{operations / with_metrics:,.0f} ops/s with metrics, "
+        f"{query * 1000:.2f} ms per dashboard refresh"
+    )
+
+
+def benchmark_timing_wheel(open_tickets=(10_000, 100_000, 1_000_000)):
+    print("Per-second overstay check: timing wheel tick vs scanning open tickets")
+    for count in open_tickets:
+        rng = random.Random(count)
+        wheel = TimingWheel(tick_seconds=1.0, start_time=0)
+        deadlines = [rng.uniform(0, 86400) for _ in range(count)]
+        fired = []
+        start = time.perf_counter()
+        for deadline in deadlines:
+            wheel.schedule(deadline, lambda: fired.append(1))
+        schedule = (time.perf_counter() - start) / count
+
+        start = time.perf_counter()
+        wheel.advance(3600)
+        tick = (time.perf_counter() - start) / 3600
+
+        start = time.perf_counter()
+        overdue = sum(1 for deadline in deadlines if deadline <= 3600)
+        scan = time.perf_counter() - start
+
+        print(
+            f"  {count:>9,} open: schedule {schedule * 1e6:.2f} us, "
+            f"tick {tick * 1e6:>7.1f} us, full scan {scan * 1e6:>9.0f} us"
+        )
+
+
+def benchmark_reservations(counts=(10_000, 50_000), slots_per_type: int = 300):
+    print(f"Booking reservations in a {slots_per_type * 3}-slot lot over 30 days")
+    for count in counts:
+        rng = random.Random(count)
+        book = ReservationBook(create_parking_lot(slots_per_type))
+        base = datetime.now() + timedelta(days=1)
+        vehicle_types = [VehicleType.SMALL, VehicleType.MEDIUM, VehicleType.LARGE]
+        requests = []
+        for _ in range(count):
+            start = base + timedelta(minutes=rng.randrange(30 * 24 * 60))
+            end = start + timedelta(minutes=rng.randrange(30, 600))
+            requests.append((rng.choice(vehicle_types), start, end))
+
+        start_time = time.perf_counter()
+        booked = sum(
+            1
+            for i, (vehicle_type, start, end) in enumerate(requests)
+            if book.book(f"RES-{i}", vehicle_type, start, end)
+        )
+        elapsed = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for vehicle_type, start, end in requests[:1000]:
+            book.is_available(vehicle_type, start, end)
+        query = (time.perf_counter() - start_time) / 1000
+
+        print(
+            f"  {count:>7,} requests: {booked:,} booked at {count / elapsed:,.0f}/s, "
+            f"availability check {query * 1e6:,.0f} us"
+        )
+
+
+BENCHMARKS = {
+    "journal": benchmark_journal,
+    "slot_store": benchmark_slot_store,
+    "federation": benchmark_federation,
+    "batch": benchmark_batch,
+    "metrics": benchmark_metrics,
+    "timing_wheel": benchmark_timing_wheel,
+    "reservations": benchmark_reservations,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
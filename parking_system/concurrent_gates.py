@@ -0,0 +1,58 @@
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from parking_entry import ParkingEntry
+from parking_exit import ParkingExit
+from parking_ticket import ParkingTicket
+from vehicle import Vehicle
+
+
+# Every gate gets its own worker thread: a gate handles one vehicle at a time,
+# like a real barrier, while separate gates run in parallel against the shared
+# ParkingService.
+class ConcurrentGates:
+    def __init__(self, entries: List[ParkingEntry], exits: List[ParkingExit]):
+        self.entries = entries
+        self.exits = exits
+        self._entry_workers = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=entry.entry_id)
+            for entry in entries
+        ]
+        self._exit_workers = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=exit_gate.exit_id)
+            for exit_gate in exits
+        ]
+        self._next_entry = itertools.count()
+        self._next_exit = itertools.count()
+
+    def submit_entry(
+        self, vehicle: Vehicle, gate_index: Optional[int] = None
+    ) -> "Future[Optional[ParkingTicket]]":
+        if gate_index is None:
+            gate_index = next(self._next_entry) % len(self.entries)
+        return self._entry_workers[gate_index].submit(
+            self.entries[gate_index].process_vehicle_entry, vehicle
+        )
+
+    def submit_exit(
+        self,
+        ticket_id: str,
+        payment_method: str = "CASH",
+        gate_index: Optional[int] = None,
+    ) -> "Future[bool]":
+        if gate_index is None:
+            gate_index = next(self._next_exit) % len(self.exits)
+        return self._exit_workers[gate_index].submit(
+            self.exits[gate_index].process_vehicle_exit, ticket_id, payment_method
+        )
+
+    def shutdown(self, wait: bool = True):
+        for worker in self._entry_workers + self._exit_workers:
+            worker.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
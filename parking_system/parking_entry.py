@@ -1,9 +1,10 @@
 import logging
+import time
 from vehicle import Vehicle
 from parking_service import ParkingService
 from parking_ticket import ParkingTicket
 
-from typing import Optional
+from typing import List, Optional
 
 
 class ParkingEntry:
@@ -19,15 +20,42 @@ class ParkingEntry:
         self.checkpoint_open = False
 
     def process_vehicle_entry(self, vehicle: Vehicle) -> Optional[ParkingTicket]:
+        start = time.perf_counter()
+        ticket = self._process_vehicle_entry(vehicle)
+        if self.parking_service.metrics:
+            self.parking_service.metrics.entry_latency.record(
+                time.perf_counter() - start
+            )
+        return ticket
+
+    def _process_vehicle_entry(self, vehicle: Vehicle) -> Optional[ParkingTicket]:
+        # Turn the vehicle away without touching any slot if nothing fits
+        if not self.parking_service.can_accept(vehicle.vehicle_type):
+            logging.warning("No available slots for vehicle %s.", vehicle.license_plate)
+            return None
+
         self.open_checkpoint()
         ticket = self.parking_service.park_vehicle(vehicle)
         self.close_checkpoint()
 
         if ticket:
             logging.info(
-                f"Vehicle {vehicle.license_plate} parked in slot {ticket.slot.slot_id}."
+                "Vehicle %s parked in slot %s.",
+                vehicle.license_plate,
+                ticket.slot.slot_id,
             )
             return ticket
         else:
-            logging.warning(f"No available slots for vehicle {vehicle.license_plate}.")
+            logging.warning("No available slots for vehicle %s.", vehicle.license_plate)
             return None
+
+    def park_vehicles(self, vehicles: List[Vehicle]) -> List[Optional[ParkingTicket]]:
+        self.open_checkpoint()
+        tickets = self.parking_service.park_vehicles(vehicles)
+        self.close_checkpoint()
+
+        parked = sum(1 for ticket in tickets if ticket)
+        logging.info(
+            "%d of %d vehicles parked via %s.", parked, len(vehicles), self.entry_id
+        )
+        return tickets
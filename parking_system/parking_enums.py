@@ -18,6 +18,16 @@ class ParkingSlotType(Enum):
 class SlotStatus(Enum):
     OCCUPIED = "Occupied"
     AVAILABLE = "Available"
+    RESERVED = "Reserved"  # Held for a reservation that is due
+
+
+class ReservationStatus(Enum):
+    BOOKED = "Booked"
+    HELD = "Held"
+    FULFILLED = "Fulfilled"
+    BUMPED = "Bumped"  # A walk-in still had the slot when the vehicle arrived
+    EXPIRED = "Expired"
+    CANCELLED = "Cancelled"
 
 
 class ParkingLotStatus(Enum):
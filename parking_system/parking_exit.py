@@ -1,12 +1,27 @@
 import logging
+import time
 from parking_service import ParkingService
+from parking_tariff import HourlyTariff, Tariff
 from parking_ticket import ParkingTicket
 
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Below this many tickets a batch is priced one ticket at a time: numpy's
+# per-call overhead outweighs what vectorising saves
+BATCH_PRICING_MIN = 128
+
 
 class ParkingExit:
-    def __init__(self, exit_id: str, parking_service: ParkingService):
+    def __init__(
+        self,
+        exit_id: str,
+        parking_service: ParkingService,
+        tariff: Optional[Tariff] = None,
+    ):
         self.exit_id = exit_id
         self.parking_service = parking_service
+        self.tariff = tariff or HourlyTariff(10.0)  # $10 per hour
         self.checkpoint_open = False
 
     def open_checkpoint(self):
@@ -16,26 +31,58 @@ class ParkingExit:
         self.checkpoint_open = False
 
     def process_payment(self, ticket: ParkingTicket, payment_method: str) -> bool:
-        duration = ticket.get_duration_hours()
-        charge = 10 * duration  # $10 per hour
+        charge = self.tariff.compute_fee(ticket)
         logging.info(
-            f"Payment of ${charge:.2f} received for vehicle {ticket.vehicle.license_plate} via {payment_method}."
+            "Payment of $%.2f received for vehicle %s via %s.",
+            charge,
+            ticket.vehicle.license_plate,
+            payment_method,
         )
         return True
 
     def process_vehicle_exit(
         self, ticket_id: str, payment_method: str = "CASH"
     ) -> bool:
+        start = time.perf_counter()
+        exited = self._process_vehicle_exit(ticket_id, payment_method)
+        if self.parking_service.metrics:
+            self.parking_service.metrics.exit_latency.record(
+                time.perf_counter() - start
+            )
+        return exited
+
+    def _process_vehicle_exit(self, ticket_id: str, payment_method: str) -> bool:
         ticket = self.parking_service.unpark_vehicle(ticket_id)
         if not ticket:
-            logging.error(f"Ticket {ticket_id} not found.")
+            logging.error("Ticket %s not found.", ticket_id)
             return False
 
         if not self.process_payment(ticket, payment_method):
-            logging.error(f"Payment failed for ticket {ticket_id}. Exit Denied.")
+            logging.error("Payment failed for ticket %s. Exit Denied.", ticket_id)
             return False
 
         self.open_checkpoint()
         self.close_checkpoint()
-        logging.info(f"Vehicle {ticket.vehicle.license_plate} exited successfully.")
+        logging.info("Vehicle %s exited successfully.", ticket.vehicle.license_plate)
         return True
+
+    def settle_tickets(
+        self, ticket_ids: List[str], exit_time: Optional[datetime] = None
+    ) -> Dict[str, float]:
+        # Closes a batch of tickets and prices them all in one tariff call
+        tickets = self.parking_service.unpark_vehicles(ticket_ids, exit_time)
+        if len(tickets) < BATCH_PRICING_MIN:
+            fees = [self.tariff.compute_fee(ticket) for ticket in tickets]
+        else:
+            fees = self.tariff.compute_ticket_fees(tickets)
+        settled = {
+            ticket.ticket_id: float(fee) for ticket, fee in zip(tickets, fees)
+        }
+        logging.info(
+            "Settled %d of %d tickets for $%.2f via %s.",
+            len(settled),
+            len(ticket_ids),
+            sum(settled.values()),
+            self.exit_id,
+        )
+        return settled
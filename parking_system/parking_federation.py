@@ -0,0 +1,207 @@
+import math
+import threading
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from parking_enums import ParkingSlotType, VehicleType
+from parking_lot import ParkingLot, ParkingLotListener
+from parking_service import ParkingService
+from parking_ticket import ParkingTicket
+from slot import COMPATIBLE_SLOT_TYPES, Slot
+from vehicle import Vehicle
+
+Cell = Tuple[int, int]
+
+# Vehicle types whose can_accept answer may change when a slot type fills up
+# or frees up
+_AFFECTED_VEHICLE_TYPES: Dict[ParkingSlotType, list] = {
+    slot_type: [
+        vehicle_type
+        for vehicle_type, slot_types in COMPATIBLE_SLOT_TYPES.items()
+        if slot_type in slot_types
+    ]
+    for slot_type in ParkingSlotType
+}
+
+
+class FederatedLot:
+    def __init__(self, service: ParkingService, x: float, y: float, cell: Cell):
+        self.service = service
+        self.x = x
+        self.y = y
+        self.cell = cell
+
+    @property
+    def lot_id(self) -> str:
+        return self.service.parking_lot.id
+
+
+# Routes vehicles across many lots. Lots are bucketed into a uniform grid of
+# `cell_size` squares, and for each vehicle type the grid only holds lots that
+# can currently accept it. A lookup searches rings of cells outwards from the
+# vehicle and stops once no unvisited ring can hold anything nearer, so full
+# lots and far-away lots are never looked at.
+class ParkingFederation(ParkingLotListener):
+    def __init__(self, cell_size: float = 1.0):
+        self.cell_size = cell_size
+        self.lots: Dict[str, FederatedLot] = {}
+        self._accepting: Dict[VehicleType, Dict[Cell, Set[str]]] = {
+            vehicle_type: {} for vehicle_type in VehicleType
+        }
+        self._ticket_lots: Dict[str, str] = {}
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+        self._lock = threading.RLock()
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def add_lot(self, service: ParkingService, x: float, y: float):
+        lot = service.parking_lot
+        with self._lock:
+            if lot.id in self.lots:
+                raise ValueError(f"Lot {lot.id} already registered")
+            federated = FederatedLot(service, x, y, self._cell(x, y))
+            self.lots[lot.id] = federated
+            self._extend_bounds(federated.cell)
+            for vehicle_type in VehicleType:
+                self._refresh(federated, vehicle_type)
+        lot.add_listener(self)
+
+    def remove_lot(self, lot_id: str):
+        with self._lock:
+            federated = self.lots.pop(lot_id)
+            for cells in self._accepting.values():
+                lot_ids = cells.get(federated.cell)
+                if lot_ids:
+                    lot_ids.discard(lot_id)
+                    if not lot_ids:
+                        del cells[federated.cell]
+        federated.service.parking_lot.remove_listener(self)
+
+    def _extend_bounds(self, cell: Cell):
+        if self._bounds is None:
+            self._bounds = (cell[0], cell[0], cell[1], cell[1])
+            return
+        min_x, max_x, min_y, max_y = self._bounds
+        self._bounds = (
+            min(min_x, cell[0]),
+            max(max_x, cell[0]),
+            min(min_y, cell[1]),
+            max(max_y, cell[1]),
+        )
+
+    def _refresh(self, federated: FederatedLot, vehicle_type: VehicleType):
+        cells = self._accepting[vehicle_type]
+        if federated.service.can_accept(vehicle_type):
+            cells.setdefault(federated.cell, set()).add(federated.lot_id)
+        elif federated.cell in cells:
+            lot_ids = cells[federated.cell]
+            lot_ids.discard(federated.lot_id)
+            if not lot_ids:
+                del cells[federated.cell]
+
+    def _on_availability_change(self, parking_lot: ParkingLot, slot: Slot):
+        with self._lock:
+            federated = self.lots.get(parking_lot.id)
+            if federated is None:
+                return
+            for vehicle_type in _AFFECTED_VEHICLE_TYPES[slot.slot_type]:
+                self._refresh(federated, vehicle_type)
+
+    def on_slot_occupied(self, parking_lot: ParkingLot, slot: Slot):
+        # Only the last free slot of a type changes what the lot can accept
+        if parking_lot.get_availability()[slot.slot_type] == 0:
+            self._on_availability_change(parking_lot, slot)
+
+    def on_slot_vacated(self, parking_lot: ParkingLot, slot: Slot, duration: float):
+        self._on_slot_freed(parking_lot, slot)
+
+    def _on_slot_freed(self, parking_lot: ParkingLot, slot: Slot):
+        # A freed slot can only make the lot accept more. The availability
+        # count is read after the fact, so racing vacates out of a full type
+        # may never see it at 1; check whether the lot is missing from the
+        # grid for an affected vehicle type instead.
+        with self._lock:
+            federated = self.lots.get(parking_lot.id)
+            if federated is None:
+                return
+            for vehicle_type in _AFFECTED_VEHICLE_TYPES[slot.slot_type]:
+                lot_ids = self._accepting[vehicle_type].get(federated.cell, ())
+                if federated.lot_id not in lot_ids:
+                    self._refresh(federated, vehicle_type)
+
+    def on_slot_held(self, parking_lot: ParkingLot, slot: Slot):
+        self.on_slot_occupied(parking_lot, slot)
+
+    def on_slot_released(self, parking_lot: ParkingLot, slot: Slot):
+        self._on_slot_freed(parking_lot, slot)
+
+    def _ring(self, center: Cell, radius: int) -> Iterator[Cell]:
+        cx, cy = center
+        if radius == 0:
+            yield center
+            return
+        for dx in range(-radius, radius + 1):
+            yield (cx + dx, cy - radius)
+            yield (cx + dx, cy + radius)
+        for dy in range(-radius + 1, radius):
+            yield (cx - radius, cy + dy)
+            yield (cx + radius, cy + dy)
+
+    def _max_radius(self, center: Cell) -> int:
+        min_x, max_x, min_y, max_y = self._bounds
+        return max(
+            abs(center[0] - min_x),
+            abs(center[0] - max_x),
+            abs(center[1] - min_y),
+            abs(center[1] - max_y),
+        )
+
+    def find_nearest_lot(
+        self,
+        vehicle_type: VehicleType,
+        x: float,
+        y: float,
+        exclude: Optional[Set[str]] = None,
+    ) -> Optional[FederatedLot]:
+        with self._lock:
+            cells = self._accepting[vehicle_type]
+            if not cells:
+                return None
+            center = self._cell(x, y)
+            best, best_distance = None, math.inf
+            for radius in range(self._max_radius(center) + 1):
+                # Everything in this ring or beyond is at least this far away
+                if (radius - 1) * self.cell_size > best_distance:
+                    break
+                for cell in self._ring(center, radius):
+                    for lot_id in cells.get(cell, ()):
+                        if exclude and lot_id in exclude:
+                            continue
+                        federated = self.lots[lot_id]
+                        distance = math.hypot(federated.x - x, federated.y - y)
+                        if distance < best_distance:
+                            best, best_distance = federated, distance
+            return best
+
+    def park_vehicle(
+        self, vehicle: Vehicle, x: float, y: float
+    ) -> Optional[Tuple[str, ParkingTicket]]:
+        tried: Set[str] = set()
+        # The chosen lot can fill up before we park there, so fall through
+        # to the next nearest one
+        while federated := self.find_nearest_lot(vehicle.vehicle_type, x, y, tried):
+            ticket = federated.service.park_vehicle(vehicle)
+            if ticket:
+                with self._lock:
+                    self._ticket_lots[ticket.ticket_id] = federated.lot_id
+                return federated.lot_id, ticket
+            tried.add(federated.lot_id)
+        return None
+
+    def unpark_vehicle(self, ticket_id: str) -> Optional[ParkingTicket]:
+        with self._lock:
+            lot_id = self._ticket_lots.pop(ticket_id, None)
+            federated = self.lots.get(lot_id) if lot_id else None
+        if federated is None:
+            return None
+        return federated.service.unpark_vehicle(ticket_id)
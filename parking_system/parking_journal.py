@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from parking_enums import VehicleType
+from parking_ticket import ParkingTicket
+from vehicle import Vehicle
+
+if TYPE_CHECKING:
+    from parking_lot import ParkingLot
+    from parking_metrics import ParkingMetrics
+    from parking_reservation import ReservationBook
+    from parking_service import ParkingService
+    from parking_strategy import ParkingStrategy
+
+JOURNAL_FILE = "tickets.journal"
+SNAPSHOT_FILE = "snapshot.json"
+
+
+# Line-delimited JSON journal of park/unpark events. Writes are fsynced in
+# groups of `fsync_batch_size` events, so a crash can lose at most the last
+# unsynced group. Every `snapshot_every` events the open tickets are written to
+# a snapshot and the journal is truncated, which keeps replay proportional to
+# the events since the last snapshot.
+class TicketJournal:
+    def __init__(
+        self, directory: str, fsync_batch_size: int = 1, snapshot_every: int = 0
+    ):
+        self.directory = directory
+        self.fsync_batch_size = max(1, fsync_batch_size)
+        self.snapshot_every = snapshot_every
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        os.makedirs(directory, exist_ok=True)
+
+        self.seq = self._last_seq()
+        self._unsynced = 0
+        self._since_snapshot = 0
+        self._lock = threading.Lock()
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+
+    def _last_seq(self) -> int:
+        seq = 0
+        snapshot = read_snapshot(self.snapshot_path)
+        if snapshot:
+            seq = snapshot["seq"]
+        for event in read_journal(self.journal_path):
+            seq = max(seq, event["seq"])
+        return seq
+
+    def record_park(self, ticket: ParkingTicket):
+        self._append(
+            {
+                "op": "park",
+                "ticket": ticket_to_record(ticket),
+            }
+        )
+
+    def record_unpark(self, ticket: ParkingTicket):
+        self._append(
+            {
+                "op": "unpark",
+                "ticket_id": ticket.ticket_id,
+                "exit_time": ticket.exit_time.isoformat(),
+            }
+        )
+
+    def _append(self, event: dict):
+        with self._lock:
+            self.seq += 1
+            event["seq"] = self.seq
+            self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+            self._unsynced += 1
+            self._since_snapshot += 1
+            if self._unsynced >= self.fsync_batch_size:
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def flush(self):
+        with self._lock:
+            if self._unsynced:
+                self._sync()
+
+    def snapshot_due(self) -> bool:
+        return 0 < self.snapshot_every <= self._since_snapshot
+
+    def write_snapshot(self, service: "ParkingService"):
+        with self._lock:
+            tickets = service.snapshot_tickets()
+            snapshot = {
+                "seq": self.seq,
+                "taken_at": datetime.now().isoformat(),
+                "occupied_slots": [ticket.slot.slot_id for ticket in tickets],
+                "tickets": [ticket_to_record(ticket) for ticket in tickets],
+            }
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+
+            # Everything up to `seq` is in the snapshot now
+            self._file.close()
+            self._file = open(self.journal_path, "w", encoding="utf-8")
+            self._unsynced = 0
+            self._since_snapshot = 0
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._file.close()
+
+
+def ticket_to_record(ticket: ParkingTicket) -> dict:
+    return {
+        "ticket_id": ticket.ticket_id,
+        "license_plate": ticket.vehicle.license_plate,
+        "vehicle_type": ticket.vehicle.vehicle_type.value,
+        "slot_id": ticket.slot.slot_id,
+        "entry_time": ticket.entry_time.isoformat(),
+    }
+
+
+def read_snapshot(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_journal(path: str):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A torn write from a crash can only be the final line
+                return
+
+
+def _restore_ticket(service: "ParkingService", record: dict):
+    if record["ticket_id"] in service.tickets:
+        return
+    slot = service.parking_lot.slots[record["slot_id"]]
+    service.parking_lot.occupy_slot(slot)
+    entry_time = datetime.fromisoformat(record["entry_time"])
+    slot.occupied_since = entry_time.timestamp()
+    ticket = ParkingTicket(
+        ticket_id=record["ticket_id"],
+        vehicle=Vehicle(record["license_plate"], VehicleType(record["vehicle_type"])),
+        slot=slot,
+        entry_time=entry_time,
+    )
+    service.tickets[ticket.ticket_id] = ticket
+
+
+def restore_service(
+    directory: str,
+    parking_lot: "ParkingLot",
+    strategy: "ParkingStrategy",
+    journal: Optional[TicketJournal] = None,
+    metrics: Optional["ParkingMetrics"] = None,
+    reservations: Optional["ReservationBook"] = None,
+) -> "ParkingService":
+    from parking_service import ParkingService
+
+    service = ParkingService(
+        parking_lot, strategy, metrics=metrics, reservations=reservations
+    )
+    snapshot = read_snapshot(os.path.join(directory, SNAPSHOT_FILE))
+    last_seq = 0
+    if snapshot:
+        last_seq = snapshot["seq"]
+        for record in snapshot["tickets"]:
+            _restore_ticket(service, record)
+
+    # Replay is idempotent: a snapshot taken mid-operation may already contain
+    # the effect of events journaled right after it
+    for event in read_journal(os.path.join(directory, JOURNAL_FILE)):
+        if event["seq"] <= last_seq:
+            continue
+        if event["op"] == "park":
+            _restore_ticket(service, event["ticket"])
+        elif event["op"] == "unpark":
+            ticket = service.tickets.pop(event["ticket_id"], None)
+            if ticket:
+                ticket.close_ticket(datetime.fromisoformat(event["exit_time"]))
+                parking_lot.vacate_slot(ticket.slot)
+
+    service.journal = journal
+    return service
@@ -1,6 +1,28 @@
+import heapq
+import threading
+from abc import ABC
 from parking_enums import ParkingLotStatus, ParkingSlotType, SlotStatus
-from slot import Slot
-from typing import Dict
+from slot import Slot, COMPATIBLE_SLOT_TYPES
+from slot_store import CompactSlotStore
+from vehicle import VehicleType
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+
+class ParkingLotListener(ABC):
+    # Notified after a slot changes state, outside the lot's locks
+    def on_slot_occupied(self, parking_lot: "ParkingLot", slot: Slot):
+        pass
+
+    def on_slot_vacated(self, parking_lot: "ParkingLot", slot: Slot, duration: float):
+        # duration: seconds the stay lasted, taken before the slot could be
+        # occupied again
+        pass
+
+    def on_slot_held(self, parking_lot: "ParkingLot", slot: Slot):
+        pass
+
+    def on_slot_released(self, parking_lot: "ParkingLot", slot: Slot):
+        pass
 
 
 class ParkingLot:
@@ -11,14 +33,45 @@ class ParkingLot:
         address: str,
         slot_distribution: Dict[ParkingSlotType, int],
         status: ParkingLotStatus = ParkingLotStatus.OPEN,
+        compact_slots: bool = False,
     ):
         self.name = name
         self.id = id
         self.address = address
         self.total_slots = sum(slot_distribution.values())
         self.available_slots = self.total_slots
-        self.slots = self._init_parking_slots(slot_distribution)
+        self._ordinals_by_type: Dict[ParkingSlotType, range] = {}
+        first = 0
+        for slot_type, count in slot_distribution.items():
+            self._ordinals_by_type[slot_type] = range(first, first + count)
+            first += count
+        # Very large lots can keep slots in typed arrays instead of one
+        # object per slot, see CompactSlotStore
+        self.slots: Union[Dict[str, Slot], CompactSlotStore]
+        self._slots_by_ordinal: Optional[List[Slot]] = None
+        if compact_slots:
+            self.slots = CompactSlotStore(slot_distribution)
+        else:
+            self.slots = self._init_parking_slots(slot_distribution)
+            self._slots_by_ordinal = list(self.slots.values())
         self.status = status
+        self._free_pools = self._init_free_pools()
+        # 1 if the ordinal currently has an entry in its free pool
+        self._pooled = bytearray(self.total_slots)
+        for pool in self._free_pools.values():
+            for ordinal in pool:
+                self._pooled[ordinal] = 1
+        # One lock per slot type pool so gates allocating different slot
+        # types never contend with each other
+        self._pool_locks = {slot_type: threading.Lock() for slot_type in ParkingSlotType}
+        self._counter_lock = threading.Lock()
+        self._available_by_type = {
+            slot_type: len(pool) for slot_type, pool in self._free_pools.items()
+        }
+        self._occupied_by_type = {
+            slot_type: 0 for slot_type in ParkingSlotType
+        }
+        self._listeners: List[ParkingLotListener] = []
 
     def _init_parking_slots(
         self, slot_distribution: Dict[ParkingSlotType, int]
@@ -31,15 +84,178 @@ class ParkingLot:
                     slot_id=f"SLOT-{slot_id}",
                     status=SlotStatus.AVAILABLE,
                     slot_type=slot_type,
+                    ordinal=slot_id - 1,
                 )
                 slots[slot.slot_id] = slot
                 slot_id += 1
         return slots
 
-    def get_slots(self) -> Dict[str, Slot]:
+    def _init_free_pools(self) -> Dict[ParkingSlotType, List[int]]:
+        # Min-heaps of free slot ordinals per slot type, so the nearest free
+        # slot of a type is always at the top
+        pools: Dict[ParkingSlotType, List[int]] = {
+            slot_type: [] for slot_type in ParkingSlotType
+        }
+        for ordinal, slot_type, status in self._slot_states():
+            if status == SlotStatus.AVAILABLE:
+                pools[slot_type].append(ordinal)
+        for pool in pools.values():
+            heapq.heapify(pool)
+        return pools
+
+    def _slot_states(self) -> Iterator[Tuple[int, ParkingSlotType, SlotStatus]]:
+        if self._slots_by_ordinal is None:
+            return self.slots.slot_states()
+        return (
+            (slot.ordinal, slot.slot_type, slot.status)
+            for slot in self._slots_by_ordinal
+        )
+
+    def get_slot_by_ordinal(self, ordinal: int) -> Slot:
+        if self._slots_by_ordinal is None:
+            return self.slots.slot_at(ordinal)
+        return self._slots_by_ordinal[ordinal]
+
+    def add_listener(self, listener: ParkingLotListener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: ParkingLotListener):
+        self._listeners.remove(listener)
+
+    def get_slot_ordinals(self, slot_type: ParkingSlotType) -> range:
+        return self._ordinals_by_type.get(slot_type, range(0))
+
+    def get_slots(self) -> Union[Dict[str, Slot], CompactSlotStore]:
         return self.slots
 
     def get_available_slots(self) -> list:
         return [
             slot for slot in self.slots.values() if slot.status == SlotStatus.AVAILABLE
         ]
+
+    def get_availability(self) -> Dict[ParkingSlotType, int]:
+        return dict(self._available_by_type)
+
+    def get_occupancy(self) -> Dict[ParkingSlotType, int]:
+        return dict(self._occupied_by_type)
+
+    def can_accept(self, vehicle_type: VehicleType) -> bool:
+        return any(
+            self._available_by_type[slot_type] > 0
+            for slot_type in COMPATIBLE_SLOT_TYPES[vehicle_type]
+        )
+
+    def peek_free_slot(self, slot_type: ParkingSlotType) -> Optional[Slot]:
+        pool = self._free_pools[slot_type]
+        with self._pool_locks[slot_type]:
+            # Entries are removed lazily, drop any that were occupied meanwhile
+            while pool:
+                slot = self.get_slot_by_ordinal(pool[0])
+                if slot.status == SlotStatus.AVAILABLE:
+                    return slot
+                self._pooled[heapq.heappop(pool)] = 0
+        return None
+
+    def _take_from_pool(self, slot: Slot):
+        # Caller holds the pool lock and has just taken `slot` out of
+        # AVAILABLE; entries deeper in the heap are dropped lazily
+        pool = self._free_pools[slot.slot_type]
+        if pool and pool[0] == slot.ordinal:
+            self._pooled[heapq.heappop(pool)] = 0
+        self._available_by_type[slot.slot_type] -= 1
+
+    def _return_to_pool(self, slot: Slot):
+        if not self._pooled[slot.ordinal]:
+            heapq.heappush(self._free_pools[slot.slot_type], slot.ordinal)
+            self._pooled[slot.ordinal] = 1
+        self._available_by_type[slot.slot_type] += 1
+
+    def _change_available_slots(self, delta: int):
+        with self._counter_lock:
+            self.available_slots += delta
+            if self.available_slots == 0:
+                self.status = ParkingLotStatus.FULL
+            elif delta > 0:
+                self.status = ParkingLotStatus.OPEN
+
+    def occupy_slot(self, slot: Slot) -> bool:
+        # Compare-and-set: only succeeds if the slot is still available, so
+        # two gates racing for the same slot can't both get it
+        with self._pool_locks[slot.slot_type]:
+            if slot.status != SlotStatus.AVAILABLE:
+                return False
+            slot.occupy_slot()
+            self._take_from_pool(slot)
+            self._occupied_by_type[slot.slot_type] += 1
+        self._change_available_slots(-1)
+        for listener in self._listeners:
+            listener.on_slot_occupied(self, slot)
+        return True
+
+    def hold_slot(self, slot: Slot) -> bool:
+        # Sets an available slot aside for a reservation
+        with self._pool_locks[slot.slot_type]:
+            if slot.status != SlotStatus.AVAILABLE:
+                return False
+            slot.reserve_slot()
+            self._take_from_pool(slot)
+        self._change_available_slots(-1)
+        for listener in self._listeners:
+            listener.on_slot_held(self, slot)
+        return True
+
+    def release_slot(self, slot: Slot) -> bool:
+        with self._pool_locks[slot.slot_type]:
+            if slot.status != SlotStatus.RESERVED:
+                return False
+            slot.release_slot()
+            self._return_to_pool(slot)
+        self._change_available_slots(1)
+        for listener in self._listeners:
+            listener.on_slot_released(self, slot)
+        return True
+
+    def occupy_reserved_slot(self, slot: Slot) -> bool:
+        with self._pool_locks[slot.slot_type]:
+            if slot.status != SlotStatus.RESERVED:
+                return False
+            slot.occupy_slot()
+            self._occupied_by_type[slot.slot_type] += 1
+        for listener in self._listeners:
+            listener.on_slot_occupied(self, slot)
+        return True
+
+    def occupy_free_slots(self, slot_type: ParkingSlotType, count: int) -> List[Slot]:
+        # Take up to `count` of the nearest free slots of a type in one go
+        taken = []
+        pool = self._free_pools[slot_type]
+        with self._pool_locks[slot_type]:
+            while pool and len(taken) < count:
+                ordinal = heapq.heappop(pool)
+                self._pooled[ordinal] = 0
+                slot = self.get_slot_by_ordinal(ordinal)
+                if slot.status == SlotStatus.AVAILABLE:
+                    slot.occupy_slot()
+                    taken.append(slot)
+            self._available_by_type[slot_type] -= len(taken)
+            self._occupied_by_type[slot_type] += len(taken)
+        if not taken:
+            return taken
+        self._change_available_slots(-len(taken))
+        for slot in taken:
+            for listener in self._listeners:
+                listener.on_slot_occupied(self, slot)
+        return taken
+
+    def vacate_slot(self, slot: Slot) -> bool:
+        with self._pool_locks[slot.slot_type]:
+            if slot.status != SlotStatus.OCCUPIED:
+                return False
+            slot.vacate_slot()
+            duration = slot.occupied_duration
+            self._return_to_pool(slot)
+            self._occupied_by_type[slot.slot_type] -= 1
+        self._change_available_slots(1)
+        for listener in self._listeners:
+            listener.on_slot_vacated(self, slot, duration)
+        return True
@@ -0,0 +1,148 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from parking_enums import ParkingSlotType
+from parking_lot import ParkingLot, ParkingLotListener
+from slot import Slot
+
+
+class LatencyHistogram:
+    # Log-spaced buckets from 1us up to ~16s (upper bounds in seconds), so
+    # recording is a bisect and memory is fixed no matter how many samples
+    BOUNDS = [1e-6 * 2**i for i in range(25)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        index = bisect.bisect_left(self.BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.sum += seconds
+
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def percentile(self, percent: float) -> float:
+        # Upper bound of the bucket holding the requested rank
+        if not self.total:
+            return 0.0
+        rank = self.total * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.BOUNDS[min(index, len(self.BOUNDS) - 1)]
+        return self.BOUNDS[-1]
+
+
+class _Bucket:
+    __slots__ = ("epoch", "entries", "exits", "dwell_sum", "occupancy")
+
+    def __init__(self):
+        self.reset(-1, {})
+
+    def reset(self, epoch: int, occupancy: Dict[ParkingSlotType, int]):
+        self.epoch = epoch
+        self.entries = 0
+        self.exits = 0
+        self.dwell_sum = 0.0
+        self.occupancy = dict(occupancy)
+
+
+# Lot activity in a ring of fixed-width time buckets (by default one minute
+# each, one day deep). Each occupy/vacate updates only the current bucket, and
+# a bucket is recycled when the ring wraps around to it, so memory stays
+# constant and "last N minutes" queries read at most N buckets.
+class ParkingMetrics(ParkingLotListener):
+    def __init__(
+        self,
+        parking_lot: ParkingLot,
+        bucket_seconds: int = 60,
+        bucket_count: int = 1440,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.parking_lot = parking_lot
+        self.bucket_seconds = bucket_seconds
+        self.bucket_count = bucket_count
+        self.clock = clock
+        self.entry_latency = LatencyHistogram()
+        self.exit_latency = LatencyHistogram()
+        self._buckets = [_Bucket() for _ in range(bucket_count)]
+        self._occupancy = parking_lot.get_occupancy()
+        self._lock = threading.Lock()
+        parking_lot.add_listener(self)
+
+    def _current_bucket(self) -> _Bucket:
+        epoch = int(self.clock() // self.bucket_seconds)
+        bucket = self._buckets[epoch % self.bucket_count]
+        if bucket.epoch != epoch:
+            bucket.reset(epoch, self._occupancy)
+        return bucket
+
+    def on_slot_occupied(self, parking_lot: ParkingLot, slot: Slot):
+        with self._lock:
+            self._occupancy[slot.slot_type] += 1
+            bucket = self._current_bucket()
+            bucket.entries += 1
+            bucket.occupancy[slot.slot_type] = self._occupancy[slot.slot_type]
+
+    def on_slot_vacated(self, parking_lot: ParkingLot, slot: Slot, duration: float):
+        with self._lock:
+            self._occupancy[slot.slot_type] -= 1
+            bucket = self._current_bucket()
+            bucket.exits += 1
+            bucket.dwell_sum += duration
+            bucket.occupancy[slot.slot_type] = self._occupancy[slot.slot_type]
+
+    def _recent_buckets(self, minutes: float) -> List[_Bucket]:
+        now_epoch = int(self.clock() // self.bucket_seconds)
+        span = min(
+            self.bucket_count, max(1, int(minutes * 60 // self.bucket_seconds))
+        )
+        buckets = []
+        for epoch in range(now_epoch - span + 1, now_epoch + 1):
+            bucket = self._buckets[epoch % self.bucket_count]
+            if bucket.epoch == epoch:
+                buckets.append(bucket)
+        return buckets
+
+    def occupancy_series(
+        self, slot_type: ParkingSlotType, minutes: float
+    ) -> List[Tuple[float, int]]:
+        # (bucket start, occupied slots at the end of that bucket); quiet
+        # buckets are skipped since nothing changed in them
+        with self._lock:
+            return [
+                (bucket.epoch * self.bucket_seconds, bucket.occupancy[slot_type])
+                for bucket in self._recent_buckets(minutes)
+            ]
+
+    def entries(self, minutes: float) -> int:
+        with self._lock:
+            return sum(bucket.entries for bucket in self._recent_buckets(minutes))
+
+    def exits(self, minutes: float) -> int:
+        with self._lock:
+            return sum(bucket.exits for bucket in self._recent_buckets(minutes))
+
+    def turnover_rate(self, minutes: float) -> float:
+        # Vehicles leaving per slot per hour
+        if minutes <= 0:
+            raise ValueError("minutes must be positive")
+        if not self.parking_lot.total_slots:
+            return 0.0
+        return self.exits(minutes) / self.parking_lot.total_slots / (minutes / 60)
+
+    def average_dwell_seconds(self, minutes: float) -> float:
+        with self._lock:
+            buckets = self._recent_buckets(minutes)
+            exits = sum(bucket.exits for bucket in buckets)
+            dwell = sum(bucket.dwell_sum for bucket in buckets)
+        return dwell / exits if exits else 0.0
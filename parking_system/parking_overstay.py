@@ -0,0 +1,75 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from parking_enums import ParkingSlotType
+from parking_scheduler import TimerHandle, TimingWheel
+from parking_service import ParkingService, ParkingServiceListener
+from parking_ticket import ParkingTicket
+
+
+def log_overstay(ticket: ParkingTicket):
+    logging.warning(
+        "Vehicle %s in slot %s has overstayed (parked since %s).",
+        ticket.vehicle.license_plate,
+        ticket.slot.slot_id,
+        ticket.entry_time,
+    )
+
+
+# Schedules an overstay timer for every open ticket at entry time + the stay
+# limit of its slot type, and cancels it when the ticket closes. Detection
+# costs nothing per open ticket; the wheel only touches timers that are due.
+class OverstayMonitor(ParkingServiceListener):
+    def __init__(
+        self,
+        parking_service: ParkingService,
+        max_stay_hours: float,
+        slot_type_limits: Optional[Dict[ParkingSlotType, float]] = None,
+        on_overstay: Callable[[ParkingTicket], None] = log_overstay,
+        wheel: Optional[TimingWheel] = None,
+    ):
+        self.parking_service = parking_service
+        self.max_stay_hours = max_stay_hours
+        self.slot_type_limits = slot_type_limits or {}
+        self.on_overstay = on_overstay
+        self.wheel = wheel or TimingWheel(tick_seconds=1.0)
+        self.overstayed: Dict[str, ParkingTicket] = {}
+        self._timers: Dict[str, TimerHandle] = {}
+        self._lock = threading.Lock()
+        for ticket in parking_service.snapshot_tickets():
+            self.on_ticket_opened(ticket)
+        parking_service.add_listener(self)
+
+    def stay_limit_hours(self, ticket: ParkingTicket) -> float:
+        return self.slot_type_limits.get(ticket.slot.slot_type, self.max_stay_hours)
+
+    def on_ticket_opened(self, ticket: ParkingTicket):
+        deadline = ticket.entry_time.timestamp() + self.stay_limit_hours(ticket) * 3600
+        handle = self.wheel.schedule(deadline, lambda: self._fire(ticket))
+        with self._lock:
+            self._timers[ticket.ticket_id] = handle
+
+    def on_ticket_closed(self, ticket: ParkingTicket):
+        with self._lock:
+            handle = self._timers.pop(ticket.ticket_id, None)
+            self.overstayed.pop(ticket.ticket_id, None)
+        if handle:
+            handle.cancel()
+
+    def _fire(self, ticket: ParkingTicket):
+        with self._lock:
+            if self._timers.pop(ticket.ticket_id, None) is None:
+                return
+            self.overstayed[ticket.ticket_id] = ticket
+        self.on_overstay(ticket)
+
+    def get_overstayed_tickets(self) -> List[ParkingTicket]:
+        with self._lock:
+            return list(self.overstayed.values())
+
+    def check(self, now: Optional[float] = None) -> int:
+        return self.wheel.advance(now)
+
+    async def run(self, interval: float = 1.0):
+        await self.wheel.run(interval)
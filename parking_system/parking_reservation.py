@@ -0,0 +1,394 @@
+import bisect
+import logging
+import math
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from parking_enums import ParkingSlotType, ReservationStatus, VehicleType
+from parking_lot import ParkingLot
+from parking_scheduler import TimerHandle, TimingWheel
+from slot import COMPATIBLE_SLOT_TYPES, Slot
+from vehicle import Vehicle
+
+
+class Reservation:
+    def __init__(
+        self,
+        reservation_id: str,
+        license_plate: str,
+        vehicle_type: VehicleType,
+        slot: Slot,
+        start: datetime,
+        end: datetime,
+    ):
+        self.reservation_id = reservation_id
+        self.license_plate = license_plate
+        self.vehicle_type = vehicle_type
+        self.slot = slot
+        self.start = start
+        self.end = end
+        self.status = ReservationStatus.BOOKED
+        self.timers: List[TimerHandle] = []
+
+    def get_info(self):
+        return {
+            "reservation_id": self.reservation_id,
+            "license_plate": self.license_plate,
+            "slot_id": self.slot.slot_id,
+            "start": self.start,
+            "end": self.end,
+            "status": self.status,
+        }
+
+
+class SlotSchedule:
+    # Booked [start, end) intervals of one slot, kept sorted and
+    # non-overlapping so a conflict check is a single bisect
+    def __init__(self):
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        self.reservation_ids: List[str] = []
+
+    def is_free(self, start: float, end: float) -> bool:
+        # The only interval that can overlap is the last one starting
+        # before `end`
+        index = bisect.bisect_left(self.starts, end)
+        return index == 0 or self.ends[index - 1] <= start
+
+    def add(self, start: float, end: float, reservation_id: str):
+        index = bisect.bisect_left(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.reservation_ids.insert(index, reservation_id)
+
+    def remove(self, start: float, reservation_id: str):
+        index = bisect.bisect_left(self.starts, start)
+        while index < len(self.starts) and self.starts[index] == start:
+            if self.reservation_ids[index] == reservation_id:
+                del self.starts[index], self.ends[index], self.reservation_ids[index]
+                return
+            index += 1
+
+    def neighbours(self, start: float) -> Tuple[float, float]:
+        # End of the last booking before `start` and start of the first one
+        # after it, skipping any booking that starts at `start` itself
+        index = bisect.bisect_left(self.starts, start)
+        before = self.ends[index - 1] if index else -math.inf
+        if index < len(self.starts) and self.starts[index] == start:
+            index += 1
+        after = self.starts[index] if index < len(self.starts) else math.inf
+        return before, after
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class _Gap:
+    __slots__ = ("key", "end", "priority", "max_end", "left", "right")
+
+    def __init__(self, start: float, ordinal: int, end: float):
+        self.key = (start, ordinal)
+        self.end = end
+        self.priority = random.random()
+        self.max_end = end
+        self.left: Optional["_Gap"] = None
+        self.right: Optional["_Gap"] = None
+
+    def update(self):
+        self.max_end = self.end
+        if self.left and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+
+# The free [start, end) gaps between bookings of every booked slot of one
+# type, in a treap ordered by start where each node also knows the latest end
+# below it. A slot free over [t1, t2) is a gap starting by t1 and ending at or
+# after t2, found in one walk down the tree.
+class GapTree:
+    def __init__(self):
+        self._root: Optional[_Gap] = None
+
+    def add(self, start: float, end: float, ordinal: int):
+        if start < end:
+            self._root = _insert(self._root, _Gap(start, ordinal, end))
+
+    def remove(self, start: float, end: float, ordinal: int):
+        if start < end:
+            self._root = _delete(self._root, (start, ordinal))
+
+    def find(self, start: float, end: float) -> Optional[int]:
+        # Ordinal of a slot with a gap covering [start, end), if any
+        node = self._root
+        while node:
+            if node.key[0] > start:
+                node = node.left
+                continue
+            if node.left and node.left.max_end >= end:
+                # Everything on the left starts by `start` too
+                node = node.left
+                while node.end < end:
+                    if node.left and node.left.max_end >= end:
+                        node = node.left
+                    else:
+                        node = node.right
+                return node.key[1]
+            if node.end >= end:
+                return node.key[1]
+            node = node.right
+        return None
+
+
+def _insert(node: Optional[_Gap], gap: _Gap) -> _Gap:
+    if node is None:
+        return gap
+    if gap.priority > node.priority:
+        gap.left, gap.right = _split(node, gap.key)
+        gap.update()
+        return gap
+    if gap.key < node.key:
+        node.left = _insert(node.left, gap)
+    else:
+        node.right = _insert(node.right, gap)
+    node.update()
+    return node
+
+
+def _delete(node: Optional[_Gap], key: Tuple[float, int]) -> Optional[_Gap]:
+    if node is None:
+        return None
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+    node.update()
+    return node
+
+
+def _split(
+    node: Optional[_Gap], key: Tuple[float, int]
+) -> Tuple[Optional[_Gap], Optional[_Gap]]:
+    # Nodes ordered before `key`, and the rest
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        node.update()
+        return node, right
+    left, node.left = _split(node.left, key)
+    node.update()
+    return left, node
+
+
+def _merge(left: Optional[_Gap], right: Optional[_Gap]) -> Optional[_Gap]:
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+# Advance bookings for a ParkingLot. Each slot that has ever been booked gets
+# a SlotSchedule, and its free gaps go in a GapTree per slot type; slots never
+# booked are handed out first, farthest from the entrance first since walk-ins
+# fill from the nearest end. When a booking
+# starts its slot is held (SlotStatus.RESERVED) so walk-ins can't take it, and
+# the hold is dropped if the vehicle hasn't arrived `grace_minutes` later.
+class ReservationBook:
+    def __init__(
+        self,
+        parking_lot: ParkingLot,
+        grace_minutes: float = 15.0,
+        wheel: Optional[TimingWheel] = None,
+    ):
+        self.parking_lot = parking_lot
+        self.grace = timedelta(minutes=grace_minutes)
+        self.wheel = wheel or TimingWheel(tick_seconds=1.0)
+        self.reservations: Dict[str, Reservation] = {}
+        self._schedules: Dict[int, SlotSchedule] = {}
+        self._gaps: Dict[ParkingSlotType, GapTree] = {
+            slot_type: GapTree() for slot_type in ParkingSlotType
+        }
+        self._unbooked_left: Dict[ParkingSlotType, int] = {
+            slot_type: len(parking_lot.get_slot_ordinals(slot_type))
+            for slot_type in ParkingSlotType
+        }
+        self._lock = threading.RLock()
+
+    def _find_free_ordinal(
+        self, vehicle_type: VehicleType, start: float, end: float
+    ) -> Optional[int]:
+        for slot_type in COMPATIBLE_SLOT_TYPES[vehicle_type]:
+            if self._unbooked_left[slot_type]:
+                self._unbooked_left[slot_type] -= 1
+                ordinals = self.parking_lot.get_slot_ordinals(slot_type)
+                ordinal = ordinals[self._unbooked_left[slot_type]]
+                self._schedules[ordinal] = SlotSchedule()
+                self._gaps[slot_type].add(-math.inf, math.inf, ordinal)
+                return ordinal
+            ordinal = self._gaps[slot_type].find(start, end)
+            if ordinal is not None:
+                return ordinal
+        return None
+
+    def _add_booking(self, ordinal: int, start: float, end: float, reservation_id: str):
+        # Splits the gap the booking lands in around it
+        schedule = self._schedules[ordinal]
+        gaps = self._gaps[self.parking_lot.get_slot_by_ordinal(ordinal).slot_type]
+        before, after = schedule.neighbours(start)
+        gaps.remove(before, after, ordinal)
+        gaps.add(before, start, ordinal)
+        gaps.add(end, after, ordinal)
+        schedule.add(start, end, reservation_id)
+
+    def _remove_booking(self, reservation: Reservation):
+        # Merges the booking back into the gaps either side of it
+        ordinal = reservation.slot.ordinal
+        start, end = reservation.start.timestamp(), reservation.end.timestamp()
+        schedule = self._schedules[ordinal]
+        gaps = self._gaps[reservation.slot.slot_type]
+        before, after = schedule.neighbours(start)
+        gaps.remove(before, start, ordinal)
+        gaps.remove(end, after, ordinal)
+        gaps.add(before, after, ordinal)
+        schedule.remove(start, reservation.reservation_id)
+
+    def is_available(
+        self, vehicle_type: VehicleType, start: datetime, end: datetime
+    ) -> bool:
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        with self._lock:
+            for slot_type in COMPATIBLE_SLOT_TYPES[vehicle_type]:
+                if self._unbooked_left[slot_type]:
+                    return True
+                if self._gaps[slot_type].find(start_ts, end_ts) is not None:
+                    return True
+        return False
+
+    def book(
+        self,
+        license_plate: str,
+        vehicle_type: VehicleType,
+        start: datetime,
+        end: datetime,
+    ) -> Optional[Reservation]:
+        if end <= start:
+            raise ValueError("Reservation must end after it starts")
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        with self._lock:
+            ordinal = self._find_free_ordinal(vehicle_type, start_ts, end_ts)
+            if ordinal is None:
+                return None
+            reservation = Reservation(
+                reservation_id=str(uuid.uuid4()),
+                license_plate=license_plate,
+                vehicle_type=vehicle_type,
+                slot=self.parking_lot.get_slot_by_ordinal(ordinal),
+                start=start,
+                end=end,
+            )
+            self._add_booking(ordinal, start_ts, end_ts, reservation.reservation_id)
+            self.reservations[reservation.reservation_id] = reservation
+
+        reservation.timers = [
+            self.wheel.schedule(start_ts, lambda: self._hold(reservation)),
+            self.wheel.schedule(
+                (start + self.grace).timestamp(), lambda: self._expire(reservation)
+            ),
+            self.wheel.schedule(end_ts, lambda: self._forget(reservation)),
+        ]
+        if start <= datetime.now():
+            self._hold(reservation)
+        return reservation
+
+    def _hold(self, reservation: Reservation):
+        with self._lock:
+            if reservation.status != ReservationStatus.BOOKED:
+                return
+            if self.parking_lot.hold_slot(reservation.slot):
+                reservation.status = ReservationStatus.HELD
+            else:
+                # A walk-in is still parked there; the vehicle gets another
+                # compatible slot when it arrives
+                logging.warning(
+                    "Slot %s is busy at the start of reservation %s.",
+                    reservation.slot.slot_id,
+                    reservation.reservation_id,
+                )
+
+    def _expire(self, reservation: Reservation):
+        with self._lock:
+            if reservation.status in (ReservationStatus.BOOKED, ReservationStatus.HELD):
+                self._drop(reservation, ReservationStatus.EXPIRED)
+
+    def _forget(self, reservation: Reservation):
+        with self._lock:
+            if reservation.status == ReservationStatus.FULFILLED:
+                self._remove_booking(reservation)
+                self.reservations.pop(reservation.reservation_id, None)
+
+    def _drop(self, reservation: Reservation, status: ReservationStatus):
+        if reservation.status == ReservationStatus.HELD:
+            self.parking_lot.release_slot(reservation.slot)
+        reservation.status = status
+        for timer in reservation.timers:
+            timer.cancel()
+        self._remove_booking(reservation)
+        self.reservations.pop(reservation.reservation_id, None)
+
+    def cancel(self, reservation_id: str) -> bool:
+        with self._lock:
+            reservation = self.reservations.get(reservation_id)
+            if not reservation or reservation.status not in (
+                ReservationStatus.BOOKED,
+                ReservationStatus.HELD,
+            ):
+                return False
+            self._drop(reservation, ReservationStatus.CANCELLED)
+            return True
+
+    def claim(self, reservation_id: str, vehicle: Vehicle) -> Optional[Slot]:
+        # Occupies the reserved slot for an arriving vehicle. Returns None if
+        # the reservation is unknown, made for another vehicle, or its slot is
+        # still taken by a walk-in; in the latter case the reservation is
+        # closed as BUMPED and the vehicle should be parked in any other
+        # compatible slot.
+        with self._lock:
+            reservation = self.reservations.get(reservation_id)
+            if (
+                not reservation
+                or reservation.license_plate != vehicle.license_plate
+                or reservation.slot.slot_type
+                not in COMPATIBLE_SLOT_TYPES[vehicle.vehicle_type]
+                or reservation.status
+                not in (ReservationStatus.BOOKED, ReservationStatus.HELD)
+            ):
+                return None
+            slot = reservation.slot
+            if reservation.status == ReservationStatus.HELD:
+                occupied = self.parking_lot.occupy_reserved_slot(slot)
+            else:
+                occupied = self.parking_lot.occupy_slot(slot)
+            if not occupied:
+                self._drop(reservation, ReservationStatus.BUMPED)
+                return None
+            reservation.status = ReservationStatus.FULFILLED
+            reservation.timers[0].cancel()
+            reservation.timers[1].cancel()
+            return slot
+
+    def advance(self, now: Optional[float] = None) -> int:
+        return self.wheel.advance(now)
+
+    async def run(self, interval: float = 1.0):
+        await self.wheel.run(interval)
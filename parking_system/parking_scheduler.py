@@ -0,0 +1,126 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class TimerHandle:
+    __slots__ = ("deadline", "expire_tick", "callback", "cancelled")
+
+    def __init__(self, deadline: float, expire_tick: int, callback: Callable[[], None]):
+        self.deadline = deadline
+        self.expire_tick = expire_tick
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        # Cancelled timers stay in their bucket and are dropped when reached
+        self.cancelled = True
+
+
+# Hierarchical timing wheel. Level 0 has one bucket per tick; each level above
+# covers `wheel_size` times the span of the one below. A timer sits in the
+# lowest level that can hold its delay and cascades one level down each time
+# the level below wraps around, so scheduling, cancelling and each tick are
+# O(1) amortized no matter how many timers are pending.
+class TimingWheel:
+    def __init__(
+        self,
+        tick_seconds: float = 1.0,
+        wheel_size: int = 64,
+        levels: int = 4,
+        start_time: Optional[float] = None,
+    ):
+        self.tick_seconds = tick_seconds
+        self.wheel_size = wheel_size
+        self.levels = levels
+        start_time = time.time() if start_time is None else start_time
+        self.current_tick = int(start_time // tick_seconds)
+        self._wheels: List[List[List[TimerHandle]]] = [
+            [[] for _ in range(wheel_size)] for _ in range(levels)
+        ]
+        self._max_delay = wheel_size**levels - 1
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def schedule(self, deadline: float, callback: Callable[[], None]) -> TimerHandle:
+        handle = TimerHandle(
+            deadline, math.ceil(deadline / self.tick_seconds), callback
+        )
+        with self._lock:
+            self._insert(handle)
+            self._pending += 1
+        return handle
+
+    def _insert(self, handle: TimerHandle):
+        # Anything already due fires on the next tick
+        expire_tick = max(handle.expire_tick, self.current_tick + 1)
+        delay = expire_tick - self.current_tick
+        if delay > self._max_delay:
+            # Too far out for the wheel; park it in the top level and it
+            # gets re-placed as it cascades down
+            expire_tick = self.current_tick + self._max_delay
+            delay = self._max_delay
+        level = 0
+        span = self.wheel_size
+        while delay >= span:
+            level += 1
+            span *= self.wheel_size
+        index = (expire_tick // self.wheel_size**level) % self.wheel_size
+        self._wheels[level][index].append(handle)
+
+    def _cascade(self, tick: int, due: List[TimerHandle]):
+        top = 0
+        while top + 1 < self.levels and tick % self.wheel_size ** (top + 1) == 0:
+            top += 1
+        # Highest level first, so timers it hands down are cascaded again by
+        # the level below in the same tick. Timers due this very tick go
+        # straight to `due`; re-inserting them would push them a tick late.
+        for level in range(top, 0, -1):
+            index = (tick // self.wheel_size**level) % self.wheel_size
+            bucket = self._wheels[level][index]
+            self._wheels[level][index] = []
+            for handle in bucket:
+                if handle.cancelled:
+                    self._pending -= 1
+                elif handle.expire_tick <= tick:
+                    self._pending -= 1
+                    due.append(handle)
+                else:
+                    self._insert(handle)
+
+    def advance(self, now: Optional[float] = None) -> int:
+        target_tick = int((time.time() if now is None else now) // self.tick_seconds)
+        due: List[TimerHandle] = []
+        with self._lock:
+            while self.current_tick < target_tick:
+                self.current_tick += 1
+                # Higher levels can hold timers due this very tick, so pull
+                # them down before firing level 0
+                self._cascade(self.current_tick, due)
+                index = self.current_tick % self.wheel_size
+                bucket = self._wheels[0][index]
+                self._wheels[0][index] = []
+                for handle in bucket:
+                    if handle.cancelled:
+                        self._pending -= 1
+                    elif handle.expire_tick <= self.current_tick:
+                        self._pending -= 1
+                        due.append(handle)
+                    else:
+                        self._insert(handle)
+        for handle in due:
+            if not handle.cancelled:
+                handle.callback()
+        return len(due)
+
+    async def run(self, interval: Optional[float] = None):
+        # Drive the wheel from the event loop, next to the gate tasks
+        interval = interval or self.tick_seconds
+        while True:
+            self.advance()
+            await asyncio.sleep(interval)
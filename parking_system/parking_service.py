@@ -1,49 +1,150 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from parking_lot import ParkingLot
 from vehicle import Vehicle
 from parking_strategy import ParkingStrategy
 from parking_ticket import ParkingTicket
-from parking_enums import ParkingLotStatus
+from parking_journal import TicketJournal
+from parking_metrics import ParkingMetrics
+from parking_reservation import ReservationBook
+from parking_enums import VehicleType
+from slot import COMPATIBLE_SLOT_TYPES, Slot
+import threading
 import uuid
+from abc import ABC
+
+
+class ParkingServiceListener(ABC):
+    def on_ticket_opened(self, ticket: ParkingTicket):
+        pass
+
+    def on_ticket_closed(self, ticket: ParkingTicket):
+        pass
 
 
 class ParkingService:
-    def __init__(self, parking_lot: "ParkingLot", strategy: ParkingStrategy):
+    def __init__(
+        self,
+        parking_lot: "ParkingLot",
+        strategy: ParkingStrategy,
+        journal: Optional[TicketJournal] = None,
+        metrics: Optional[ParkingMetrics] = None,
+        reservations: Optional[ReservationBook] = None,
+    ):
         self.parking_lot = parking_lot
         self.strategy = strategy
+        self.journal = journal
+        self.metrics = metrics
+        self.reservations = reservations
         self.tickets: dict[str, ParkingTicket] = {}
+        self._tickets_lock = threading.Lock()
+        self._listeners: List[ParkingServiceListener] = []
 
-    def park_vehicle(self, vehicle: Vehicle) -> Optional[ParkingTicket]:
-        if self.parking_lot.status == ParkingLotStatus.FULL:
-            return None
+    def add_listener(self, listener: ParkingServiceListener):
+        self._listeners.append(listener)
 
-        slot = self.strategy.find_available_slot(self.parking_lot, vehicle.vehicle_type)
-        if not slot:
-            self.parking_lot.status = ParkingLotStatus.FULL
+    def remove_listener(self, listener: ParkingServiceListener):
+        self._listeners.remove(listener)
+
+    def snapshot_tickets(self) -> List[ParkingTicket]:
+        # The open tickets as of one moment, safe to walk while gates keep
+        # issuing and closing them
+        with self._tickets_lock:
+            return list(self.tickets.values())
+
+    def can_accept(self, vehicle_type: VehicleType) -> bool:
+        return self.parking_lot.can_accept(vehicle_type)
+
+    def park_vehicle(
+        self, vehicle: Vehicle, reservation_id: Optional[str] = None
+    ) -> Optional[ParkingTicket]:
+        if reservation_id and self.reservations:
+            if slot := self.reservations.claim(reservation_id, vehicle):
+                return self._issue_ticket(vehicle, slot, datetime.now())
+
+        if not self.parking_lot.can_accept(vehicle.vehicle_type):
             return None
 
-        slot.occupy_slot()
+        # Another gate may take the slot between finding and occupying it,
+        # in which case just look again
+        while True:
+            slot = self.strategy.find_available_slot(
+                self.parking_lot, vehicle.vehicle_type
+            )
+            if not slot:
+                return None
+            if self.parking_lot.occupy_slot(slot):
+                break
+
+        return self._issue_ticket(vehicle, slot, datetime.now())
+
+    def park_vehicles(self, vehicles: List[Vehicle]) -> List[Optional[ParkingTicket]]:
+        # Allocates slots per vehicle type in one strategy call each, the
+        # most constrained types first so they aren't crowded out of the
+        # slot types that everything else falls back to
+        by_type: dict[VehicleType, List[int]] = {}
+        for index, vehicle in enumerate(vehicles):
+            by_type.setdefault(vehicle.vehicle_type, []).append(index)
+
+        tickets: List[Optional[ParkingTicket]] = [None] * len(vehicles)
+        entry_time = datetime.now()
+        for vehicle_type in sorted(
+            by_type, key=lambda vt: len(COMPATIBLE_SLOT_TYPES[vt])
+        ):
+            indexes = by_type[vehicle_type]
+            slots = self.strategy.allocate_slots(
+                self.parking_lot, vehicle_type, len(indexes)
+            )
+            for index, slot in zip(indexes, slots):
+                tickets[index] = self._issue_ticket(vehicles[index], slot, entry_time)
+        return tickets
+
+    def _issue_ticket(
+        self, vehicle: Vehicle, slot: Slot, entry_time: datetime
+    ) -> ParkingTicket:
         ticket = ParkingTicket(
             ticket_id=str(uuid.uuid4()),
             vehicle=vehicle,
             slot=slot,
-            entry_time=datetime.now(),
+            entry_time=entry_time,
         )
-        self.tickets[ticket.ticket_id] = ticket
-        self.parking_lot.available_slots -= 1
+        with self._tickets_lock:
+            self.tickets[ticket.ticket_id] = ticket
+        if self.journal:
+            self.journal.record_park(ticket)
+            self._maybe_snapshot()
+        for listener in self._listeners:
+            listener.on_ticket_opened(ticket)
         return ticket
 
     def unpark_vehicle(
-        self, ticket_id: str, exit_time: datetime = datetime.now()
+        self, ticket_id: str, exit_time: Optional[datetime] = None
     ) -> Optional[ParkingTicket]:
-        ticket = self.tickets.get(ticket_id)
+        with self._tickets_lock:
+            ticket = self.tickets.pop(ticket_id, None)
         if not ticket:
             return None
 
-        ticket.close_ticket(exit_time)
-        ticket.slot.vacate_slot()
-        self.parking_lot.available_slots += 1
-        self.parking_lot.status = ParkingLotStatus.OPEN
-        del self.tickets[ticket_id]
+        ticket.close_ticket(exit_time or datetime.now())
+        if self.journal:
+            self.journal.record_unpark(ticket)
+        self.parking_lot.vacate_slot(ticket.slot)
+        if self.journal:
+            self._maybe_snapshot()
+        for listener in self._listeners:
+            listener.on_ticket_closed(ticket)
         return ticket
+
+    def unpark_vehicles(
+        self, ticket_ids: List[str], exit_time: Optional[datetime] = None
+    ) -> List[ParkingTicket]:
+        exit_time = exit_time or datetime.now()
+        tickets = []
+        for ticket_id in ticket_ids:
+            if ticket := self.unpark_vehicle(ticket_id, exit_time):
+                tickets.append(ticket)
+        return tickets
+
+    def _maybe_snapshot(self):
+        if self.journal.snapshot_due():
+            self.journal.write_snapshot(self)
@@ -1,9 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Optional
-from slot import Slot
+from typing import List, Optional
+from slot import Slot, COMPATIBLE_SLOT_TYPES
 from parking_lot import ParkingLot
 from vehicle import VehicleType
-from parking_enums import SlotStatus
 
 
 class ParkingStrategy(ABC):
@@ -13,12 +12,36 @@ class ParkingStrategy(ABC):
     ) -> Optional[Slot]:
         pass
 
+    def allocate_slots(
+        self, parking_lot: "ParkingLot", vehicle_type: VehicleType, count: int
+    ) -> List[Slot]:
+        # Finds and occupies up to `count` slots. Strategies that can pick a
+        # whole batch at once should override this.
+        slots = []
+        while len(slots) < count:
+            slot = self.find_available_slot(parking_lot, vehicle_type)
+            if not slot:
+                break
+            if parking_lot.occupy_slot(slot):
+                slots.append(slot)
+        return slots
+
 
 class NearestSpotStrategy(ParkingStrategy):
     def find_available_slot(
         self, parking_lot: "ParkingLot", vehicle_type: VehicleType
     ) -> Optional[Slot]:
-        for slot in parking_lot.get_slots().values():
-            if slot.status == SlotStatus.AVAILABLE and slot.is_compatible(vehicle_type):
+        for slot_type in COMPATIBLE_SLOT_TYPES[vehicle_type]:
+            if slot := parking_lot.peek_free_slot(slot_type):
                 return slot
         return None
+
+    def allocate_slots(
+        self, parking_lot: "ParkingLot", vehicle_type: VehicleType, count: int
+    ) -> List[Slot]:
+        slots = []
+        for slot_type in COMPATIBLE_SLOT_TYPES[vehicle_type]:
+            if len(slots) == count:
+                break
+            slots.extend(parking_lot.occupy_free_slots(slot_type, count - len(slots)))
+        return slots
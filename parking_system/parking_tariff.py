@@ -0,0 +1,146 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+from parking_enums import ParkingSlotType
+from parking_ticket import ParkingTicket
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Tariffs price one ticket with fee, from its hours and slot type, or whole
+# batches at once with compute_fees: durations are a float array of hours and
+# slot_types the matching ParkingSlotType of each ticket. Only the batch path
+# needs numpy, and imports it on first use.
+class Tariff(ABC):
+    @abstractmethod
+    def fee(self, hours: float, slot_type: ParkingSlotType) -> float:
+        pass
+
+    @abstractmethod
+    def compute_fees(
+        self, durations: "np.ndarray", slot_types: Sequence[ParkingSlotType]
+    ) -> "np.ndarray":
+        pass
+
+    def compute_ticket_fees(self, tickets: List[ParkingTicket]) -> "np.ndarray":
+        return self.compute_fees(
+            ticket_durations(tickets), [ticket.slot.slot_type for ticket in tickets]
+        )
+
+    def compute_fee(self, ticket: ParkingTicket) -> float:
+        return self.fee(ticket.get_duration_hours(), ticket.slot.slot_type)
+
+
+class HourlyTariff(Tariff):
+    def __init__(self, rate: float = 10.0):
+        self.rate = rate
+
+    def fee(self, hours: float, slot_type: ParkingSlotType) -> float:
+        return hours * self.rate
+
+    def compute_fees(
+        self, durations: "np.ndarray", slot_types: Sequence[ParkingSlotType]
+    ) -> "np.ndarray":
+        return durations * self.rate
+
+
+class TieredHourlyTariff(Tariff):
+    # tiers: (hours, rate) pairs applied in order, e.g. [(1, 0), (3, 5), (inf, 8)]
+    # makes the first hour free, the next two $5/h and the rest $8/h
+    def __init__(self, tiers: List[Tuple[float, float]]):
+        self.tiers = tiers
+
+    def fee(self, hours: float, slot_type: ParkingSlotType) -> float:
+        fee = 0.0
+        tier_start = 0.0
+        for tier_end, rate in self.tiers:
+            fee += min(max(hours - tier_start, 0), tier_end - tier_start) * rate
+            tier_start = tier_end
+        return fee
+
+    def compute_fees(
+        self, durations: "np.ndarray", slot_types: Sequence[ParkingSlotType]
+    ) -> "np.ndarray":
+        import numpy as np
+
+        fees = np.zeros_like(durations)
+        tier_start = 0.0
+        for tier_end, rate in self.tiers:
+            fees += np.clip(durations - tier_start, 0, tier_end - tier_start) * rate
+            tier_start = tier_end
+        return fees
+
+
+class DailyCapTariff(Tariff):
+    # Charges `base` within each 24h day but never more than `daily_cap` a day
+    def __init__(self, base: Tariff, daily_cap: float):
+        self.base = base
+        self.daily_cap = daily_cap
+
+    def fee(self, hours: float, slot_type: ParkingSlotType) -> float:
+        full_days, remainder = divmod(hours, 24.0)
+        full_day_fee = min(self.base.fee(24.0, slot_type), self.daily_cap)
+        remainder_fee = min(self.base.fee(remainder, slot_type), self.daily_cap)
+        return full_days * full_day_fee + remainder_fee
+
+    def compute_fees(
+        self, durations: "np.ndarray", slot_types: Sequence[ParkingSlotType]
+    ) -> "np.ndarray":
+        import numpy as np
+
+        full_days, remainder = np.divmod(durations, 24.0)
+        full_day_fee = np.minimum(
+            self.base.compute_fees(np.full_like(durations, 24.0), slot_types),
+            self.daily_cap,
+        )
+        remainder_fee = np.minimum(
+            self.base.compute_fees(remainder, slot_types), self.daily_cap
+        )
+        return full_days * full_day_fee + remainder_fee
+
+
+class SlotTypeTariff(Tariff):
+    def __init__(self, tariffs: Dict[ParkingSlotType, Tariff], default: Tariff):
+        self.tariffs = tariffs
+        self.default = default
+
+    def fee(self, hours: float, slot_type: ParkingSlotType) -> float:
+        return self.tariffs.get(slot_type, self.default).fee(hours, slot_type)
+
+    def compute_fees(
+        self, durations: "np.ndarray", slot_types: Sequence[ParkingSlotType]
+    ) -> "np.ndarray":
+        import numpy as np
+
+        fees = np.empty_like(durations)
+        slot_types = np.asarray(slot_types, dtype=object)
+        handled = np.zeros(len(durations), dtype=bool)
+        for slot_type, tariff in self.tariffs.items():
+            mask = slot_types == slot_type
+            if mask.any():
+                fees[mask] = tariff.compute_fees(durations[mask], slot_types[mask])
+                handled |= mask
+        if not handled.all():
+            rest = ~handled
+            fees[rest] = self.default.compute_fees(durations[rest], slot_types[rest])
+        return fees
+
+
+def ticket_durations(tickets: List[ParkingTicket]) -> "np.ndarray":
+    import numpy as np
+
+    count = len(tickets)
+    entry_times = np.fromiter(
+        (ticket.entry_time.timestamp() for ticket in tickets), float, count
+    )
+    exit_times = np.fromiter(
+        (
+            ticket.exit_time.timestamp() if ticket.exit_time else np.nan
+            for ticket in tickets
+        ),
+        float,
+        count,
+    )
+    # Open tickets have no duration yet, same as ParkingTicket.get_duration_hours
+    return np.nan_to_num((exit_times - entry_times) / 3600.0, nan=0.0)
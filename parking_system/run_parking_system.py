@@ -5,6 +5,7 @@ from parking_service import ParkingService
 from parking_strategy import NearestSpotStrategy
 from parking_entry import ParkingEntry
 from parking_exit import ParkingExit
+from concurrent_gates import ConcurrentGates
 from vehicle import Car, Motorcycle, Truck
 
 logging.basicConfig(level=logging.INFO)
@@ -62,5 +63,21 @@ def run_parking_system():
             exit_gate.process_vehicle_exit(ticket_id)
 
 
+def run_concurrent_parking_system():
+    parking_lot = create_parking_lot()
+    service, entries, exits = create_parking_system(parking_lot)
+    vehicles = create_vehicles()
+
+    with ConcurrentGates(entries, exits) as gates:
+        entry_futures = [gates.submit_entry(vehicle) for vehicle in vehicles]
+        tickets = [future.result() for future in entry_futures]
+        exit_futures = [
+            gates.submit_exit(ticket.ticket_id) for ticket in tickets if ticket
+        ]
+        for future in exit_futures:
+            future.result()
+
+
 if __name__ == "__main__":
     run_parking_system()
+    run_concurrent_parking_system()
@@ -1,26 +1,60 @@
+import time
 from parking_enums import ParkingSlotType, SlotStatus, VehicleType
-from typing import Optional
+from typing import Dict, List, Optional
+
+
+# Slot types a vehicle can use, in the order they should be tried
+COMPATIBLE_SLOT_TYPES: Dict[VehicleType, List[ParkingSlotType]] = {
+    VehicleType.SMALL: [
+        ParkingSlotType.MOTORCYCLE,
+        ParkingSlotType.COMPACT,
+        ParkingSlotType.LARGE,
+    ],
+    VehicleType.MEDIUM: [ParkingSlotType.COMPACT, ParkingSlotType.LARGE],
+    VehicleType.LARGE: [ParkingSlotType.LARGE],
+    VehicleType.ELECTRIC: [ParkingSlotType.ELECTRIC, ParkingSlotType.LARGE],
+}
 
 
 class Slot:
+    __slots__ = (
+        "slot_id",
+        "slot_type",
+        "status",
+        "ordinal",
+        "occupied_since",
+        "occupied_duration",
+    )
+
     def __init__(
         self,
         slot_id: str,
         slot_type: ParkingSlotType,
         status: SlotStatus = SlotStatus.AVAILABLE,
+        ordinal: int = 0,
     ):
         self.slot_id = slot_id
         self.slot_type = slot_type
         self.status = status
-        self.occupied_duration = 0  # Reset to 0 when vacated
+        self.ordinal = ordinal  # Position in the lot, lower is nearer
+        self.occupied_since = 0.0  # Epoch seconds, 0 when available
+        self.occupied_duration = 0.0  # Seconds of the last stay, set when vacated
 
     def occupy_slot(self):
         self.status = SlotStatus.OCCUPIED
-        self.occupied_duration = 0
+        self.occupied_since = time.time()
+        self.occupied_duration = 0.0
 
     def vacate_slot(self):
         self.status = SlotStatus.AVAILABLE
-        self.occupied_duration = 0
+        self.occupied_duration = time.time() - self.occupied_since
+        self.occupied_since = 0.0
+
+    def reserve_slot(self):
+        self.status = SlotStatus.RESERVED
+
+    def release_slot(self):
+        self.status = SlotStatus.AVAILABLE
 
     def is_compatible(self, vehicle_type: "VehicleType") -> bool:
         if self.slot_type == ParkingSlotType.MOTORCYCLE:
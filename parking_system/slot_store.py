@@ -0,0 +1,116 @@
+from array import array
+from collections.abc import Mapping, ValuesView
+from typing import Dict, Iterator, Tuple
+
+from parking_enums import ParkingSlotType, SlotStatus
+from slot import Slot
+
+_SLOT_TYPES = list(ParkingSlotType)
+_SLOT_TYPE_CODES = {slot_type: code for code, slot_type in enumerate(_SLOT_TYPES)}
+_STATUSES = list(SlotStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+
+
+class SlotView(Slot):
+    # Slot backed by a CompactSlotStore row. Views are created on access and
+    # hold no state of their own beyond the ordinal, so any number of views
+    # of the same slot stay consistent.
+    __slots__ = ("_store",)
+
+    def __init__(self, store: "CompactSlotStore", ordinal: int):
+        self._store = store
+        self.ordinal = ordinal
+
+    @property
+    def slot_id(self) -> str:
+        return f"SLOT-{self.ordinal + 1}"
+
+    @property
+    def slot_type(self) -> ParkingSlotType:
+        return _SLOT_TYPES[self._store._types[self.ordinal]]
+
+    @property
+    def status(self) -> SlotStatus:
+        return _STATUSES[self._store._statuses[self.ordinal]]
+
+    @status.setter
+    def status(self, status: SlotStatus):
+        self._store._statuses[self.ordinal] = _STATUS_CODES[status]
+
+    @property
+    def occupied_since(self) -> float:
+        return self._store._occupied_since[self.ordinal]
+
+    @occupied_since.setter
+    def occupied_since(self, since: float):
+        self._store._occupied_since[self.ordinal] = since
+
+    @property
+    def occupied_duration(self) -> float:
+        return self._store._occupied_durations[self.ordinal]
+
+    @occupied_duration.setter
+    def occupied_duration(self, duration: float):
+        self._store._occupied_durations[self.ordinal] = duration
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, SlotView)
+            and other._store is self._store
+            and other.ordinal == self.ordinal
+        )
+
+    def __hash__(self):
+        return hash((id(self._store), self.ordinal))
+
+
+# Structure-of-arrays slot storage: one byte each for type and status and two
+# doubles for occupied since/duration per slot, indexed by slot ordinal.
+# Behaves like the Dict[str, Slot] that ParkingLot builds by default, handing
+# out SlotViews.
+class CompactSlotStore(Mapping):
+    def __init__(self, slot_distribution: Dict[ParkingSlotType, int]):
+        self._types = array("B")
+        for slot_type, count in slot_distribution.items():
+            self._types.extend(array("B", [_SLOT_TYPE_CODES[slot_type]]) * count)
+        size = len(self._types)
+        self._statuses = array("B", [_STATUS_CODES[SlotStatus.AVAILABLE]]) * size
+        self._occupied_since = array("d", [0.0]) * size
+        self._occupied_durations = array("d", [0.0]) * size
+
+    def slot_at(self, ordinal: int) -> SlotView:
+        return SlotView(self, ordinal)
+
+    def slot_states(self) -> Iterator[Tuple[int, ParkingSlotType, SlotStatus]]:
+        for ordinal, (type_code, status_code) in enumerate(
+            zip(self._types, self._statuses)
+        ):
+            yield ordinal, _SLOT_TYPES[type_code], _STATUSES[status_code]
+
+    def _ordinal(self, slot_id: str) -> int:
+        prefix, _, number = slot_id.partition("-")
+        if prefix != "SLOT" or not number.isdigit():
+            raise KeyError(slot_id)
+        ordinal = int(number) - 1
+        if not 0 <= ordinal < len(self._types):
+            raise KeyError(slot_id)
+        return ordinal
+
+    def __getitem__(self, slot_id: str) -> SlotView:
+        return SlotView(self, self._ordinal(slot_id))
+
+    def __iter__(self) -> Iterator[str]:
+        return (f"SLOT-{ordinal + 1}" for ordinal in range(len(self._types)))
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def values(self) -> "_SlotValues":
+        return _SlotValues(self)
+
+
+class _SlotValues(ValuesView):
+    # Walk ordinals directly instead of parsing every slot id back
+    def __iter__(self) -> Iterator[SlotView]:
+        store = self._mapping
+        return (SlotView(store, ordinal) for ordinal in range(len(store)))
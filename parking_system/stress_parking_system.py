@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from parking_enums import ParkingSlotType, SlotStatus
+from parking_lot import ParkingLot
+from parking_service import ParkingService
+from parking_strategy import NearestSpotStrategy
+from vehicle import Car, Motorcycle, Truck
+
+
+def create_parking_lot(slots_per_type: int = 50):
+    return ParkingLot(
+        name="Stress Parking",
+        id="STRESS-1",
+        address="1 Test Ave",
+        slot_distribution={
+            ParkingSlotType.MOTORCYCLE: slots_per_type,
+            ParkingSlotType.COMPACT: slots_per_type,
+            ParkingSlotType.LARGE: slots_per_type,
+        },
+    )
+
+
+def run_gate(service, gate_id, operations, held, held_lock, errors):
+    rng = random.Random(gate_id)
+    vehicle_types = [Car, Motorcycle, Truck]
+    my_tickets = []
+    for i in range(operations):
+        if my_tickets and rng.random() < 0.5:
+            ticket = my_tickets.pop(rng.randrange(len(my_tickets)))
+            # Release before unparking: the slot stays occupied until the
+            # service vacates it, so no other gate can legitimately claim it
+            with held_lock:
+                held.pop(ticket.slot.slot_id, None)
+            service.unpark_vehicle(ticket.ticket_id)
+            continue
+
+        vehicle = rng.choice(vehicle_types)(license_plate=f"G{gate_id}-{i}")
+        ticket = service.park_vehicle(vehicle)
+        if not ticket:
+            continue
+        with held_lock:
+            if ticket.slot.slot_id in held:
+                errors.append(
+                    f"{ticket.slot.slot_id} given to {ticket.ticket_id} "
+                    f"while held by {held[ticket.slot.slot_id]}"
+                )
+            held[ticket.slot.slot_id] = ticket.ticket_id
+        my_tickets.append(ticket)
+
+
+def check_consistency(service, errors):
+    lot = service.parking_lot
+    occupied = [s for s in lot.slots.values() if s.status == SlotStatus.OCCUPIED]
+    ticket_slots = [t.slot.slot_id for t in service.tickets.values()]
+    if len(ticket_slots) != len(set(ticket_slots)):
+        errors.append("Two open tickets share a slot")
+    if len(occupied) != len(ticket_slots):
+        errors.append(
+            f"{len(occupied)} occupied slots but {len(ticket_slots)} open tickets"
+        )
+    if lot.available_slots != lot.total_slots - len(occupied):
+        errors.append(
+            f"available_slots={lot.available_slots}, "
+            f"expected {lot.total_slots - len(occupied)}"
+        )
+    for slot_type, count in lot.get_occupancy().items():
+        actual = sum(1 for s in occupied if s.slot_type == slot_type)
+        if count != actual:
+            errors.append(f"{slot_type.name} occupancy counter {count} != {actual}")
+    for slot_type, count in lot.get_availability().items():
+        actual = sum(
+            1
+            for s in lot.slots.values()
+            if s.slot_type == slot_type and s.status == SlotStatus.AVAILABLE
+        )
+        if count != actual:
+            errors.append(f"{slot_type.name} availability counter {count} != {actual}")
+
+
+def run_stress_test(gates: int = 8, operations: int = 20000, slots_per_type: int = 50):
+    service = ParkingService(create_parking_lot(slots_per_type), NearestSpotStrategy())
+    held = {}
+    held_lock = threading.Lock()
+    errors = []
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=gates) as pool:
+        futures = [
+            pool.submit(run_gate, service, g, operations, held, held_lock, errors)
+            for g in range(gates)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    check_consistency(service, errors)
+    print(
+        f"{gates} gates x {operations} ops in {elapsed:.2f}s "
+        f"({gates * operations / elapsed:,.0f} ops/s), "
+        f"{len(service.tickets)} vehicles still parked"
+    )
+    for error in errors[:10]:
+        print(f"  ERROR: {error}")
+    print("No double occupancy detected." if not errors else f"{len(errors)} errors!")
+    return not errors
+
+
+if __name__ == "__main__":
+    ok = all(run_stress_test(gates=gates) for gates in (1, 2, 4, 8))
+    raise SystemExit(0 if ok else 1)
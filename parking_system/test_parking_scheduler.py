@@ -0,0 +1,45 @@
+import random
+
+from parking_scheduler import TimingWheel
+
+
+def _fire_ticks(wheel: TimingWheel, deadlines, until: int):
+    fired = {}
+    for deadline in deadlines:
+        wheel.schedule(
+            deadline,
+            lambda deadline=deadline: fired.setdefault(deadline, wheel.current_tick),
+        )
+    for tick in range(1, until + 1):
+        wheel.advance(tick)
+    return fired
+
+
+def test_deadlines_on_wheel_boundaries_fire_on_time():
+    wheel = TimingWheel(tick_seconds=1, wheel_size=16, levels=3, start_time=0)
+    # Multiples of each level's span are where timers cascade down on the
+    # very tick they are due
+    deadlines = {16 * k for k in range(1, 200)} | {256 * k for k in range(1, 12)}
+    fired = _fire_ticks(wheel, deadlines, 4096)
+    assert fired == {deadline: deadline for deadline in deadlines}
+    assert len(wheel) == 0
+
+
+def test_random_deadlines_fire_on_time():
+    rng = random.Random(7)
+    wheel = TimingWheel(tick_seconds=1, wheel_size=16, levels=4, start_time=0)
+    deadlines = {rng.randrange(1, 20000) for _ in range(5000)}
+    fired = _fire_ticks(wheel, deadlines, 20000)
+    assert fired == {deadline: deadline for deadline in deadlines}
+
+
+def test_cancelled_timer_does_not_fire():
+    wheel = TimingWheel(tick_seconds=1, wheel_size=16, levels=3, start_time=0)
+    fired = []
+    handle = wheel.schedule(256, lambda: fired.append(256))
+    wheel.schedule(257, lambda: fired.append(257))
+    handle.cancel()
+    for tick in range(1, 300):
+        wheel.advance(tick)
+    assert fired == [257]
+    assert len(wheel) == 0
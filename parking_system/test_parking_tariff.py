@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from parking_enums import ParkingSlotType
+from parking_tariff import (
+    DailyCapTariff,
+    HourlyTariff,
+    SlotTypeTariff,
+    TieredHourlyTariff,
+)
+
+np = pytest.importorskip("numpy")
+
+TIERED = TieredHourlyTariff([(1, 0), (3, 5), (float("inf"), 8)])
+TARIFFS = [
+    HourlyTariff(10.0),
+    TIERED,
+    DailyCapTariff(HourlyTariff(4.0), 30.0),
+    DailyCapTariff(TIERED, 60.0),
+    SlotTypeTariff(
+        {ParkingSlotType.LARGE: DailyCapTariff(TIERED, 60.0)}, HourlyTariff(3.0)
+    ),
+]
+
+
+@pytest.mark.parametrize("tariff", TARIFFS, ids=lambda t: type(t).__name__)
+def test_batch_fees_match_scalar_fees(tariff):
+    rng = random.Random(7)
+    # Whole hours and days, where tiers and caps switch over, and random stays
+    hours = [float(h) for h in range(100)]
+    hours += [rng.uniform(0, 200) for _ in range(500)]
+    slot_types = [rng.choice(list(ParkingSlotType)) for _ in hours]
+    batch = tariff.compute_fees(np.array(hours), slot_types)
+    scalar = [tariff.fee(h, slot_type) for h, slot_type in zip(hours, slot_types)]
+    assert batch.tolist() == pytest.approx(scalar)
@@ -0,0 +1,292 @@
+import asyncio
+import contextlib
+import io
+import glob
+import os
+import random
+import shutil
+import tempfile
+import sys
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from core_entities import TodoStatus, TodoSystem
+from todo_service import TodoService
+from todo_store import HINT_SUFFIX, TodoStore
+
+
+def quiet():
+    # The system prints on every call; keep it out of the timings
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def create_system(todo_count: int, todos_per_user: int = 20) -> TodoSystem:
+    rng = random.Random(todo_count)
+    system = TodoSystem()
+    with quiet():
+        users = [
+            system.add_user(f"User {i}")
+            for i in range(max(1, todo_count // todos_per_user))
+        ]
+        for i in range(todo_count):
+            todo = system.add_todo(rng.choice(users).id, f"Todo {i}", "")
+            if rng.random() < 0.3:
+                system.update_todo_status(
+                    todo.id, rng.choice([TodoStatus.COMPLETED, TodoStatus.DELETED])
+                )
+    return system
+
+
+def benchmark_user_queries(sizes=(10_000, 100_000, 1_000_000), queries: int = 2000):
+    print("Per-user query latency as the total todo count grows")
+    for size in sizes:
+        system = create_system(size)
+        rng = random.Random(size)
+        user_ids = [rng.randrange(1, len(system.users) + 1) for _ in range(queries)]
+        timings = {}
+        with quiet():
+            for name, query in (
+                ("all", lambda user_id: system.get_user_todos(user_id)),
+                (
+                    "pending page",
+                    lambda user_id: system.get_user_todos_page(
+                        user_id, TodoStatus.PENDING, limit=10
+                    ),
+                ),
+            ):
+                start = time.perf_counter()
+                for user_id in user_ids:
+                    query(user_id)
+                timings[name] = (time.perf_counter() - start) / queries
+        print(
+            f"  {size:>9,} todos, {len(system.users):>6,} users: "
+            + ", ".join(f"{name} {t * 1e6:6.1f} us" for name, t in timings.items())
+        )
+
+
+async def _run_clients(
+    clients: int, ops_per_client: int, tenants: int, batch_size: int
+) -> Tuple[float, List[float]]:
+    latencies: List[float] = []
+
+    async def client(index: int):
+        rng = random.Random(index)
+        tenant_id = f"tenant-{index % tenants}"
+        user = await service.add_user(tenant_id, f"User {index}")
+        todo_ids = []
+        for i in range(ops_per_client):
+            start = time.perf_counter()
+            roll = rng.random()
+            if roll < 0.5 or not todo_ids:
+                todo = await service.add_todo(tenant_id, user.id, f"Todo {i}", "")
+                todo_ids.append(todo.id)
+            elif roll < 0.75:
+                await service.update_todo_status(
+                    tenant_id, rng.choice(todo_ids), TodoStatus.COMPLETED
+                )
+            else:
+                service.get_user_todos_page(tenant_id, user.id, limit=10)
+            latencies.append(time.perf_counter() - start)
+
+    async def drain(subscription):
+        async for _ in subscription:
+            pass
+
+    async with TodoService(batch_size=batch_size) as service:
+        # One subscriber on the whole stream, as a change feed would be
+        consumer = asyncio.create_task(drain(service.subscribe()))
+        start = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+    await consumer
+    return elapsed, latencies
+
+
+def benchmark_service(
+    client_counts=(1, 10, 100, 1000), ops: int = 100_000, batch_sizes=(1, 256)
+):
+    print("TodoService throughput and latency against concurrent clients")
+    for batch_size in batch_sizes:
+        print(f"  batch_size={batch_size}")
+        for clients in client_counts:
+            elapsed, latencies = asyncio.run(
+                _run_clients(clients, ops // clients, max(1, clients // 10), batch_size)
+            )
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[int(len(latencies) * 0.99)]
+            print(
+                f"    {clients:>5} clients: {len(latencies) / elapsed:>9,.0f} ops/s, "
+                f"p50 {p50 * 1e6:8.1f} us, p99 {p99 * 1e6:8.1f} us"
+            )
+
+
+def _disk_usage(directory: str) -> int:
+    paths = glob.glob(os.path.join(directory, "*"))
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def benchmark_store(todo_count: int = 200_000, users: int = 10_000):
+    print("Log-structured TodoStore")
+    directory = tempfile.mkdtemp(prefix="todo-store-")
+    try:
+        rng = random.Random(todo_count)
+        # Compaction is run by hand below, so it can be measured on its own
+        store = TodoStore(directory, fsync_batch_size=1024, compact_ratio=1.0)
+        system = TodoSystem(verbose=False, store=store)
+        start = time.perf_counter()
+        for i in range(users):
+            system.add_user(f"User {i}")
+        for i in range(todo_count):
+            system.add_todo(rng.randrange(1, users + 1), f"Todo {i}", "x" * 40)
+        elapsed = time.perf_counter() - start
+        print(f"  writes: {(users + todo_count) / elapsed:,.0f} records/s")
+
+        start = time.perf_counter()
+        for todo_id in rng.sample(range(1, todo_count + 1), todo_count // 2):
+            status = rng.choice([TodoStatus.COMPLETED, TodoStatus.DELETED])
+            system.update_todo_status(todo_id, status)
+        elapsed = time.perf_counter() - start
+        print(f"  status updates: {todo_count // 2 / elapsed:,.0f} updates/s")
+        store.close()
+
+        # Timed up to a usable TodoSystem, indexes rebuilt
+        start = time.perf_counter()
+        TodoSystem(verbose=False, store=TodoStore(directory)).store.close()
+        hinted = time.perf_counter() - start
+        for path in glob.glob(os.path.join(directory, "*" + HINT_SUFFIX)):
+            os.remove(path)
+        start = time.perf_counter()
+        store = TodoSystem(verbose=False, store=TodoStore(directory)).store
+        scanned = time.perf_counter() - start
+        print(
+            f"  cold start: {hinted * 1000:.0f} ms from hints, "
+            f"{scanned * 1000:.0f} ms scanning segments"
+        )
+
+        before = _disk_usage(directory)
+        start = time.perf_counter()
+        reclaimed = store.compact()
+        elapsed = time.perf_counter() - start
+        print(
+            f"  compaction: {before / 1e6:.1f} MB -> {_disk_usage(directory) / 1e6:.1f}"
+            f" MB, {reclaimed / 1e6:.1f} MB reclaimed in {elapsed * 1000:.0f} ms"
+        )
+        store.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+WORDS = (
+    "buy groceries milk bread eggs run park miles read book finish call mom "
+    "pay rent bills email report review meeting plan trip clean kitchen fix "
+    "bike walk dog water plants book dentist gym laundry cook dinner"
+).split()
+
+
+def benchmark_search(todos_per_user: int = 10_000, queries: int = 2000):
+    print(f"Per-user todo search at {todos_per_user:,} todos per user")
+    rng = random.Random(todos_per_user)
+    system = TodoSystem(verbose=False)
+    user = system.add_user("Alice")
+    start = time.perf_counter()
+    for i in range(todos_per_user):
+        todo = system.add_todo(
+            user.id,
+            " ".join(rng.sample(WORDS, 3)) + f" {i}",
+            " ".join(rng.sample(WORDS, 8)),
+        )
+        if rng.random() < 0.3:
+            system.update_todo_status(
+                todo.id, rng.choice([TodoStatus.COMPLETED, TodoStatus.DELETED])
+            )
+    elapsed = (time.perf_counter() - start) / todos_per_user
+    print(f"  adding todos: {elapsed * 1e6:.1f} us each")
+
+    start = time.perf_counter()
+    system.search_todos(user.id, "groceries")
+    elapsed = time.perf_counter() - start
+    print(f"  first search, building the user's index: {elapsed * 1000:.1f} ms")
+
+    for query, status in (
+        ("groceries", None),
+        ("run", None),
+        ("gro", None),
+        ("b", None),
+        ("buy milk", TodoStatus.PENDING),
+        ("123", None),
+    ):
+        start = time.perf_counter()
+        for _ in range(queries):
+            hits = system.search_todos(user.id, query, status, limit=20)
+        elapsed = (time.perf_counter() - start) / queries
+        print(
+            f"  {query!r:>12} {status or '':<20} {elapsed * 1e6:7.1f} us, "
+            f"{len(hits)} hits"
+        )
+
+    start = time.perf_counter()
+    for i in range(queries):
+        todo = system.add_todo(user.id, f"call mom {i}", "")
+        system.update_todo_status(todo.id, TodoStatus.DELETED)
+    elapsed = (time.perf_counter() - start) / queries
+    print(f"  add + delete with the index live: {elapsed * 1e6:.1f} us")
+
+
+def benchmark_memory(sizes=(100_000, 1_000_000), todos_per_user: int = 20):
+    print("TodoSystem memory and access: objects vs CompactTodos")
+    for size in sizes:
+        for compact in (False, True):
+            rng = random.Random(size)
+            tracemalloc.start()
+            system = TodoSystem(verbose=False, compact=compact)
+            users = max(1, size // todos_per_user)
+            for i in range(users):
+                system.add_user(f"User {i}")
+            for i in range(size):
+                system.add_todo(
+                    rng.randrange(1, users + 1), f"Todo {i}", "Remember to do it"
+                )
+            todos_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            todo_ids = [rng.randrange(1, size + 1) for _ in range(100_000)]
+            start = time.perf_counter()
+            for todo_id in todo_ids:
+                system.todos[todo_id].status
+            by_id = (time.perf_counter() - start) / len(todo_ids)
+            user_ids = todo_ids[:10_000]
+            start = time.perf_counter()
+            for user_id in user_ids:
+                for todo in system.get_user_todos(user_id % users + 1):
+                    todo.title
+            per_user = (time.perf_counter() - start) / len(user_ids)
+
+            # Search indexes are only built for users who search
+            tracemalloc.start()
+            for user_id in range(1, users + 1):
+                system.search_todos(user_id, "todo")
+            search_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            layout = "compact" if compact else "objects"
+            print(
+                f"  {size:>9,} todos, {layout}: {todos_bytes / size:6.1f} bytes/todo, "
+                f"by id {by_id * 1e9:5.0f} ns, user's todos {per_user * 1e6:5.1f} us, "
+                f"+{search_bytes / size:5.1f} bytes/todo once every user searched"
+            )
+
+
+BENCHMARKS = {
+    "user_queries": benchmark_user_queries,
+    "service": benchmark_service,
+    "store": benchmark_store,
+    "search": benchmark_search,
+    "memory": benchmark_memory,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -0,0 +1,161 @@
+from array import array
+from collections.abc import MutableMapping
+from typing import Iterator, List
+
+from core_entities import Todo, TodoStatus, User
+
+_STATUSES = list(TodoStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+
+
+class TodoView:
+    # Todo backed by a CompactTodos row. Views are created on access and hold
+    # nothing but the row, so any number of views of one todo stay
+    # consistent. Only the status can change once a todo is added. Not a Todo
+    # subclass: that would give every view a __dict__ despite __slots__.
+    __slots__ = ("_todos", "_row")
+
+    def __init__(self, todos: "CompactTodos", row: int):
+        self._todos = todos
+        self._row = row
+
+    @property
+    def id(self) -> int:
+        return self._row + 1
+
+    @property
+    def user_id(self) -> int:
+        return self._todos._user_ids[self._row]
+
+    @property
+    def title(self) -> str:
+        return self._todos._text(2 * self._row)
+
+    @property
+    def description(self) -> str:
+        return self._todos._text(2 * self._row + 1)
+
+    @property
+    def status(self) -> TodoStatus:
+        return _STATUSES[self._todos._statuses[self._row]]
+
+    @status.setter
+    def status(self, status: TodoStatus):
+        self._todos._statuses[self._row] = _STATUS_CODES[status]
+
+    def to_todo(self) -> Todo:
+        return Todo(self.id, self.user_id, self.title, self.description, self.status)
+
+    def __repr__(self) -> str:
+        return repr(self.to_todo())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, TodoView):
+            other = other.to_todo()
+        return self.to_todo() == other
+
+
+class UserView:
+    __slots__ = ("_users", "_row")
+
+    def __init__(self, users: "CompactUsers", row: int):
+        self._users = users
+        self._row = row
+
+    @property
+    def id(self) -> int:
+        return self._row + 1
+
+    @property
+    def name(self) -> str:
+        return self._users._names[self._row]
+
+    def to_user(self) -> User:
+        return User(self.id, self.name)
+
+    def __repr__(self) -> str:
+        return repr(self.to_user())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, UserView):
+            other = other.to_user()
+        return self.to_user() == other
+
+
+# Structure-of-arrays todo storage: a 4-byte user id and a 1-byte status per
+# todo, with titles and descriptions back to back in one UTF-8 arena and
+# their boundaries in an offset array, all indexed by id - 1. Behaves like the
+# Dict[int, Todo] TodoSystem keeps by default, handing out TodoViews; ids have
+# to be added in order, as TodoSystem allocates them.
+class CompactTodos(MutableMapping):
+    def __init__(self):
+        self._user_ids = array("I")
+        self._statuses = array("B")
+        self._arena = bytearray()
+        self._offsets = array("Q", [0])
+
+    def _text(self, field: int) -> str:
+        return self._arena[self._offsets[field] : self._offsets[field + 1]].decode()
+
+    def _row(self, todo_id: int) -> int:
+        if not isinstance(todo_id, int) or not 0 < todo_id <= len(self._statuses):
+            raise KeyError(todo_id)
+        return todo_id - 1
+
+    def __getitem__(self, todo_id: int) -> TodoView:
+        return TodoView(self, self._row(todo_id))
+
+    def __setitem__(self, todo_id: int, todo: Todo):
+        if todo_id == len(self._statuses) + 1:
+            self._user_ids.append(todo.user_id)
+            self._statuses.append(_STATUS_CODES[todo.status])
+            for text in (todo.title, todo.description):
+                self._arena += text.encode()
+                self._offsets.append(len(self._arena))
+        else:
+            self._statuses[self._row(todo_id)] = _STATUS_CODES[todo.status]
+
+    def __delitem__(self, todo_id: int):
+        raise TypeError("Todos cannot be removed from CompactTodos")
+
+    def __contains__(self, todo_id) -> bool:
+        return isinstance(todo_id, int) and 0 < todo_id <= len(self._statuses)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(1, len(self._statuses) + 1))
+
+    def __len__(self) -> int:
+        return len(self._statuses)
+
+
+# Users as a plain list of names indexed by id - 1, without an object per
+# user. There are far fewer users than todos, so the names stay Python strs.
+class CompactUsers(MutableMapping):
+    def __init__(self):
+        self._names: List[str] = []
+
+    def _row(self, user_id: int) -> int:
+        if not isinstance(user_id, int) or not 0 < user_id <= len(self._names):
+            raise KeyError(user_id)
+        return user_id - 1
+
+    def __getitem__(self, user_id: int) -> UserView:
+        return UserView(self, self._row(user_id))
+
+    def __setitem__(self, user_id: int, user: User):
+        if user_id == len(self._names) + 1:
+            self._names.append(user.name)
+        else:
+            self._names[self._row(user_id)] = user.name
+
+    def __delitem__(self, user_id: int):
+        raise TypeError("Users cannot be removed from CompactUsers")
+
+    def __contains__(self, user_id) -> bool:
+        return isinstance(user_id, int) and 0 < user_id <= len(self._names)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(1, len(self._names) + 1))
+
+    def __len__(self) -> int:
+        return len(self._names)
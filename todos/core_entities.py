@@ -1,5 +1,13 @@
+import bisect
+from array import array
 from dataclasses import dataclass
 from enum import Enum
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from todo_search import TodoSearchIndex
+
+if TYPE_CHECKING:
+    from todo_store import TodoStore
 
 @dataclass
 class User:
@@ -22,37 +30,160 @@ class Todo:
 
 
 class TodoSystem:
-    def __init__(self):
-        self.users = {}
-        self.todos = {}
-        self.next_user_id = 1
-        self.next_todo_id = 1
+    def __init__(
+        self,
+        verbose: bool = True,
+        store: Optional["TodoStore"] = None,
+        compact: bool = False,
+    ):
+        self.verbose = verbose
+        self.store = store
+        if store is not None:
+            self.users = store.users
+            self.todos = store.todos
+        elif compact:
+            # Columnar users and todos instead of an object per record, see
+            # CompactTodos
+            from compact_todos import CompactTodos, CompactUsers
+
+            self.users = CompactUsers()
+            self.todos = CompactTodos()
+        else:
+            self.users = {}
+            self.todos = {}
+        self.next_user_id = max(self.users, default=0) + 1
+        # A store drops deleted todos, so it keeps their highest id itself
+        self.next_todo_id = (
+            store.max_todo_id if store is not None else max(self.todos, default=0)
+        ) + 1
+        # Sorted todo ids per user (DELETED excluded) and per (user, status);
+        # ids only grow, so adding a todo is an append
+        self._user_todo_ids: Dict[int, List[int]] = {}
+        self._status_todo_ids: Dict[Tuple[int, TodoStatus], List[int]] = {}
+        # Compact systems keep those ids as 4-byte array items, not int objects
+        self._new_ids = (lambda: array("I")) if compact else list
+        # Search index per user, built on the user's first search and kept up
+        # to date from then on. Users who never search cost no memory, and
+        # opening a store reads no todo until someone searches.
+        self._search: Dict[int, TodoSearchIndex] = {}
+        if store is not None:
+            for todo_id, user_id, status in sorted(store.todo_keys()):
+                self._index(todo_id, user_id, status)
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
 
     def add_user(self, name: str) -> User:
-        print(f"Adding user: {name}")
+        self._log(f"Adding user: {name}")
         user = User(id=self.next_user_id, name=name)
         self.users[self.next_user_id] = user
         self.next_user_id += 1
         return user
 
     def add_todo(self, user_id: int, title: str, description: str) -> Todo:
-        print(f"Adding todo for user_id: {user_id}, title: {title}")
+        self._log(f"Adding todo for user_id: {user_id}, title: {title}")
         if user_id not in self.users:
             raise ValueError("User not found")
         todo = Todo(id=self.next_todo_id, user_id=user_id, title=title, description=description)
         self.todos[self.next_todo_id] = todo
+        self._index(todo.id, user_id, todo.status)
+        if (search := self._search.get(user_id)) is not None:
+            search.add(todo.id, title, description, todo.status)
         self.next_todo_id += 1
         return todo
 
+    def _index(self, todo_id: int, user_id: int, status: TodoStatus):
+        if status != TodoStatus.DELETED:
+            if (ids := self._user_todo_ids.get(user_id)) is None:
+                ids = self._user_todo_ids[user_id] = self._new_ids()
+            bisect.insort(ids, todo_id)
+        if (ids := self._status_todo_ids.get((user_id, status))) is None:
+            ids = self._status_todo_ids[(user_id, status)] = self._new_ids()
+        bisect.insort(ids, todo_id)
+
+    def _search_index(self, user_id: int) -> TodoSearchIndex:
+        if (search := self._search.get(user_id)) is None:
+            search = self._search[user_id] = TodoSearchIndex()
+            for todo_id in self._user_todo_ids.get(user_id, ()):
+                todo = self.todos[todo_id]
+                search.add(todo_id, todo.title, todo.description, todo.status)
+        return search
+
+    def _unindex(self, todo: Todo):
+        if todo.status != TodoStatus.DELETED:
+            _remove_id(self._user_todo_ids[todo.user_id], todo.id)
+        _remove_id(self._status_todo_ids[(todo.user_id, todo.status)], todo.id)
+
     def update_todo_status(self, todo_id: int, status: TodoStatus):
-        print(f"Updating todo_id: {todo_id} to status: {status}")
+        self._log(f"Updating todo_id: {todo_id} to status: {status}")
         if todo_id not in self.todos:
             raise ValueError("Todo not found")
-        self.todos[todo_id].status = status
+        todo = self.todos[todo_id]
+        if todo.status == status:
+            return
+        self._unindex(todo)
+        if (search := self._search.get(todo.user_id)) is not None:
+            if status == TodoStatus.DELETED:
+                search.remove(todo.id, todo.title, todo.description)
+            elif todo.status == TodoStatus.DELETED:
+                search.add(todo.id, todo.title, todo.description, status)
+            else:
+                search.set_status(todo.id, status)
+        todo.status = status
+        if status == TodoStatus.DELETED and self.store is not None:
+            # The store keeps no deleted todos, so they leave the indexes too
+            del self.todos[todo_id]
+            return
+        self.todos[todo_id] = todo
+        self._index(todo.id, todo.user_id, status)
 
     def get_user_todos(self, user_id: int):
-        print(f"Getting todos for user_id: {user_id}")
+        self._log(f"Getting todos for user_id: {user_id}")
+        if user_id not in self.users:
+            raise ValueError("User not found")
+        return [self.todos[todo_id] for todo_id in self._user_todo_ids.get(user_id, [])]
+
+    def get_user_todos_page(
+        self,
+        user_id: int,
+        status: Optional[TodoStatus] = None,
+        after_id: int = 0,
+        limit: int = 50,
+    ) -> List[Todo]:
+        # Todos in id order starting after `after_id`; pass the last id of a
+        # page to get the next one. Without a status DELETED todos are left out.
+        if user_id not in self.users:
+            raise ValueError("User not found")
+        if status is None:
+            ids = self._user_todo_ids.get(user_id, [])
+        else:
+            ids = self._status_todo_ids.get((user_id, status), [])
+        start = bisect.bisect_right(ids, after_id)
+        return [self.todos[todo_id] for todo_id in ids[start : start + limit]]
+
+    def search_todos(
+        self,
+        user_id: int,
+        query: str,
+        status: Optional[TodoStatus] = None,
+        limit: int = 50,
+    ) -> List[Todo]:
+        # The user's todos matching every query term, by prefix, in id order.
+        # DELETED todos never match.
+        self._log(f"Searching todos for user_id: {user_id}, query: {query}")
         if user_id not in self.users:
             raise ValueError("User not found")
-        return [todo for todo in self.todos.values() if todo.user_id == user_id]
-    
\ No newline at end of file
+        search = self._search_index(user_id)
+        return [self.todos[todo_id] for todo_id in search.search(query, status, limit)]
+
+    def count_user_todos(
+        self, user_id: int, status: Optional[TodoStatus] = None
+    ) -> int:
+        if status is None:
+            return len(self._user_todo_ids.get(user_id, []))
+        return len(self._status_todo_ids.get((user_id, status), []))
+
+
+def _remove_id(ids: List[int], todo_id: int):
+    del ids[bisect.bisect_left(ids, todo_id)]
@@ -0,0 +1,150 @@
+import bisect
+import heapq
+import re
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from core_entities import TodoStatus
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Terms with more completions than this have them merged into one id array
+# per search, instead of each completion being checked per candidate
+MERGE_EXPANSIONS = 16
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+# Inverted index over one user's todo titles and descriptions. Every query
+# term matches as a prefix of an indexed token ("groc" finds "groceries") and
+# all terms must match. Statuses are kept alongside so a search can be scoped
+# to one; deleted todos are removed from the index altogether.
+#
+# Postings are sorted arrays of ids rather than sets, to keep an index with
+# many todos small. Results come back in id order: search walks the rarest
+# term's ids in order, checks the other terms by bisecting forward through
+# theirs, and stops once the page is full. A page only comes back short when
+# there are no more matches, so every completion of a term is used.
+class TodoSearchIndex:
+    def __init__(self):
+        self.postings: Dict[str, array] = {}
+        self.vocabulary: List[str] = []  # Sorted, for prefix ranges
+        self.ids = array("I")  # Sorted
+        self.statuses: List["TodoStatus"] = []  # In step with ids
+
+    def add(self, todo_id: int, title: str, description: str, status: "TodoStatus"):
+        position = _insert(self.ids, todo_id)
+        self.statuses.insert(position, status)
+        tokens = set(tokenize(title))
+        tokens.update(tokenize(description))
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                self.postings[token] = array("I", (todo_id,))
+                bisect.insort(self.vocabulary, token)
+            elif postings[-1] < todo_id:
+                postings.append(todo_id)
+            else:
+                _insert(postings, todo_id)
+
+    def remove(self, todo_id: int, title: str, description: str):
+        position = bisect.bisect_left(self.ids, todo_id)
+        del self.ids[position]
+        del self.statuses[position]
+        tokens = set(tokenize(title))
+        tokens.update(tokenize(description))
+        for token in tokens:
+            postings = self.postings[token]
+            del postings[bisect.bisect_left(postings, todo_id)]
+            if not postings:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def set_status(self, todo_id: int, status: "TodoStatus"):
+        self.statuses[bisect.bisect_left(self.ids, todo_id)] = status
+
+    def _expand(self, term: str) -> List[array]:
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + "￿", lo=start)
+        return [self.postings[token] for token in self.vocabulary[start:end]]
+
+    def search(
+        self, query: str, status: Optional["TodoStatus"] = None, limit: int = 50
+    ) -> List[int]:
+        # Matching todo ids in id order
+        terms = tokenize(query)
+        if not terms:
+            return []
+        expanded = sorted(
+            (self._expand(term) for term in set(terms)),
+            key=lambda postings: sum(map(len, postings)),
+        )
+        rarest, others = expanded[0], expanded[1:]
+        if not rarest:
+            return []
+        # A short prefix can have hundreds of completions, too many to check
+        # one by one for every candidate
+        others = [
+            [array("I", _merge(postings))]
+            if len(postings) > MERGE_EXPANSIONS
+            else postings
+            for postings in others
+        ]
+        candidates: Iterable[int] = (
+            rarest[0] if len(rarest) == 1 else heapq.merge(*rarest)
+        )
+        # Candidates only go up, so every bisect starts where the last ended
+        cursors = [[0] * len(postings) for postings in others]
+        status_cursor = previous = 0
+        hits: List[int] = []
+        for todo_id in candidates:
+            if todo_id == previous:
+                continue  # Matched more than one completion
+            previous = todo_id
+            if status is not None:
+                status_cursor = _seek(self.ids, todo_id, status_cursor)
+                if self.statuses[status_cursor] != status:
+                    continue
+            for postings, positions in zip(others, cursors):
+                for i, ids in enumerate(postings):
+                    position = positions[i] = _seek(ids, todo_id, positions[i])
+                    if position < len(ids) and ids[position] == todo_id:
+                        break
+                else:
+                    break  # No match for this term
+            else:
+                hits.append(todo_id)
+                if len(hits) == limit:
+                    break
+        return hits
+
+
+def _merge(postings: List[array]) -> Iterable[int]:
+    # Sorted ids in any of the arrays; a todo can be in several
+    previous = 0
+    for todo_id in heapq.merge(*postings):
+        if todo_id != previous:
+            yield todo_id
+            previous = todo_id
+
+
+def _seek(ids: array, todo_id: int, lo: int) -> int:
+    # bisect_left from lo, galloping: the next candidate is usually close by
+    step = 8
+    while lo + step < len(ids) and ids[lo + step] < todo_id:
+        lo += step + 1
+        step *= 2
+    return bisect.bisect_left(ids, todo_id, lo, min(lo + step, len(ids)))
+
+
+def _insert(ids: array, todo_id: int) -> int:
+    # Ids are allocated in order, so this is nearly always an append
+    if not ids or ids[-1] < todo_id:
+        ids.append(todo_id)
+        return len(ids) - 1
+    position = bisect.bisect_left(ids, todo_id)
+    ids.insert(position, todo_id)
+    return position
@@ -0,0 +1,274 @@
+import asyncio
+from enum import Enum
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from core_entities import Todo, TodoStatus, TodoSystem, User
+
+
+class TodoEventType(Enum):
+    ADDED = "added"
+    STATUS_CHANGED = "status_changed"
+
+
+class TodoEvent(NamedTuple):
+    tenant_id: str
+    event_type: TodoEventType
+    todo_id: int
+    user_id: int
+    status: TodoStatus
+
+
+# A subscriber's view of the event stream. Each shard batch arrives as one
+# queue item, and the queue holds at most `maxsize` of them. When it is full
+# the shard writer waits up to the service's `max_publish_wait` for room, which
+# holds back further writes to that shard, and then disconnects the subscriber
+# rather than stall the shard for good.
+class Subscription:
+    def __init__(
+        self, service: "TodoService", tenant_id: Optional[str], maxsize: int
+    ):
+        self.service = service
+        self.tenant_id = tenant_id
+        self.queue: "asyncio.Queue[Optional[List[TodoEvent]]]" = asyncio.Queue(
+            maxsize
+        )
+        self.closed = False
+        self._closing: Optional[asyncio.Future] = None
+        self._batch: List[TodoEvent] = []
+        self._position = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> TodoEvent:
+        while self._position >= len(self._batch):
+            if self.closed and self.queue.empty():
+                raise StopAsyncIteration
+            batch = await self.queue.get()
+            if batch is None:
+                raise StopAsyncIteration
+            self._batch, self._position = batch, 0
+        event = self._batch[self._position]
+        self._position += 1
+        return event
+
+    def close(self):
+        self.service._unsubscribe(self)
+
+
+class _Shard:
+    def __init__(self):
+        self.tenants: Dict[str, TodoSystem] = {}
+        self.pending: List[Tuple] = []
+        self.ready = asyncio.Event()
+        self.not_full = asyncio.Event()
+        self.closing = False
+        self.writer: Optional[asyncio.Task] = None
+
+
+# asyncio front for many TodoSystems, one per tenant. Tenants are spread over
+# shards, and each shard has a single writer task. Clients append writes to
+# their shard's pending list and wait on a future; the writer wakes once for
+# whatever has piled up, applies up to `batch_size` writes, resolves their
+# futures and hands the batch's events to each subscriber as one queue item,
+# then yields to the loop before the next batch. A tenant is only ever written
+# by its shard's writer, so its TodoSystem keeps allocating ids from its own
+# counters with no locking. Reads go straight to the tenant's TodoSystem.
+class TodoService:
+    def __init__(
+        self,
+        shards: int = 8,
+        batch_size: int = 256,
+        max_pending: int = 4096,
+        max_publish_wait: float = 1.0,
+    ):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_publish_wait = max_publish_wait
+        self._shards = [_Shard() for _ in range(shards)]
+        self._subscribers: Dict[Optional[str], List[Subscription]] = {}
+
+    async def start(self):
+        for shard in self._shards:
+            if shard.writer is None:
+                shard.closing = False
+                shard.writer = asyncio.create_task(self._run_writer(shard))
+
+    async def close(self):
+        # Writes queued before the close are still applied
+        for shard in self._shards:
+            if shard.writer is not None:
+                shard.closing = True
+                shard.ready.set()
+                await shard.writer
+                shard.writer = None
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                self._unsubscribe(subscription)
+
+    async def __aenter__(self) -> "TodoService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _shard(self, tenant_id: str) -> _Shard:
+        return self._shards[hash(tenant_id) % len(self._shards)]
+
+    def _tenant(self, tenant_id: str) -> TodoSystem:
+        system = self._shard(tenant_id).tenants.get(tenant_id)
+        if system is None:
+            raise ValueError("Tenant not found")
+        return system
+
+    async def _submit(self, tenant_id: str, op: str, *args) -> Any:
+        shard = self._shard(tenant_id)
+        while True:
+            # Checked again after every wait: a write queued once the writer
+            # has stopped, or is stopping, would never be applied
+            if shard.writer is None or shard.closing:
+                raise RuntimeError("service closed")
+            if len(shard.pending) < self.max_pending:
+                break
+            shard.not_full.clear()
+            await shard.not_full.wait()
+        future = asyncio.get_running_loop().create_future()
+        shard.pending.append((tenant_id, op, args, future))
+        shard.ready.set()
+        return await future
+
+    async def add_user(self, tenant_id: str, name: str) -> User:
+        return await self._submit(tenant_id, "add_user", name)
+
+    async def add_todo(
+        self, tenant_id: str, user_id: int, title: str, description: str
+    ) -> Todo:
+        return await self._submit(tenant_id, "add_todo", user_id, title, description)
+
+    async def update_todo_status(
+        self, tenant_id: str, todo_id: int, status: TodoStatus
+    ):
+        await self._submit(tenant_id, "update_todo_status", todo_id, status)
+
+    def get_user_todos(self, tenant_id: str, user_id: int) -> List[Todo]:
+        return self._tenant(tenant_id).get_user_todos(user_id)
+
+    def get_user_todos_page(
+        self,
+        tenant_id: str,
+        user_id: int,
+        status: Optional[TodoStatus] = None,
+        after_id: int = 0,
+        limit: int = 50,
+    ) -> List[Todo]:
+        return self._tenant(tenant_id).get_user_todos_page(
+            user_id, status, after_id, limit
+        )
+
+    def subscribe(
+        self, tenant_id: Optional[str] = None, maxsize: int = 1024
+    ) -> Subscription:
+        # Events for one tenant, or for all of them without a tenant_id
+        subscription = Subscription(self, tenant_id, maxsize)
+        self._subscribers.setdefault(tenant_id, []).append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.tenant_id, [])
+        if subscription in subscriptions:
+            subscriptions.remove(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.tenant_id]
+        subscription.closed = True
+        # Wakes a writer waiting for room in this subscriber's queue
+        if subscription._closing is not None and not subscription._closing.done():
+            subscription._closing.set_result(None)
+        if not subscription.queue.full():
+            subscription.queue.put_nowait(None)
+
+    async def _run_writer(self, shard: _Shard):
+        pending = shard.pending
+        while True:
+            await shard.ready.wait()
+            shard.ready.clear()
+            while pending:
+                batch = pending[: self.batch_size]
+                del pending[: self.batch_size]
+                shard.not_full.set()
+                events: List[TodoEvent] = []
+                for tenant_id, op, args, future in batch:
+                    try:
+                        result = self._apply(shard, tenant_id, op, args, events)
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                if events:
+                    await self._publish(events)
+                # Let the clients whose writes just landed queue their next ones
+                await asyncio.sleep(0)
+            if shard.closing:
+                return
+
+    def _apply(
+        self,
+        shard: _Shard,
+        tenant_id: str,
+        op: str,
+        args: Tuple,
+        events: List[TodoEvent],
+    ) -> Any:
+        system = shard.tenants.get(tenant_id)
+        if system is None:
+            system = shard.tenants[tenant_id] = TodoSystem(verbose=False)
+        if op == "add_user":
+            return system.add_user(*args)
+        if op == "add_todo":
+            todo = system.add_todo(*args)
+            result, event_type = todo, TodoEventType.ADDED
+        else:
+            todo_id, status = args
+            old = system.todos.get(todo_id)
+            old_status = old.status if old else None
+            system.update_todo_status(todo_id, status)
+            if old_status == status:
+                return None
+            todo = system.todos[todo_id]
+            result, event_type = None, TodoEventType.STATUS_CHANGED
+        if self._subscribers:
+            events.append(
+                TodoEvent(tenant_id, event_type, todo.id, todo.user_id, todo.status)
+            )
+        return result
+
+    async def _publish(self, events: List[TodoEvent]):
+        for tenant_id, subscriptions in list(self._subscribers.items()):
+            if tenant_id is None:
+                batch = events
+            else:
+                batch = [event for event in events if event.tenant_id == tenant_id]
+                if not batch:
+                    continue
+            for subscription in list(subscriptions):
+                await self._deliver(subscription, batch)
+
+    async def _deliver(self, subscription: Subscription, batch: List[TodoEvent]):
+        queue = subscription.queue
+        if not queue.full():
+            queue.put_nowait(batch)
+            return
+        if subscription._closing is None:
+            subscription._closing = asyncio.get_running_loop().create_future()
+        put = asyncio.ensure_future(queue.put(batch))
+        await asyncio.wait(
+            (put, subscription._closing),
+            timeout=self.max_publish_wait,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if not put.done():
+            # Closed, or too slow to keep up: drop it rather than block the shard
+            put.cancel()
+            self._unsubscribe(subscription)
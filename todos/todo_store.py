@@ -0,0 +1,437 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core_entities import Todo, TodoStatus, User
+
+DATA_SUFFIX = ".data"
+HINT_SUFFIX = ".hint"
+
+USER = 0
+TODO = 1
+_KINDS = {"user": USER, "todo": TODO}
+
+_STATUSES = list(TodoStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+_DELETED = _STATUS_CODES[TodoStatus.DELETED]
+
+# One hint per record in a segment: kind, id, offset, length, user_id, status
+_HINT = struct.Struct("<BqQIqB")
+
+# Segments are numbered (generation, part). Writes go to part 0 of a new
+# generation; compaction output takes the next parts of the newest generation
+# it compacted, so it still sorts before anything written after it.
+SegmentId = Tuple[int, int]
+HintEntry = Tuple[int, int, int, int, int, int]
+
+
+class RecordMap(MutableMapping):
+    # dict-like view of the users or todos in a TodoStore, for TodoSystem.
+    # Values are decoded from disk on every access, so changing one only
+    # sticks once it is assigned back.
+    def __init__(self, store: "TodoStore", kind: int):
+        self._store = store
+        self._kind = kind
+        self._index = store._users if kind == USER else store._todos
+
+    def __getitem__(self, record_id: int):
+        if self._kind == USER:
+            return self._store.get_user(record_id)
+        return self._store.get_todo(record_id)
+
+    def __setitem__(self, record_id: int, value):
+        if self._kind == USER:
+            self._store.put_user(value)
+        else:
+            self._store.put_todo(value)
+
+    def __delitem__(self, record_id: int):
+        if self._kind == USER:
+            raise TypeError("Users cannot be deleted")
+        self._store.delete_todo(record_id)
+
+    def __contains__(self, record_id) -> bool:
+        return record_id in self._index
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+# Log-structured store for a TodoSystem. Every put appends a JSON record to
+# the active segment file and points an in-memory hash index at it; deleting
+# a todo appends a tombstone and drops it from the index. Sealed segments are
+# read through mmap, only when a record is asked for, and each gets a hint
+# file listing its records' offsets, so opening the store reads the hints
+# rather than the records. Once superseded records and tombstones make up
+# `compact_ratio` of the bytes on disk, a background thread copies the live
+# records out of the sealed segments and deletes them. Compaction also keeps
+# the tombstone of the highest todo id if that todo was deleted, so
+# max_todo_id, and with it the ids TodoSystem hands out, never goes back.
+class TodoStore:
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = 4 << 20,
+        fsync_batch_size: int = 1,
+        compact_ratio: float = 0.5,
+    ):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_batch_size = max(1, fsync_batch_size)
+        self.compact_ratio = compact_ratio
+        os.makedirs(directory, exist_ok=True)
+
+        # id -> (segment, offset, length); todos add user_id and status code
+        self._users: Dict[int, Tuple[SegmentId, int, int]] = {}
+        self._todos: Dict[int, Tuple[SegmentId, int, int, int, int]] = {}
+        self._segments: Dict[SegmentId, int] = {}  # Sealed segment -> size
+        self._maps: Dict[SegmentId, mmap.mmap] = {}
+        self.total_bytes = 0
+        self.live_bytes = 0
+        self.max_todo_id = 0  # Deleted todos included
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._unsynced = 0
+
+        self._load()
+        generation = max(self._segments, default=(0, 0))[0] + 1
+        self._open_active((generation, 0))
+        self.users = RecordMap(self, USER)
+        self.todos = RecordMap(self, TODO)
+
+    def _path(self, segment: SegmentId, suffix: str) -> str:
+        return os.path.join(
+            self.directory, f"{segment[0]:08d}-{segment[1]:04d}{suffix}"
+        )
+
+    def _list_segments(self) -> List[SegmentId]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.endswith(DATA_SUFFIX):
+                generation, part = name[: -len(DATA_SUFFIX)].split("-")
+                segments.append((int(generation), int(part)))
+        return sorted(segments)
+
+    def _load(self):
+        for segment in self._list_segments():
+            path = self._path(segment, DATA_SUFFIX)
+            hint_path = self._path(segment, HINT_SUFFIX)
+            if os.path.exists(hint_path):
+                entries = read_hints(hint_path)
+                size = os.path.getsize(path)
+            else:
+                # Never sealed, e.g. the process died while it was active
+                entries, size = scan_segment(path)
+                if size:
+                    os.truncate(path, size)
+                    write_hints(hint_path, entries)
+            if not size:
+                os.remove(path)
+                continue
+            self._segments[segment] = size
+            self.total_bytes += size
+            for kind, record_id, offset, length, user_id, status in entries:
+                self._place(kind, record_id, segment, offset, length, user_id, status)
+
+    def _place(
+        self,
+        kind: int,
+        record_id: int,
+        segment: SegmentId,
+        offset: int,
+        length: int,
+        user_id: int,
+        status: int,
+    ):
+        if kind == TODO and record_id > self.max_todo_id:
+            self.max_todo_id = record_id
+        index = self._users if kind == USER else self._todos
+        old = index.pop(record_id, None)
+        if old is not None:
+            self.live_bytes -= old[2] + 1
+        if kind == TODO and status == _DELETED:
+            return
+        if kind == USER:
+            index[record_id] = (segment, offset, length)
+        else:
+            index[record_id] = (segment, offset, length, user_id, status)
+        self.live_bytes += length + 1
+
+    def _open_active(self, segment: SegmentId):
+        self._active = segment
+        self._active_entries: List[HintEntry] = []
+        self._offset = 0
+        self._file = open(self._path(segment, DATA_SUFFIX), "a+b")
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def _seal_active(self):
+        self._sync()
+        self._file.close()
+        if not self._offset:
+            os.remove(self._path(self._active, DATA_SUFFIX))
+            return
+        write_hints(self._path(self._active, HINT_SUFFIX), self._active_entries)
+        self._segments[self._active] = self._offset
+
+    def _rotate(self):
+        self._seal_active()
+        self._open_active((self._active[0] + 1, 0))
+
+    def _append(self, record: dict, user_id: int = 0, status: int = 0):
+        kind = _KINDS[record["kind"]]
+        data = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        with self._lock:
+            offset = self._offset
+            self._file.write(data)
+            self._offset += len(data)
+            self.total_bytes += len(data)
+            entry = (kind, record["id"], offset, len(data) - 1, user_id, status)
+            self._active_entries.append(entry)
+            self._place(kind, record["id"], self._active, *entry[2:])
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch_size:
+                self._sync()
+            if self._offset >= self.segment_size:
+                self._rotate()
+                self._maybe_compact()
+
+    def put_user(self, user: User):
+        self._append({"kind": "user", "id": user.id, "name": user.name})
+
+    def put_todo(self, todo: Todo):
+        if todo.status == TodoStatus.DELETED:
+            self.delete_todo(todo.id)
+            return
+        self._append(
+            {
+                "kind": "todo",
+                "id": todo.id,
+                "user_id": todo.user_id,
+                "title": todo.title,
+                "description": todo.description,
+                "status": todo.status.value,
+            },
+            todo.user_id,
+            _STATUS_CODES[todo.status],
+        )
+
+    def delete_todo(self, todo_id: int):
+        location = self._todos.get(todo_id)
+        if location is None:
+            raise KeyError(todo_id)
+        self._append(
+            {
+                "kind": "todo",
+                "id": todo_id,
+                "user_id": location[3],
+                "status": TodoStatus.DELETED.value,
+            },
+            location[3],
+            _DELETED,
+        )
+
+    def _read(self, index: Dict, record_id: int) -> dict:
+        with self._lock:
+            segment, offset, length = index[record_id][:3]
+            if segment == self._active:
+                self._file.flush()
+                return json.loads(os.pread(self._file.fileno(), length, offset))
+            return json.loads(self._map(segment)[offset : offset + length])
+
+    def _map(self, segment: SegmentId) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None:
+            with open(self._path(segment, DATA_SUFFIX), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def get_user(self, user_id: int) -> User:
+        record = self._read(self._users, user_id)
+        return User(id=record["id"], name=record["name"])
+
+    def get_todo(self, todo_id: int) -> Todo:
+        record = self._read(self._todos, todo_id)
+        return Todo(
+            id=record["id"],
+            user_id=record["user_id"],
+            title=record["title"],
+            description=record["description"],
+            status=TodoStatus(record["status"]),
+        )
+
+    def todo_keys(self) -> List[Tuple[int, int, TodoStatus]]:
+        # (todo_id, user_id, status) of every live todo, straight from the
+        # index, so a TodoSystem can rebuild its own indexes without reads
+        with self._lock:
+            return [
+                (todo_id, location[3], _STATUSES[location[4]])
+                for todo_id, location in self._todos.items()
+            ]
+
+    def garbage_ratio(self) -> float:
+        return 1 - self.live_bytes / self.total_bytes if self.total_bytes else 0.0
+
+    def _maybe_compact(self):
+        if self.garbage_ratio() < self.compact_ratio:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(
+            target=self.compact, name="todo-store-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def compact(self) -> int:
+        # Rewrites every sealed segment down to its live records and returns
+        # the bytes reclaimed. Writes carry on meanwhile; a record updated
+        # while its copy is being made keeps its newer location.
+        with self._compact_lock:
+            with self._lock:
+                if self._offset:
+                    self._rotate()
+                inputs = sorted(self._segments)
+                maps = {segment: self._map(segment) for segment in inputs}
+            if not inputs:
+                return 0
+
+            writer = _SegmentWriter(self, inputs[-1])
+            moves = []
+            for segment in inputs:
+                mapped = maps[segment]
+                for entry in read_hints(self._path(segment, HINT_SUFFIX)):
+                    kind, record_id, offset, length = entry[:4]
+                    deleted = kind == TODO and entry[5] == _DELETED
+                    if deleted and record_id == self.max_todo_id:
+                        # A todo is deleted once, so this is its last record
+                        writer.write(mapped[offset : offset + length + 1], entry)
+                        continue
+                    index = self._users if kind == USER else self._todos
+                    location = index.get(record_id)
+                    if location is None or location[:2] != (segment, offset):
+                        continue
+                    new_segment, new_offset = writer.write(
+                        mapped[offset : offset + length + 1], entry
+                    )
+                    moves.append(
+                        (index, record_id, segment, offset, new_segment, new_offset)
+                    )
+            outputs = writer.close()
+
+            with self._lock:
+                for move in moves:
+                    index, record_id, segment, offset, new_segment, new_offset = move
+                    location = index.get(record_id)
+                    if location is not None and location[:2] == (segment, offset):
+                        index[record_id] = (new_segment, new_offset) + location[2:]
+                before = 0
+                for segment in inputs:
+                    self._maps.pop(segment).close()
+                    before += self._segments.pop(segment)
+                    os.remove(self._path(segment, HINT_SUFFIX))
+                    os.remove(self._path(segment, DATA_SUFFIX))
+                after = sum(outputs.values())
+                self._segments.update(outputs)
+                self.total_bytes += after - before
+            return before - after
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._seal_active()
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+class _SegmentWriter:
+    # Compaction output, split into segments of the store's segment size
+    def __init__(self, store: TodoStore, last_input: SegmentId):
+        self.store = store
+        self.generation, self.part = last_input
+        self.sizes: Dict[SegmentId, int] = {}
+        self._file = None
+
+    def _open(self):
+        self.part += 1
+        self.segment = (self.generation, self.part)
+        self.entries: List[HintEntry] = []
+        self.offset = 0
+        self._file = open(self.store._path(self.segment, DATA_SUFFIX), "wb")
+
+    def _finish(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        write_hints(self.store._path(self.segment, HINT_SUFFIX), self.entries)
+        self.sizes[self.segment] = self.offset
+        self._file = None
+
+    def write(self, data: bytes, entry: HintEntry) -> Tuple[SegmentId, int]:
+        if self._file is None:
+            self._open()
+        offset = self.offset
+        self._file.write(data)
+        self.offset += len(data)
+        self.entries.append(entry[:2] + (offset,) + entry[3:])
+        segment = self.segment
+        if self.offset >= self.store.segment_size:
+            self._finish()
+        return segment, offset
+
+    def close(self) -> Dict[SegmentId, int]:
+        if self._file is not None:
+            self._finish()
+        return self.sizes
+
+
+def write_hints(path: str, entries: List[HintEntry]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(_HINT.pack(*entry) for entry in entries))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_hints(path: str) -> List[HintEntry]:
+    with open(path, "rb") as f:
+        return list(_HINT.iter_unpack(f.read()))
+
+
+def scan_segment(path: str) -> Tuple[List[HintEntry], int]:
+    # Hint entries for a segment without a hint file, and the size up to the
+    # last whole record
+    entries: List[HintEntry] = []
+    offset = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # A torn write from a crash can only be the final line
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            length = len(line) - 1
+            if record["kind"] == "user":
+                entries.append((USER, record["id"], offset, length, 0, 0))
+            else:
+                status = _STATUS_CODES[TodoStatus(record["status"])]
+                entries.append(
+                    (TODO, record["id"], offset, length, record["user_id"], status)
+                )
+            offset += len(line)
+    return entries, offset